@@ -0,0 +1,84 @@
+"""
+Performance report for the thermal model sweep.
+"""
+
+import time
+import numpy as np
+from thermalmodel_v4 import ThermalModel as TM4
+from nodes import construct_nodes
+
+
+def report_eclipse_segmentation(tm, beta_range, h_range, time_range, method):
+    """
+    Compare the trajectory sweep with and without splitting the integration at the eclipse entry and exit.
+
+    Parameters:
+        tm (ThermalModel): The thermal model object.
+        beta_range (numpy.ndarray): The range of beta angles.
+        h_range (numpy.ndarray): The range of altitudes.
+        time_range (numpy.ndarray): The range of times.
+        method (str): Integration method passed to solve_ivp.
+    """
+    runs = {}
+    for segment_eclipse in (False, True):
+        start = time.perf_counter()
+        tm.integrate_heat_balance(beta_range, h_range, time_range, method=method, segment_eclipse=segment_eclipse)
+        runs[segment_eclipse] = (time.perf_counter() - start, dict(tm.stats))
+
+    (time_plain, stats_plain), (time_split, stats_split) = runs[False], runs[True]
+    saved = stats_plain['nfev'] - stats_split['nfev']
+    print(f"{method}: {stats_plain['scenarios']} scenarios, {len(time_range)} output times")
+    print(f"  single span       : {stats_plain['nfev']:8d} RHS calls, {stats_plain['njev']:5d} Jacobians, {time_plain:7.2f} s")
+    print(f"  eclipse segments  : {stats_split['nfev']:8d} RHS calls, {stats_split['njev']:5d} Jacobians, {time_split:7.2f} s "
+          f"({stats_split['segments']} segments)")
+    print(f"  RHS calls saved   : {saved:8d} ({100 * saved / max(stats_plain['nfev'], 1):.1f} %)")
+
+
+def report_batching(tm, beta_range, h_range, time_range, method):
+    """
+    Compare integrating every (beta, h) scenario separately with integrating them together as one stacked
+    ODE, on a single core.
+
+    Parameters:
+        tm (ThermalModel): The thermal model object.
+        beta_range (numpy.ndarray): The range of beta angles.
+        h_range (numpy.ndarray): The range of altitudes.
+        time_range (numpy.ndarray): The range of times.
+        method (str): Integration method passed to solve_ivp.
+    """
+    scenarios = [(beta, h) for beta in beta_range for h in h_range]
+    initial_T = np.array([node.temperature for node in tm.nodes.values()])
+    solver_options = tm.solver_options(method)
+    tm.integrate_batch(tm.network, scenarios[:2], time_range[:2], initial_T, method) # Compile the batched kernel
+
+    start = time.perf_counter()
+    separate = [tm.integrate_trajectory(tm.network, beta, h, time_range, initial_T, solver_options) for beta, h in scenarios]
+    time_separate = time.perf_counter() - start
+    start = time.perf_counter()
+    batched, stats = tm.integrate_batch(tm.network, scenarios, time_range, initial_T, method)
+    time_batched = time.perf_counter() - start
+
+    difference = max(np.abs(batched[s] - trajectory).max() for s, (trajectory, _) in enumerate(separate))
+    print(f"{method}: {len(scenarios)} scenarios on one core")
+    print(f"  separate          : {sum(s['nfev'] for _, s in separate):8d} RHS calls, {time_separate:7.2f} s")
+    print(f"  batched           : {stats['nfev']:8d} RHS calls, {time_batched:7.2f} s, max difference {difference:.2f} K")
+
+
+def main():
+    """
+    Main function.
+    """
+    tm = TM4(construct_nodes())
+    beta_range = np.linspace(0, 90, 2)
+    h_range = np.linspace(200, 2000, 2)
+    time_range = np.linspace(0, 30000, 300)
+
+    for method in ('BDF', 'Radau', 'LSODA'):
+        report_eclipse_segmentation(tm, beta_range, h_range, time_range, method)
+
+    for method in ('RK45', 'BDF', 'Radau'):
+        report_batching(tm, np.linspace(0, 90, 4), np.linspace(200, 2000, 4), time_range, method)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+A module that contains fixed-step integrators specialized for the thermal network.
+"""
+
+import numpy as np
+from scipy.sparse import identity
+from scipy.sparse.linalg import splu
+
+FIXED_STEP_METHODS = {'BE': 1.0, 'CN': 0.5} # Implicitness theta of the fixed-step methods accepted as solve_ivp method names
+
+
+class ThetaIntegrator:
+    """
+    Fixed-step, linearly implicit theta method for the heat balance: backward Euler (theta = 1) or
+    Crank-Nicolson (theta = 1/2). Each step solves
+
+        (I - theta * dt * J) dT = dt * f(T, t + theta * dt)
+
+    with the exact nonlinear right-hand side f and a Jacobian J frozen at a reference temperature. The
+    conduction part of J is exact and the radiation part is linearized at the reference, so the LU
+    factorization of the sparse step matrix is computed once and reused for every step, one triangular
+    solve per step. It is recomputed when the temperatures drift from the reference by more than
+    refactor_tol, which keeps the linearized radiation close to the true one. A steady state of f is
+    kept exactly.
+
+    Steps end on the output times and on the eclipse entry and exit times, so the flux within a step has
+    a single eclipse state.
+
+    Attributes:
+        ode_system (function): Right-hand side with an environment attribute, see ThermalNetwork.ode_system.
+        jacobian (function): Jacobian callback jac(t, y) returning a sparse matrix.
+        theta (float): Implicitness of the method.
+        refactor_tol (float): Largest relative temperature change from the reference before refactoring.
+        stats (dict): Number of steps (nfev) and of factorizations (njev) of the last integration.
+    """
+
+    __slots__ = ['ode_system', 'jacobian', 'theta', 'refactor_tol', 'stats', '_reference', '_step_jacobian', '_factors']
+
+    def __init__(self, ode_system, jacobian, theta: float = 1.0, refactor_tol: float = 0.05) -> None:
+        """
+        Initializes the integrator.
+
+        Parameters:
+            ode_system (function): Right-hand side with an environment attribute, see ThermalNetwork.ode_system.
+            jacobian (function): Jacobian callback jac(t, y) returning a sparse matrix, see ThermalNetwork.jacobian_system.
+            theta (float): Implicitness, 1 for backward Euler and 1/2 for Crank-Nicolson.
+            refactor_tol (float): Largest relative temperature change from the reference before refactoring.
+        """
+        self.ode_system = ode_system
+        self.jacobian = jacobian
+        self.theta = theta
+        self.refactor_tol = refactor_tol
+        self.stats = {'nfev': 0, 'njev': 0, 'segments': 0}
+        self._reference = None
+        self._step_jacobian = None
+        self._factors = {}
+
+    def _factor(self, t: float, temperatures: np.ndarray, step: float):
+        """
+        Get the LU factorization of the step matrix for a step size, refreshing the reference Jacobian when
+        the temperatures have drifted too far from it.
+
+        Parameters:
+            t (float): Time. s
+            temperatures (numpy.ndarray): Current state. K
+            step (float): Step size. s
+
+        Returns:
+            scipy.sparse.linalg.SuperLU: Factorization of I - theta * step * J.
+        """
+        if self._reference is None or np.max(np.abs(temperatures - self._reference) / np.abs(self._reference)) > self.refactor_tol:
+            self._reference = temperatures.copy()
+            self._step_jacobian = self.jacobian(t, temperatures)
+            self._factors = {}
+        if step not in self._factors:
+            if len(self._factors) > 8:
+                self._factors = {} # Steps cut short by the eclipse breakpoints come in many sizes
+            matrix = identity(len(temperatures), format='csc') - self.theta * step * self._step_jacobian
+            self._factors[step] = splu(matrix.tocsc())
+            self.stats['njev'] += 1
+        return self._factors[step]
+
+    def integrate(self, time_range: np.ndarray, initial_T: np.ndarray, dt: float, segment_eclipse: bool = True) -> tuple:
+        """
+        Integrate from t=0 and sample the state at every output time.
+
+        Parameters:
+            time_range (numpy.ndarray): Sorted array of output times. s
+            initial_T (numpy.ndarray): Initial state. K
+            dt (float): Largest step size. s
+            segment_eclipse (bool): End steps on the eclipse entry and exit times.
+
+        Returns:
+            tuple: Array of states with shape (len(time_range), len(initial_T)), and a dict with the number
+                   of steps (nfev), factorizations (njev) and intervals between breakpoints (segments).
+        """
+        time_range = np.asarray(time_range, dtype=float)
+        temperatures = np.array(initial_T, dtype=float)
+        self.stats = {'nfev': 0, 'njev': 0, 'segments': 0}
+        trajectory = np.empty((len(time_range), len(temperatures)))
+        if len(time_range) == 0:
+            return trajectory, self.stats
+
+        environment = self.ode_system.environment
+        breakpoints = [time_range[time_range > 0]]
+        if segment_eclipse and time_range[-1] > 0:
+            breakpoints.append(environment.discontinuities(0.0, time_range[-1]))
+        edges = np.unique(np.concatenate([[0.0]] + breakpoints))
+
+        output = 0
+        while output < len(time_range) and time_range[output] <= 0:
+            trajectory[output] = temperatures
+            output += 1
+        for start, end in zip(edges[:-1], edges[1:]):
+            eclipse = environment.in_eclipse((start + end) / 2) if segment_eclipse else None
+            # Full steps of dt, so one factorization serves them all, and a shorter last step onto the breakpoint
+            full_steps = max(int(np.floor((end - start) / dt * (1 + 1e-9))), 0)
+            steps = [dt] * full_steps
+            if end - (start + full_steps * dt) > 1e-9 * dt:
+                steps.append(end - (start + full_steps * dt))
+            t = start
+            for step in steps:
+                factor = self._factor(t, temperatures, step)
+                rate = self.ode_system(t + self.theta * step, temperatures, eclipse)
+                change = factor.solve(step * rate)
+                if not np.all(np.isfinite(change)):
+                    raise RuntimeError(f"Fixed-step integration failed at t={t}: the state is not finite")
+                temperatures += change
+                t += step
+                self.stats['nfev'] += 1
+            self.stats['segments'] += 1
+            while output < len(time_range) and time_range[output] <= end:
+                trajectory[output] = temperatures
+                output += 1
+
+        return trajectory, self.stats
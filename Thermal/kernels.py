@@ -0,0 +1,158 @@
+"""
+A module that contains the compiled, array-only kernels of the thermal model.
+"""
+
+import numpy as np
+from numba import njit
+
+CONDUCTIVITY, THERMAL_MASS, EMISSIVITY = 0, 1, 2 # Order of the property tables
+
+
+@njit(cache=True, fastmath=True)
+def table_lookup(tables, prop, row, temperature, grid_start, grid_step):
+    """
+    Interpolate a property table sampled on a uniform temperature grid, constant beyond the grid.
+
+    Parameters:
+        tables (numpy.ndarray): Array of shape (3, N, K) with the properties of each node at the K grid temperatures.
+        prop (int): CONDUCTIVITY, THERMAL_MASS or EMISSIVITY.
+        row (int): Node row.
+        temperature (float): Temperature of the node. K
+        grid_start (float): First grid temperature. K
+        grid_step (float): Spacing of the grid temperatures. K
+
+    Returns:
+        float: Value of the property at the temperature.
+    """
+    position = (temperature - grid_start) / grid_step
+    last = tables.shape[2] - 1
+    if position <= 0.0:
+        return tables[prop, row, 0]
+    if position >= last:
+        return tables[prop, row, last]
+    index = int(position)
+    fraction = position - index
+    return tables[prop, row, index] * (1.0 - fraction) + tables[prop, row, index + 1] * fraction
+
+
+@njit(cache=True, fastmath=True)
+def heat_balance_kernel(temperatures, conductance_indptr, conductance_indices, conductance_data, radiation_indptr,
+                        radiation_indices, radiation_data, areas, emissivities, emission_offsets, radiating,
+                        thermal_masses, q_generated, q_external, sigma, T_space, thermal_control, grid_start, grid_step,
+                        property_tables):
+    """
+    Calculate the rate of change of temperature for each node from the temperature vector alone.
+
+    Parameters:
+        temperatures (numpy.ndarray): Array of node temperatures. K
+        conductance_indptr (numpy.ndarray): CSR row pointers of the linear conductance matrix.
+        conductance_indices (numpy.ndarray): CSR column indices of the linear conductance matrix.
+        conductance_data (numpy.ndarray): CSR values k*A/L of the linear conductance matrix. W/K
+        radiation_indptr (numpy.ndarray): CSR row pointers of the internal radiative conductance matrix.
+        radiation_indices (numpy.ndarray): CSR column indices of the internal radiative conductance matrix.
+        radiation_data (numpy.ndarray): CSR values of the internal radiative conductance matrix. W/K^4
+        areas (numpy.ndarray): Array of node areas. m^2
+        emissivities (numpy.ndarray): Array of node emissivities, for MLI nodes the scale of the effective emissivity.
+        emission_offsets (numpy.ndarray): Array of offsets of the effective emissivity of MLI nodes, zero for bare nodes. K^4
+        radiating (numpy.ndarray): Boolean mask of the nodes that exchange heat with the environment.
+        thermal_masses (numpy.ndarray): Array of node thermal masses. J/K
+        q_generated (numpy.ndarray): Array of internal heat loads. W
+        q_external (numpy.ndarray): Array of external heat fluxes. W
+        sigma (float): Stefan-Boltzmann constant. W/m^2K^4
+        T_space (float): Temperature of space. K
+        thermal_control (bool): If True, nodes with an internal heat load are held at constant temperature.
+        grid_start (float): First temperature of the property tables. K
+        grid_step (float): Spacing of the temperatures of the property tables. K
+        property_tables (numpy.ndarray): Array of shape (3, N, K) with the conductivity relative to the nominal value,
+                                         the thermal mass and the emissivity of each node on the grid, or of shape
+                                         (3, N, 0) when all properties are constant.
+
+    Returns:
+        numpy.ndarray: Array of the rate of change of temperature for each node. K/s
+    """
+    node_count = temperatures.shape[0]
+    dT_dt = np.empty(node_count)
+    T_space_4 = T_space ** 4
+
+    # Temperature-dependent properties are looked up once per node
+    tabulated = property_tables.shape[2] > 0
+    if tabulated:
+        conductance_scales = np.empty(node_count)
+        for j in range(node_count):
+            conductance_scales[j] = table_lookup(property_tables, CONDUCTIVITY, j, temperatures[j], grid_start, grid_step)
+
+    for i in range(node_count):
+        T_i = temperatures[i]
+        q_total = q_generated[i]
+
+        # Conduction to the neighbours of node i
+        for idx in range(conductance_indptr[i], conductance_indptr[i + 1]):
+            j = conductance_indices[idx]
+            link = conductance_data[idx]
+            if tabulated:
+                link *= conductance_scales[j]
+            q_total += link * (temperatures[j] - T_i)
+
+        # Internal radiation exchange with the nodes in view
+        T_i_4 = T_i ** 4
+        for idx in range(radiation_indptr[i], radiation_indptr[i + 1]):
+            q_total += radiation_data[idx] * (temperatures[radiation_indices[idx]] ** 4 - T_i_4)
+
+        # Radiation to space and external heating only for nodes facing the environment
+        if radiating[i]:
+            emissivity = table_lookup(property_tables, EMISSIVITY, i, T_i, grid_start, grid_step) if tabulated else emissivities[i]
+            epsilon = min(max(emission_offsets[i] / T_i_4 + emissivity, 0.0), 1.0)
+            q_total += q_external[i] - epsilon * sigma * areas[i] * (T_i_4 - T_space_4)
+
+        if thermal_control and q_generated[i] != 0.0:
+            dT_dt[i] = 0.0
+        elif tabulated:
+            dT_dt[i] = q_total / table_lookup(property_tables, THERMAL_MASS, i, T_i, grid_start, grid_step)
+        else:
+            dT_dt[i] = q_total / thermal_masses[i]
+
+    return dT_dt
+
+
+@njit(cache=True, fastmath=True)
+def heat_balance_batch_kernel(temperatures, conductance_indptr, conductance_indices, conductance_data, radiation_indptr,
+                              radiation_indices, radiation_data, areas, emissivities, emission_offsets, radiating,
+                              thermal_masses, q_generated, q_external, sigma, T_space, thermal_control, grid_start,
+                              grid_step, property_tables):
+    """
+    Calculate the rate of change of temperature for each node of S scenarios of the same network at once.
+
+    Parameters:
+        temperatures (numpy.ndarray): Array of shape (S, N) with the node temperatures of each scenario. K
+        conductance_indptr (numpy.ndarray): CSR row pointers of the linear conductance matrix.
+        conductance_indices (numpy.ndarray): CSR column indices of the linear conductance matrix.
+        conductance_data (numpy.ndarray): CSR values k*A/L of the linear conductance matrix. W/K
+        radiation_indptr (numpy.ndarray): CSR row pointers of the internal radiative conductance matrix.
+        radiation_indices (numpy.ndarray): CSR column indices of the internal radiative conductance matrix.
+        radiation_data (numpy.ndarray): CSR values of the internal radiative conductance matrix. W/K^4
+        areas (numpy.ndarray): Array of node areas. m^2
+        emissivities (numpy.ndarray): Array of node emissivities, for MLI nodes the scale of the effective emissivity.
+        emission_offsets (numpy.ndarray): Array of offsets of the effective emissivity of MLI nodes, zero for bare nodes. K^4
+        radiating (numpy.ndarray): Boolean mask of the nodes that exchange heat with the environment.
+        thermal_masses (numpy.ndarray): Array of node thermal masses. J/K
+        q_generated (numpy.ndarray): Array of internal heat loads. W
+        q_external (numpy.ndarray): Array of shape (S, N) with the external heat fluxes of each scenario. W
+        sigma (float): Stefan-Boltzmann constant. W/m^2K^4
+        T_space (float): Temperature of space. K
+        thermal_control (bool): If True, nodes with an internal heat load are held at constant temperature.
+        grid_start (float): First temperature of the property tables. K
+        grid_step (float): Spacing of the temperatures of the property tables. K
+        property_tables (numpy.ndarray): Array of shape (3, N, K) with the conductivity relative to the nominal value,
+                                         the thermal mass and the emissivity of each node on the grid, or of shape
+                                         (3, N, 0) when all properties are constant.
+
+    Returns:
+        numpy.ndarray: Array of shape (S, N) with the rate of change of temperature for each node. K/s
+    """
+    dT_dt = np.empty(temperatures.shape)
+    for s in range(temperatures.shape[0]):
+        dT_dt[s] = heat_balance_kernel(temperatures[s], conductance_indptr, conductance_indices, conductance_data,
+                                       radiation_indptr, radiation_indices, radiation_data, areas, emissivities,
+                                       emission_offsets, radiating, thermal_masses, q_generated, q_external[s], sigma, T_space,
+                                       thermal_control, grid_start, grid_step, property_tables)
+    return dT_dt
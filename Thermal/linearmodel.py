@@ -0,0 +1,139 @@
+"""
+A module that contains the linearized state-space form of the thermal model.
+"""
+
+import numpy as np
+from scipy.linalg import expm
+
+
+class LinearModel:
+    """
+    The heat balance linearized around an operating point, dT/dt = A*T + B*u + c, where the inputs
+    u = [q_generated, q_external] hold the internal heat load and the external heat flux of every node.
+
+    The transient of a load profile sampled at a fixed time step is evaluated exactly for inputs held
+    constant over each step (zero-order hold): T[k+1] = Ad*T[k] + Bd*u[k] + cd, with the discrete matrices
+    computed once per time step from the matrix exponential and cached.
+
+    Radiation enters through T^4, so the error of the linearization grows with the square of the distance
+    from the operating point. It suits load changes around a steady state, such as switching a component,
+    better than the full sunlit to eclipse swing of the outer panels.
+
+    Attributes:
+        A (numpy.ndarray): State matrix d(dT/dt)/dT at the operating point. 1/s
+        B (numpy.ndarray): Input matrix d(dT/dt)/du, of shape (N, 2N). K/J
+        c (numpy.ndarray): Constant term, so that A*T + B*u + c matches the heat balance at the operating point. K/s
+        keys (numpy.ndarray): Node keys in row order.
+        operating_T (numpy.ndarray): Node temperatures of the operating point. K
+        q_generated (numpy.ndarray): Nominal internal heat loads of the nodes. W
+    """
+
+    __slots__ = ['A', 'B', 'c', 'keys', 'operating_T', 'q_generated', '_discrete']
+
+    def __init__(self, A: np.ndarray, B: np.ndarray, c: np.ndarray, keys: np.ndarray, operating_T: np.ndarray,
+                 q_generated: np.ndarray) -> None:
+        """
+        Initializes a LinearModel, see ThermalModel.linearize.
+
+        Parameters:
+            A (numpy.ndarray): State matrix. 1/s
+            B (numpy.ndarray): Input matrix. K/J
+            c (numpy.ndarray): Constant term. K/s
+            keys (numpy.ndarray): Node keys in row order.
+            operating_T (numpy.ndarray): Node temperatures of the operating point. K
+            q_generated (numpy.ndarray): Nominal internal heat loads of the nodes. W
+        """
+        self.A = A
+        self.B = B
+        self.c = c
+        self.keys = keys
+        self.operating_T = operating_T
+        self.q_generated = q_generated
+        self._discrete = {}
+
+    def __len__(self) -> int:
+        """
+        Returns the number of nodes.
+
+        Returns:
+            int: Number of nodes.
+        """
+        return len(self.keys)
+
+    def inputs(self, q_generated: np.ndarray = None, q_external: np.ndarray = None) -> np.ndarray:
+        """
+        Assemble the input vectors u = [q_generated, q_external].
+
+        Parameters:
+            q_generated (numpy.ndarray): Internal heat loads, of shape (..., N) (default: the nominal loads). W
+            q_external (numpy.ndarray): External heat fluxes, of shape (..., N) (default: none). W
+
+        Returns:
+            numpy.ndarray: Inputs of shape (..., 2N).
+        """
+        q_generated = self.q_generated if q_generated is None else np.asarray(q_generated, dtype=float)
+        q_external = np.zeros(len(self)) if q_external is None else np.asarray(q_external, dtype=float)
+        q_generated, q_external = np.broadcast_arrays(q_generated, q_external)
+        return np.concatenate([q_generated, q_external], axis=-1)
+
+    def derivative(self, temperatures: np.ndarray, u: np.ndarray) -> np.ndarray:
+        """
+        Evaluate the linearized heat balance.
+
+        Parameters:
+            temperatures (numpy.ndarray): Node temperatures, of shape (..., N). K
+            u (numpy.ndarray): Inputs, of shape (..., 2N), see inputs.
+
+        Returns:
+            numpy.ndarray: Rate of change of temperature for each node. K/s
+        """
+        return temperatures @ self.A.T + u @ self.B.T + self.c
+
+    def discretize(self, dt: float) -> tuple:
+        """
+        Get the zero-order hold discretization of the model for a time step. The result is cached per time step.
+
+        Parameters:
+            dt (float): Time step. s
+
+        Returns:
+            tuple: (Ad, Bd, cd) with T[k+1] = Ad*T[k] + Bd*u[k] + cd.
+        """
+        dt = float(dt)
+        if dt not in self._discrete:
+            # exp of the augmented matrix [[A, B, c], [0, 0, 0]] * dt holds Ad, Bd and cd in its first N rows
+            node_count, input_count = self.B.shape
+            augmented = np.zeros((node_count + input_count + 1, node_count + input_count + 1))
+            augmented[:node_count, :node_count] = self.A
+            augmented[:node_count, node_count:node_count + input_count] = self.B
+            augmented[:node_count, -1] = self.c
+            exponential = expm(augmented * dt)[:node_count]
+            self._discrete[dt] = (exponential[:, :node_count], exponential[:, node_count:node_count + input_count], exponential[:, -1])
+        return self._discrete[dt]
+
+    def simulate(self, u: np.ndarray, dt: float, initial_T: np.ndarray = None) -> np.ndarray:
+        """
+        Evaluate the transient response to load profiles sampled at a fixed time step. Several profiles are
+        advanced together, so each step is one matrix product for all of them.
+
+        Parameters:
+            u (numpy.ndarray): Inputs held over each step, of shape (K, 2N) for one profile of K steps or
+                               (P, K, 2N) for P profiles, see inputs.
+            dt (float): Time step. s
+            initial_T (numpy.ndarray): Initial node temperatures, of shape (N,) or (P, N) (default: the operating point). K
+
+        Returns:
+            numpy.ndarray: Node temperatures at the K + 1 times 0, dt, ..., K*dt, of shape (K + 1, N) or (P, K + 1, N). K
+        """
+        u = np.asarray(u, dtype=float)
+        single = u.ndim == 2
+        if single:
+            u = u[None]
+        Ad, Bd, cd = self.discretize(dt)
+        temperatures = self.operating_T if initial_T is None else np.asarray(initial_T, dtype=float)
+        states = np.empty((u.shape[0], u.shape[1] + 1, len(self)))
+        states[:, 0] = temperatures
+        forcing = u @ Bd.T + cd # The input terms of every step do not depend on the state
+        for k in range(u.shape[1]):
+            states[:, k + 1] = states[:, k] @ Ad.T + forcing[:, k]
+        return states[0] if single else states
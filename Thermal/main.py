@@ -2,6 +2,7 @@
 Main file for the thermal model.
 """
 
+import os
 import numpy as np
 from thermalmodel_v4 import ThermalModel as TM4
 from viewer import plot_3d
@@ -13,7 +14,7 @@ def main():
     Main function.
     """
     nodes = construct_nodes()
-    tm = TM4(nodes)
+    tm = TM4(nodes, cache_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
     beta_range = np.linspace(0, 90, 2)
     h_range = np.linspace(200, 2000, 2)
     time_range = np.linspace(0, 30000, 300)
@@ -2,29 +2,44 @@
 A module that contains constructors for materials and components.
 """
 
+import numpy as np
+
+TABULATED_PROPERTIES = ('conductivity', 'cp', 'emissivity') # Properties that may depend on temperature
+
 
 class Material:
     """
     Represents a material with its properties.
-    
+
     Parameters:
         name (str): The name of the material.
         conductivity (float): The thermal conductivity of the material.
         specific_heat (float): The specific heat capacity of the material.
         density (float): The density of the material.
+        tables (dict): Temperature-dependent properties, {property: (temperatures, values)} for any of
+                       conductivity, cp and emissivity, linear between the samples and constant beyond them.
+                       The scalar values are kept as the nominal properties (default: no tables).
     """
-    def __init__(self, name, conductivity, specific_heat, emissivity, absorptivity):
+    def __init__(self, name, conductivity, specific_heat, emissivity, absorptivity, tables=None):
         self.name = name
         self.conductivity = conductivity
         self.cp = specific_heat
         self.emissivity = emissivity
         self.absorptivity = absorptivity
+        self.tables = {}
+        for prop, (temperatures, values) in (tables or {}).items():
+            if prop not in TABULATED_PROPERTIES:
+                raise ValueError(f"Unknown material property {prop!r}, expected one of {TABULATED_PROPERTIES}")
+            temperatures, values = np.array(temperatures, dtype=float), np.array(values, dtype=float)
+            if temperatures.ndim != 1 or temperatures.shape != values.shape or len(temperatures) < 2 or np.any(np.diff(temperatures) <= 0):
+                raise ValueError(f"The {prop} table of {name} needs at least two samples at increasing temperatures")
+            self.tables[prop] = (temperatures, values)
 
 
 class Component(Material):
     """
     Represents a component with its properties.
-    
+
     Parameters:
         name (str): The name of the component.
         power (float): The power of the component.
@@ -33,7 +48,7 @@ class Component(Material):
         efficiency (float): The efficiency of the component.
     """
     def __init__(self, name, power, material, efficiency):
-        super().__init__(material.name, material.conductivity, material.cp, material.emissivity, material.absorptivity)
+        super().__init__(material.name, material.conductivity, material.cp, material.emissivity, material.absorptivity, material.tables)
         self.name = name
         self.power = power
         self.efficiency = efficiency
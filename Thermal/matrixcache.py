@@ -0,0 +1,109 @@
+"""
+A module that contains a content-addressed on-disk cache for the matrices of the thermal model.
+"""
+
+import hashlib
+import os
+import zipfile
+import numpy as np
+from scipy.sparse import csr_matrix
+
+CACHE_VERSION = 2 # Bump when the way the matrices are computed changes, to invalidate old entries
+
+
+def model_hash(table, rows: np.ndarray) -> str:
+    """
+    Calculate a hash of everything the view factor and conductance matrices depend on: the node order,
+    positions, normal angles, areas, conductivities and contacts. Temperatures and component powers are
+    not part of the hash, so changing them keeps the cached matrices valid.
+
+    Parameters:
+        table (NodeTable): Table of the nodes.
+        rows (numpy.ndarray): Table rows of the nodes of the thermal model, in row order.
+
+    Returns:
+        str: Hexadecimal digest identifying the geometry of the model.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    digest = hashlib.sha256()
+    digest.update(np.array([CACHE_VERSION, len(rows)], dtype=np.int64).tobytes())
+    digest.update(repr(table.keys[rows].tolist()).encode())
+    digest.update(np.ascontiguousarray(table.positions[rows]).tobytes())
+    digest.update(np.ascontiguousarray(np.stack([table.areas[rows], table.conductivities[rows]])).tobytes())
+
+    # Contacts leaving the nodes of the model, ordered by node and neighbour row
+    node_indices = np.full(len(table), -1)
+    node_indices[rows] = np.arange(len(rows))
+    contact_rows = table.contact_rows
+    starts = node_indices[contact_rows[:, 0]]
+    contacts = np.flatnonzero(starts >= 0)
+    contacts = contacts[np.lexsort((contact_rows[contacts, 1], starts[contacts]))]
+    neighbor_rows = contact_rows[contacts, 1]
+    digest.update(starts[contacts].tobytes())
+    digest.update(repr(table.keys[neighbor_rows].tolist()).encode())
+    digest.update(np.ascontiguousarray(np.stack([table.contact_areas[contacts], table.conductivities[neighbor_rows]])).tobytes())
+    return digest.hexdigest()
+
+
+def cache_path(cache_dir: str, digest: str) -> str:
+    """
+    Get the path of the cache file for a model hash.
+
+    Parameters:
+        cache_dir (str): Directory of the cache.
+        digest (str): Hash of the model, see model_hash.
+
+    Returns:
+        str: Path of the .npz file.
+    """
+    return os.path.join(cache_dir, f"matrices_{digest}.npz")
+
+
+def load_matrices(cache_dir: str, digest: str):
+    """
+    Load the view factor and conductance matrices of a model from the cache.
+
+    Parameters:
+        cache_dir (str): Directory of the cache.
+        digest (str): Hash of the model, see model_hash.
+
+    Returns:
+        tuple or None: (vf_matrix, gl_matrix), or None if the model is not in the cache.
+    """
+    path = cache_path(cache_dir, digest)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            vf_matrix = data['vf_matrix']
+            gl_matrix = csr_matrix((data['gl_data'], data['gl_indices'], data['gl_indptr']), shape=tuple(data['gl_shape']))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None # Unreadable entry, it is recomputed and overwritten
+    return vf_matrix, gl_matrix
+
+
+def save_matrices(cache_dir: str, digest: str, vf_matrix: np.ndarray, gl_matrix: csr_matrix) -> None:
+    """
+    Store the view factor and conductance matrices of a model in the cache. The file is written under a
+    temporary name first, so concurrent runs never read a partial entry. The cache is best-effort: if the
+    entry cannot be written the temporary file is removed and the model continues without caching.
+
+    Parameters:
+        cache_dir (str): Directory of the cache.
+        digest (str): Hash of the model, see model_hash.
+        vf_matrix (numpy.ndarray): View factor matrix.
+        gl_matrix (scipy.sparse.csr_matrix): Linear conductance matrix.
+    """
+    path = cache_path(cache_dir, digest)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(temporary_path, 'wb') as file:
+            np.savez(file, vf_matrix=vf_matrix, gl_data=gl_matrix.data, gl_indices=gl_matrix.indices,
+                     gl_indptr=gl_matrix.indptr, gl_shape=np.array(gl_matrix.shape))
+        os.replace(temporary_path, path)
+    except OSError:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
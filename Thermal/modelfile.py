@@ -0,0 +1,273 @@
+"""
+A module that contains the declarative model file format and its cached binary sidecar.
+
+A model file is JSON holding the node table of a spacecraft column by column, so many configurations can be
+kept as data instead of Python literals. Parsing it is slow for large models, so the arrays are cached in a
+.sidecar.npz file next to it, keyed by a hash of the JSON, and later loads read only the sidecar.
+
+Layout of the model file:
+    version: MODEL_VERSION.
+    columns: One list per column of the node table, in row order: keys, names, areas, masses, conductivities,
+             specific_heats, emissivities, absorptivities, temperatures, gammas, radiating_bodies, positions and
+             heat_loads, see NodeTable. Keys are all integers or all strings.
+    mli: MLI stack by node key, for the nodes that have one, see Node.
+    tables: Temperature-dependent properties {property: [temperatures, values]} by node key, see Material.
+    contacts: rows [[row, neighbor_row], ...] and areas of the directed contacts, see NodeTable.
+    modes: Operating modes as named overlays {mode: {column: {key: value}}} on the float columns, for example
+           the heat loads of the components that are switched off in standby.
+"""
+
+import hashlib
+import json
+import os
+import zipfile
+import numpy as np
+from materials import TABULATED_PROPERTIES
+from nodetable import NodeTable
+
+MODEL_VERSION = 1 # Bump when the layout of the model file changes
+SIDECAR_VERSION = 1 # Bump when the layout of the sidecar changes, to invalidate old sidecars
+FLOAT_COLUMNS = ('areas', 'masses', 'conductivities', 'specific_heats', 'emissivities', 'absorptivities', 'temperatures',
+                 'gammas', 'heat_loads')
+ARRAY_COLUMNS = ('keys', 'names', 'radiating_bodies', 'positions') + FLOAT_COLUMNS # Columns stored as plain arrays in the sidecar
+
+
+def sidecar_path(path: str) -> str:
+    """
+    Get the path of the binary sidecar of a model file.
+
+    Parameters:
+        path (str): Path of the model file.
+
+    Returns:
+        str: Path of the .sidecar.npz file.
+    """
+    return f"{os.path.splitext(path)[0]}.sidecar.npz"
+
+
+def apply_mode(table: NodeTable, overlay: dict) -> None:
+    """
+    Apply an operating mode to a node table, replacing the values that the overlay lists.
+
+    Parameters:
+        table (NodeTable): The table, modified in place.
+        overlay (dict): Values {column: {key: value}} of float columns, see FLOAT_COLUMNS.
+    """
+    for column, values in overlay.items():
+        if column not in FLOAT_COLUMNS:
+            raise ValueError(f"Modes can only change the columns {FLOAT_COLUMNS}, not {column!r}")
+        rows = [table.row(key) for key in values]
+        getattr(table, column)[rows] = list(values.values())
+
+
+def save_model(path: str, table: NodeTable, modes: dict = None) -> None:
+    """
+    Write a node table and its operating modes to a model file.
+
+    Parameters:
+        path (str): Path of the model file.
+        table (NodeTable): The nodes and contacts of the model.
+        modes (dict): Overlays {mode: {column: {key: value}}}, see apply_mode (default: no modes).
+    """
+    keys = table.keys.tolist()
+    if not (all(isinstance(key, int) for key in keys) or all(isinstance(key, str) for key in keys)):
+        raise ValueError("The node keys of a model file must be all integers or all strings")
+    columns = {name: getattr(table, name).tolist() for name in ARRAY_COLUMNS}
+    model = {
+        'version': MODEL_VERSION,
+        'columns': columns,
+        'mli': {str(keys[row]): table.mli[row] for row in np.flatnonzero(table.mli.astype(bool))},
+        'tables': {str(keys[row]): {prop: [samples[0].tolist(), samples[1].tolist()] for prop, samples in table.tables[row].items()}
+                   for row in np.flatnonzero(table.tables.astype(bool))},
+        'contacts': {'rows': table.contact_rows.tolist(), 'areas': table.contact_areas.tolist()},
+        'modes': {mode: {column: {str(key): float(value) for key, value in values.items()} for column, values in overlay.items()}
+                  for mode, overlay in (modes or {}).items()},
+    }
+    # One line per column, contact list and mode, so the file stays readable and diffs stay small
+    sections = []
+    for section, content in model.items():
+        if isinstance(content, dict) and content:
+            entries = ',\n'.join(f"    {json.dumps(name)}: {json.dumps(value)}" for name, value in content.items())
+            sections.append(f"  {json.dumps(section)}: {{\n{entries}\n  }}")
+        else:
+            sections.append(f"  {json.dumps(section)}: {json.dumps(content)}")
+    with open(path, 'w') as file:
+        file.write('{\n' + ',\n'.join(sections) + '\n}\n')
+
+
+def parse_model(model: dict) -> dict:
+    """
+    Convert the content of a model file to the arrays of its sidecar.
+
+    Parameters:
+        model (dict): Decoded JSON of the model file.
+
+    Returns:
+        dict: Arrays of the columns and contacts (contact_rows, contact_areas), and under extras the MLI
+              stacks, property tables and modes by row.
+    """
+    if model.get('version') != MODEL_VERSION:
+        raise ValueError(f"Unsupported model file version {model.get('version')}, expected {MODEL_VERSION}")
+    columns = model['columns']
+    missing = [name for name in ARRAY_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"The model file has no columns {missing}")
+    keys = columns['keys']
+    if not (all(isinstance(key, int) for key in keys) or all(isinstance(key, str) for key in keys)):
+        raise ValueError("The node keys of a model file must be all integers or all strings")
+    rows = {str(key): row for row, key in enumerate(keys)}
+    if len(rows) != len(keys):
+        raise ValueError("The node keys of the model file are not unique")
+
+    def row_of(key, section):
+        if key not in rows:
+            raise ValueError(f"The {section} of the model file refer to unknown node {key!r}")
+        return rows[key]
+
+    arrays = {name: np.array(columns[name], dtype=float) for name in FLOAT_COLUMNS}
+    arrays['keys'] = np.array(keys, dtype=np.int64 if keys and isinstance(keys[0], int) else str)
+    arrays['names'] = np.array(columns['names'], dtype=str)
+    arrays['radiating_bodies'] = np.array(columns['radiating_bodies'], dtype=str)
+    arrays['positions'] = np.array(columns['positions'], dtype=float).reshape(-1, 2, 3)
+    contacts = model.get('contacts', {})
+    arrays['contact_rows'] = np.array(contacts.get('rows', []), dtype=np.int64).reshape(-1, 2)
+    arrays['contact_areas'] = np.array(contacts.get('areas', []), dtype=float)
+
+    tables = {}
+    for key, properties in model.get('tables', {}).items():
+        for prop, (temperatures, values) in properties.items():
+            if prop not in TABULATED_PROPERTIES:
+                raise ValueError(f"Unknown material property {prop!r} of node {key}, expected one of {TABULATED_PROPERTIES}")
+            if len(temperatures) < 2 or len(temperatures) != len(values) or np.any(np.diff(temperatures) <= 0):
+                raise ValueError(f"The {prop} table of node {key} needs at least two samples at increasing temperatures")
+        tables[row_of(key, 'tables')] = properties
+    modes = {}
+    for mode, overlay in model.get('modes', {}).items():
+        for column in overlay:
+            if column not in FLOAT_COLUMNS:
+                raise ValueError(f"Mode {mode!r} changes the column {column!r}, modes can only change {FLOAT_COLUMNS}")
+        modes[mode] = {column: [[row_of(key, 'modes') for key in values], list(values.values())] for column, values in overlay.items()}
+    arrays['extras'] = {'mli': {row_of(key, 'mli'): layers for key, layers in model.get('mli', {}).items()},
+                        'tables': tables, 'modes': modes}
+    return arrays
+
+
+def load_sidecar(path: str, digest: str):
+    """
+    Load the arrays of a model file from its sidecar.
+
+    Parameters:
+        path (str): Path of the sidecar.
+        digest (str): Hash of the content of the model file.
+
+    Returns:
+        dict or None: Arrays, see parse_model, or None if the sidecar is missing, unreadable or stale.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            if int(data['version']) != SIDECAR_VERSION or str(data['digest']) != digest:
+                return None
+            arrays = {name: data[name] for name in ARRAY_COLUMNS + ('contact_rows', 'contact_areas')}
+            extras = json.loads(str(data['extras']))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None # Unreadable sidecar, it is rebuilt from the model file
+    # JSON object keys are strings, the rows are integers again
+    arrays['extras'] = {section: {int(row): value for row, value in content.items()} if section != 'modes' else content
+                        for section, content in extras.items()}
+    return arrays
+
+
+def save_sidecar(path: str, digest: str, arrays: dict) -> None:
+    """
+    Store the arrays of a model file in its sidecar. The file is written under a temporary name first, and
+    the sidecar is best-effort: if it cannot be written the model is parsed again on the next load.
+
+    Parameters:
+        path (str): Path of the sidecar.
+        digest (str): Hash of the content of the model file.
+        arrays (dict): Arrays, see parse_model.
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_path, 'wb') as file:
+            np.savez(file, version=SIDECAR_VERSION, digest=digest, extras=json.dumps(arrays['extras']),
+                     **{name: values for name, values in arrays.items() if name != 'extras'})
+        os.replace(temporary_path, path)
+    except OSError:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+
+
+def read_model(path: str) -> dict:
+    """
+    Read the arrays of a model file, from its sidecar when it is up to date, or else by parsing the file
+    and refreshing the sidecar.
+
+    Parameters:
+        path (str): Path of the model file.
+
+    Returns:
+        dict: Arrays, see parse_model.
+    """
+    with open(path, 'rb') as file:
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    arrays = load_sidecar(sidecar_path(path), digest)
+    if arrays is None:
+        arrays = parse_model(json.loads(content))
+        save_sidecar(sidecar_path(path), digest, arrays)
+    return arrays
+
+
+def model_modes(path: str) -> list:
+    """
+    Get the operating modes of a model file.
+
+    Parameters:
+        path (str): Path of the model file.
+
+    Returns:
+        list: Names of the modes.
+    """
+    return list(read_model(path)['extras']['modes'])
+
+
+def load_model(path: str, mode: str = None) -> NodeTable:
+    """
+    Load a model file into a node table, with an operating mode applied.
+
+    Parameters:
+        path (str): Path of the model file.
+        mode (str): Name of the operating mode (default: the values of the columns, without overlay).
+
+    Returns:
+        NodeTable: The nodes and contacts of the model.
+    """
+    arrays = read_model(path)
+    extras = arrays['extras']
+    node_count = len(arrays['keys'])
+    columns = {name: arrays[name] for name in ARRAY_COLUMNS}
+    columns['keys'] = arrays['keys'].astype(object)
+    columns['names'] = arrays['names'].astype(object)
+    if extras['mli']:
+        columns['mli'] = np.full(node_count, None)
+        for row, layers in extras['mli'].items():
+            columns['mli'][row] = layers
+    if extras['tables']:
+        columns['tables'] = np.empty(node_count, dtype=object)
+        columns['tables'].fill({})
+        for row, properties in extras['tables'].items():
+            columns['tables'][row] = {prop: (np.array(temperatures, dtype=float), np.array(values, dtype=float))
+                                      for prop, (temperatures, values) in properties.items()}
+    table = NodeTable.from_columns(columns, arrays['contact_rows'], arrays['contact_areas'])
+
+    if mode is not None:
+        if mode not in extras['modes']:
+            raise ValueError(f"Unknown mode {mode!r}, the model file has the modes {list(extras['modes'])}")
+        for column, (rows, values) in extras['modes'][mode].items():
+            getattr(table, column)[rows] = values
+    return table
@@ -6,11 +6,15 @@ from constants import Constants as C
 from materials import Material as Mat
 from materials import Component as Comp
 from thermalmodel_v4 import Node
+from nodetable import NodeTable
+from modelfile import apply_mode, load_model
 
 # Structures
 Aluminium = Mat("Aluminium", 237, 897, 0.9, 0.3)
 Steel = Mat("Steel", 50, 500, 0.9, 0.3)
 
+# Nominal component powers, the operating modes below the contacts switch them
+
 # ADCS
 Cmg = Comp("Control Moment Gyroscope", 640, Aluminium, 0.1)
 Gnss = Comp("GNSS", 4.4, Aluminium, 0.1)
@@ -18,13 +22,6 @@ Accelerometer = Comp("Accelerometer", 1.12, Aluminium, 0.1)
 Stim210 = Comp('Gyroscope', 3, Aluminium, 0.1)
 Mag3 = Comp('Magnetometer', 1.7, Aluminium, 0.1)
 St400 = Comp('Star Tracker', 2, Aluminium, 0.1)
-# standby
-# Cmg = Comp("Control Moment Gyroscope", 0, Aluminium, 0.1)
-# Gnss = Comp("GNSS", 0, Aluminium, 0.1)
-# Accelerometer = Comp("Accelerometer", 0, Aluminium, 0.1)
-# Stim210 = Comp('Gyroscope', 0, Aluminium, 0.1)
-# Mag3 = Comp('Magnetometer', 0, Aluminium, 0.1)
-# St400 = Comp('Star Tracker', 0, Aluminium, 0.1)
 
 # EPS
 GalliumArsenide = Mat("Gallium Arsenide", 40, 340, 0.8, 0.8)
@@ -34,48 +31,24 @@ Smrt2805D = Comp("DC-DC Converter", 30, Aluminium, 0.1)
 Mw1000DD24L = Comp("DC-DC Converter", 1000, Aluminium, 0.12)
 FrontPanel = Mat("Front Panel", C.k_ga, C.cp_ga, 0.899, 0.92)
 BackPanel = Mat("Back Panel", C.k_al, C.cp_al, 0.01, 0.5)
-# standby
-# GalliumArsenide = Mat("Gallium Arsenide", 40, 340, 0.8, 0.8)
-# Vl51es = Comp("Batteries", 0, Aluminium, 0.01) # Check efficiency
-# EvoPCDU = Comp("Power Control and Distribution Unit", 0, Aluminium, 0.1)
-# Smrt2805D = Comp("DC-DC Converter", 0, Aluminium, 0.1)	
-# Mw1000DD24L = Comp("DC-DC Converter", 0, Aluminium, 0.12)
-# FrontPanel = Mat("Front Panel", C.k_ga, C.cp_ga, 0.899, 0.92)
-# BackPanel = Mat("Back Panel", C.k_al, C.cp_al, 0.01, 0.5)
 
 # CDH
 Leon4FT = Comp("Onboard Computer", 4, Aluminium, 0.1)
 StOBC = Comp("Onboard Computer", 4.8, Aluminium, 0.1)
 SwOBC = Comp("SpaceWire", 3, Aluminium, 0.1)
-# standby
-# Leon4FT = Comp("Onboard Computer", 4, Aluminium, 0.1)
-# StOBC = Comp("Onboard Computer", 4.8, Aluminium, 0.1)
-# SwOBC = Comp("SpaceWire", 3, Aluminium, 0.1)
 
 # Docking
 AmsV5618LA10P = Comp("Docking System", 67.2, Aluminium, 0.1)
 AmsV4118CA01 = Comp("Docking System", 48, Aluminium, 0.1)
-# standby
-# AmsV5618LA10P = Comp("Docking System", 0, Aluminium, 0.1)
-# AmsV4118CA01 = Comp("Docking System", 0, Aluminium, 0.1)
 
-# Robotics
-# Vispa = Comp("Robotic Arm", 350, Aluminium, 0.1)
-# nominal
+# Robotics, 350 W at peak, see modes
 Vispa = Comp("Robotic Arm", 80, Aluminium, 0.1)
-# standby
-# Vispa = Comp("Robotic Arm", 0, Aluminium, 0.1)
 
 # Communications
 Victs = Comp("Antenna", 75, Aluminium, 0.1)
 Swift = Comp("Transmitter", 50, Aluminium, 0.1)
 Para = Comp('Paradigm', 51, Aluminium, 0.1)
 Erz = Comp('ERZ', 120, Aluminium, 0.1)
-# standby
-# Victs = Comp("Antenna", 0, Aluminium, 0.1)
-# Swift = Comp("Transmitter", 0, Aluminium, 0.1)
-# Para = Comp('Paradigm', 0, Aluminium, 0.1)
-# Erz = Comp('ERZ', 0, Aluminium, 0.1)
 
 # Thermal
 Rad = Comp("Radiators", -200, Aluminium, 1)
@@ -936,19 +909,38 @@ neighbor_mapping = {
 }
 
 
-def construct_nodes(node_data=node_data, neighbor_mapping=neighbor_mapping):
+# Operating modes, as overlays {column: {key: value}} on the nominal node table, see modelfile.apply_mode
+standby_components = [Cmg, Gnss, Accelerometer, Stim210, Mag3, St400, Vl51es, EvoPCDU, Smrt2805D, Mw1000DD24L,
+                      AmsV5618LA10P, AmsV4118CA01, Vispa, Victs, Swift, Para, Erz]
+modes = {
+    'nominal': {},
+    'standby': {'heat_loads': {data['key']: 0.0 for data in node_data
+                               if any(data['material'] is component for component in standby_components)}},
+    'vispa_peak': {'heat_loads': {data['key']: 350 * Vispa.efficiency for data in node_data if data['material'] is Vispa}},
+}
+
+
+def construct_nodes(node_data=node_data, neighbor_mapping=neighbor_mapping, mode=None, model_file=None):
     """
     Constructs nodes and sets up their neighbor relationships.
 
     Parameters:
         node_data (list): A list of dictionaries, each containing data for initializing a Node.
         neighbor_mapping (dict): A dictionary mapping node indices to lists of tuples (neighbor index, contact area).
+        mode (str): Operating mode to apply, from modes or from the model file (default: nominal).
+        model_file (str): Model file to load the nodes from instead of node_data and neighbor_mapping, see
+                          modelfile.load_model (default: none).
 
     Returns:
         A list of constructed Node instances with neighbor relationships set.
     """
-    # Construct nodes
-    nodes = [Node(**data) for data in node_data]
+    if model_file is not None:
+        table = load_model(model_file, mode)
+        return [Node.view(table, row) for row in range(len(table))]
+
+    # Construct nodes as views on one table
+    table = NodeTable(len(node_data))
+    nodes = [Node(**data, table=table) for data in node_data]
     # print(neighbor_mapping.items())
     # Add neighbors based on mapping
     # for node_index, neighbors in neighbor_mapping.items():
@@ -968,5 +960,9 @@ def construct_nodes(node_data=node_data, neighbor_mapping=neighbor_mapping):
             neighbor_node = nodes_dict[neighbor_key]
             current_node.add_neighbor(neighbor_node, contact_area)
 
+    if mode is not None:
+        if mode not in modes:
+            raise ValueError(f"Unknown mode {mode!r}, expected one of {list(modes)}")
+        apply_mode(table, modes[mode])
     return nodes
 
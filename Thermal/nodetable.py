@@ -0,0 +1,389 @@
+"""
+A module that contains the columnar storage of the nodes of a thermal model.
+"""
+
+import numpy as np
+
+RADIATING_BODY_LENGTH = 16 # Characters stored for the radiating body of a node
+
+
+def _column(name: str, doc: str) -> property:
+    """
+    Make a read-only property returning the used rows of a column of the table, as a view.
+
+    Parameters:
+        name (str): Name of the column.
+        doc (str): Docstring of the property.
+
+    Returns:
+        property: The property.
+    """
+    return property(lambda table: table._columns[name][:table.size], doc=doc)
+
+
+class NodeTable:
+    """
+    Columnar storage of the nodes of a thermal model: one contiguous array per property, indexed by node row,
+    and an edge list of the contacts between nodes. Node objects are thin views on a row of the table, and the
+    thermal model reads whole columns instead of collecting attributes node by node, so the arrays reach the
+    solver without per-node copies. Rows and contacts are appended into arrays that grow geometrically, so
+    memory stays linear in the number of nodes and contacts.
+
+    A contact is directed: the contact from a row to a neighbouring row conducts with the conductivity of the
+    neighbour, see ThermalModel.compute_conductance_matrix. Node.add_neighbor adds both directions.
+
+    Attributes:
+        size (int): Number of rows.
+        contact_count (int): Number of contacts.
+    """
+
+    __slots__ = ['size', 'contact_count', '_columns', '_contact_rows', '_contact_areas', '_rows', '_contacts', '_adjacency']
+
+    keys = _column('keys', "numpy.ndarray: Node keys, of object dtype.")
+    names = _column('names', "numpy.ndarray: Node names, of object dtype.")
+    areas = _column('areas', "numpy.ndarray: Node areas. m^2")
+    masses = _column('masses', "numpy.ndarray: Node masses. kg")
+    conductivities = _column('conductivities', "numpy.ndarray: Nominal thermal conductivities. W/mK")
+    specific_heats = _column('specific_heats', "numpy.ndarray: Nominal specific heat capacities. J/kgK")
+    emissivities = _column('emissivities', "numpy.ndarray: Emissivities, for MLI nodes the effective emissivity at the node temperature.")
+    absorptivities = _column('absorptivities', "numpy.ndarray: Absorptivities.")
+    temperatures = _column('temperatures', "numpy.ndarray: Temperatures. K")
+    gammas = _column('gammas', "numpy.ndarray: Angles between the nodes and their radiating body. degrees")
+    radiating_bodies = _column('radiating_bodies', "numpy.ndarray: Radiating body of each node (earth, sun or internal).")
+    positions = _column('positions', "numpy.ndarray: Positions [x, y, z] (m) and normal angles [theta_xy, theta_yz, theta_xz] (degrees), of shape (N, 2, 3).")
+    heat_loads = _column('heat_loads', "numpy.ndarray: Internal heat loads. W")
+    mli = _column('mli', "numpy.ndarray: MLI stack of each node, see Node, or None.")
+    tables = _column('tables', "numpy.ndarray: Temperature-dependent material properties of each node, see Material.")
+
+    def __init__(self, capacity: int = 64) -> None:
+        """
+        Initializes an empty table.
+
+        Parameters:
+            capacity (int): Number of rows and of contacts allocated up front (default: 64).
+        """
+        capacity = max(int(capacity), 1)
+        self.size = 0
+        self.contact_count = 0
+        self._columns = {
+            'keys': np.empty(capacity, dtype=object),
+            'names': np.empty(capacity, dtype=object),
+            'areas': np.zeros(capacity),
+            'masses': np.zeros(capacity),
+            'conductivities': np.zeros(capacity),
+            'specific_heats': np.zeros(capacity),
+            'emissivities': np.zeros(capacity),
+            'absorptivities': np.zeros(capacity),
+            'temperatures': np.zeros(capacity),
+            'gammas': np.zeros(capacity),
+            'radiating_bodies': np.zeros(capacity, dtype=f'<U{RADIATING_BODY_LENGTH}'),
+            'positions': np.zeros((capacity, 2, 3)),
+            'heat_loads': np.zeros(capacity),
+            'mli': np.empty(capacity, dtype=object),
+            'tables': np.empty(capacity, dtype=object),
+        }
+        self._contact_rows = np.zeros((capacity, 2), dtype=np.int64)
+        self._contact_areas = np.zeros(capacity)
+        self._rows = {}
+        self._contacts = {}
+        self._adjacency = {}
+
+    @classmethod
+    def from_columns(cls, columns: dict, contact_rows: np.ndarray, contact_areas: np.ndarray):
+        """
+        Create a table directly from whole columns, without appending row by row. The arrays are used as
+        they are when they have the dtype of the column.
+
+        Parameters:
+            columns (dict): Arrays by column name, see the properties of the table. The mli and tables columns
+                            may be left out for nodes without MLI and property tables.
+            contact_rows (numpy.ndarray): Rows of the node and of the neighbour of each contact, of shape (E, 2).
+            contact_areas (numpy.ndarray): Contact area of each contact, of shape (E,). m^2
+
+        Returns:
+            NodeTable: The table.
+        """
+        table = cls(1)
+        size = len(columns['keys'])
+        for name, empty in table._columns.items():
+            if name in columns:
+                values = np.asarray(columns[name], dtype=empty.dtype)
+            elif name in ('mli', 'tables'):
+                values = np.full(size, None) if name == 'mli' else np.empty(size, dtype=object)
+                if name == 'tables':
+                    values.fill({})
+            else:
+                raise ValueError(f"Column {name} is missing")
+            if values.shape != (size,) + empty.shape[1:]:
+                raise ValueError(f"Column {name} has shape {values.shape}, expected {(size,) + empty.shape[1:]}")
+            table._columns[name] = values
+        table._contact_rows = np.asarray(contact_rows, dtype=np.int64).reshape(-1, 2)
+        table._contact_areas = np.asarray(contact_areas, dtype=float)
+        if len(table._contact_areas) != len(table._contact_rows):
+            raise ValueError("Every contact needs a contact area")
+        if len(table._contact_rows) and (table._contact_rows.min() < 0 or table._contact_rows.max() >= size):
+            raise ValueError("Contacts refer to rows outside the table")
+        table.size = size
+        table.contact_count = len(table._contact_areas)
+        table._rows = None # Indexed on first use
+        table._contacts = None
+        table._adjacency = None
+        return table
+
+    def __len__(self) -> int:
+        """
+        Returns the number of rows.
+
+        Returns:
+            int: Number of rows.
+        """
+        return self.size
+
+    def __contains__(self, key) -> bool:
+        """
+        Check whether a node key has a row in the table.
+
+        Parameters:
+            key: Node key.
+
+        Returns:
+            bool: True if the key has a row.
+        """
+        return key in self._row_index()
+
+    @property
+    def contact_rows(self) -> np.ndarray:
+        """
+        Get the rows of the node and of the neighbour of each contact, as a view.
+
+        Returns:
+            numpy.ndarray: Array of shape (E, 2).
+        """
+        return self._contact_rows[:self.contact_count]
+
+    @property
+    def contact_areas(self) -> np.ndarray:
+        """
+        Get the contact area of each contact, as a view.
+
+        Returns:
+            numpy.ndarray: Array of shape (E,). m^2
+        """
+        return self._contact_areas[:self.contact_count]
+
+    def row(self, key) -> int:
+        """
+        Get the row of a node.
+
+        Parameters:
+            key: Node key.
+
+        Returns:
+            int: Row of the node.
+        """
+        return self._row_index()[key]
+
+    def append(self, key, name: str, area: float, mass: float, conductivity: float, specific_heat: float, emissivity: float,
+               absorptivity: float, temperature: float, gamma: float, radiating_body: str, position: list,
+               heat_load: float = 0.0, mli: list = None, tables: dict = None) -> int:
+        """
+        Append a row for a new node.
+
+        Parameters:
+            key: Unique identifier of the node.
+            name (str): Name of the node.
+            area (float): Incident area. m^2
+            mass (float): Mass. kg
+            conductivity (float): Nominal thermal conductivity. W/mK
+            specific_heat (float): Nominal specific heat capacity. J/kgK
+            emissivity (float): Emissivity.
+            absorptivity (float): Absorptivity.
+            temperature (float): Temperature. K
+            gamma (float): Angle between the node and its radiating body. degrees
+            radiating_body (str): Radiating body (earth, sun or internal).
+            position (list): Position and normal angles ([x, y, z], [theta_xy, theta_yz, theta_xz]), see Node.
+            heat_load (float): Internal heat load (default: 0). W
+            mli (list): MLI stack of the node, see Node (default: none).
+            tables (dict): Temperature-dependent material properties, see Material (default: none).
+
+        Returns:
+            int: Row of the node.
+        """
+        if key in self._row_index():
+            raise ValueError(f"Node {key!r} already has a row in the table")
+        position = np.asarray(position, dtype=float)
+        if position.shape != (2, 3):
+            raise ValueError(f"The position of node {key!r} must be ([x, y, z], [theta_xy, theta_yz, theta_xz]), got shape {position.shape}")
+        if len(radiating_body) > RADIATING_BODY_LENGTH:
+            raise ValueError(f"The radiating body of node {key!r} is longer than {RADIATING_BODY_LENGTH} characters")
+        if self.size == len(self._columns['areas']):
+            self._grow_rows(2 * self.size)
+        row = self.size
+        values = {'keys': key, 'names': name, 'areas': area, 'masses': mass, 'conductivities': conductivity,
+                  'specific_heats': specific_heat, 'emissivities': emissivity, 'absorptivities': absorptivity,
+                  'temperatures': temperature, 'gammas': gamma, 'radiating_bodies': radiating_body, 'positions': position,
+                  'heat_loads': heat_load, 'mli': mli, 'tables': {} if tables is None else tables}
+        for column, value in values.items():
+            self._columns[column][row] = value
+        self._row_index()[key] = row
+        self.size += 1
+        return row
+
+    def insert(self, table, row: int) -> int:
+        """
+        Copy a row of another table into this one, with its contacts to nodes that this table holds. A row with
+        the same key is overwritten, and its contacts are replaced.
+
+        Parameters:
+            table (NodeTable): Table holding the node.
+            row (int): Row of the node in that table.
+
+        Returns:
+            int: Row of the node in this table.
+        """
+        key = table._columns['keys'][row]
+        if key in self._row_index():
+            target = self._row_index()[key]
+            for neighbor_row in self.neighbors(target)[0]:
+                self.remove_contact(target, neighbor_row)
+        else:
+            if self.size == len(self._columns['areas']):
+                self._grow_rows(2 * self.size)
+            target = self.size
+            self._row_index()[key] = target
+            self.size += 1
+        for column, values in self._columns.items():
+            values[target] = table._columns[column][row]
+
+        neighbor_rows, contact_areas = table.neighbors(row)
+        for neighbor_row, contact_area in zip(neighbor_rows, contact_areas):
+            neighbor_key = table._columns['keys'][neighbor_row]
+            if neighbor_key in self._row_index():
+                self.add_contact(target, self._row_index()[neighbor_key], contact_area)
+                reverse = table._contact_index().get((neighbor_row, row))
+                if reverse is not None:
+                    self.add_contact(self._row_index()[neighbor_key], target, table._contact_areas[reverse])
+        return target
+
+    def add_contact(self, row: int, neighbor_row: int, contact_area: float) -> bool:
+        """
+        Add a contact from a node to a neighbour, unless it already exists.
+
+        Parameters:
+            row (int): Row of the node.
+            neighbor_row (int): Row of the neighbour.
+            contact_area (float): Contact area between the nodes. m^2
+
+        Returns:
+            bool: True if the contact was added.
+        """
+        if (row, neighbor_row) in self._contact_index():
+            return False
+        if self.contact_count == len(self._contact_areas):
+            self._grow_contacts(2 * self.contact_count)
+        self._contact_rows[self.contact_count] = row, neighbor_row
+        self._contact_areas[self.contact_count] = contact_area
+        self._contact_index()[(row, neighbor_row)] = self.contact_count
+        self._neighbor_index().setdefault(row, {})[neighbor_row] = None
+        self.contact_count += 1
+        return True
+
+    def remove_contact(self, row: int, neighbor_row: int) -> None:
+        """
+        Remove the contact from a node to a neighbour, if it exists. The last contact takes its place in the edge list.
+
+        Parameters:
+            row (int): Row of the node.
+            neighbor_row (int): Row of the neighbour.
+        """
+        index = self._contact_index().pop((row, neighbor_row), None)
+        if index is None:
+            return
+        del self._neighbor_index()[row][neighbor_row]
+        last = self.contact_count - 1
+        if index != last:
+            moved = tuple(self._contact_rows[last].tolist())
+            self._contact_rows[index] = self._contact_rows[last]
+            self._contact_areas[index] = self._contact_areas[last]
+            self._contact_index()[moved] = index
+        self.contact_count = last
+
+    def neighbors(self, row: int) -> tuple:
+        """
+        Get the contacts of a node.
+
+        Parameters:
+            row (int): Row of the node.
+
+        Returns:
+            tuple: Rows of the neighbours and contact areas (m^2), in the order the contacts were added.
+        """
+        neighbor_rows = list(self._neighbor_index().get(row, ()))
+        contact_index = self._contact_index()
+        contacts = [contact_index[(row, neighbor_row)] for neighbor_row in neighbor_rows]
+        return np.array(neighbor_rows, dtype=np.int64), self._contact_areas[contacts]
+
+    def _row_index(self) -> dict:
+        """
+        Get the row of each node key, indexing the keys on first use.
+
+        Returns:
+            dict: Row by node key.
+        """
+        if self._rows is None:
+            self._rows = dict(zip(self.keys.tolist(), range(self.size)))
+            if len(self._rows) != self.size:
+                raise ValueError("The node keys of the table are not unique")
+        return self._rows
+
+    def _contact_index(self) -> dict:
+        """
+        Get the position of each contact in the edge list, indexing the contacts on first use.
+
+        Returns:
+            dict: Index by (row, neighbor_row).
+        """
+        if self._contacts is None:
+            self._contacts = dict(zip(map(tuple, self.contact_rows.tolist()), range(self.contact_count)))
+            if len(self._contacts) != self.contact_count:
+                raise ValueError("The contacts of the table are not unique")
+        return self._contacts
+
+    def _neighbor_index(self) -> dict:
+        """
+        Get the neighbours of each node, indexing the contacts on first use, so the contacts of a node are
+        found without scanning the edge list.
+
+        Returns:
+            dict: Neighbour rows by row, as dicts with keys in the order the contacts were added.
+        """
+        if self._adjacency is None:
+            self._adjacency = {}
+            for row, neighbor_row in self.contact_rows.tolist():
+                self._adjacency.setdefault(row, {})[neighbor_row] = None
+        return self._adjacency
+
+    def _grow_rows(self, capacity: int) -> None:
+        """
+        Reallocate the columns with room for more rows.
+
+        Parameters:
+            capacity (int): New number of rows.
+        """
+        for column, values in self._columns.items():
+            grown = np.zeros((max(capacity, 1),) + values.shape[1:], dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            self._columns[column] = grown
+
+    def _grow_contacts(self, capacity: int) -> None:
+        """
+        Reallocate the edge list with room for more contacts.
+
+        Parameters:
+            capacity (int): New number of contacts.
+        """
+        capacity = max(capacity, 1)
+        contact_rows, contact_areas = np.zeros((capacity, 2), dtype=np.int64), np.zeros(capacity)
+        contact_rows[:self.contact_count] = self.contact_rows
+        contact_areas[:self.contact_count] = self.contact_areas
+        self._contact_rows, self._contact_areas = contact_rows, contact_areas
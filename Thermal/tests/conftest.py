@@ -0,0 +1,68 @@
+"""
+Shared fixtures of the regression tests of the thermal model.
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # The modules import each other by plain name
+
+from materials import Material
+from nodes import construct_nodes, node_data
+from thermalmodel_v4 import Node, ThermalModel
+
+STEEL = Material("Steel", 16, 500, 0.3, 0.4, tables={'conductivity': ([200, 400], [10, 20]), 'cp': ([150, 350], [400, 900]),
+                                                      'emissivity': ([200, 300], [0.2, 0.5])})
+MLI = [{'temperature': 250, 'emissivity': 0.03, 'absorptivity': 0.1, 'cp': 1, 'area': 1, 'mass': 1, 'xi': 0.5},
+       {'temperature': 200, 'emissivity': 0.05, 'absorptivity': 0.1, 'cp': 1, 'area': 1, 'mass': 1, 'xi': 0.5}]
+
+
+def tabulated_nodes() -> list:
+    """
+    Build the spacecraft nodes plus three steel nodes with temperature-dependent properties, one of them with MLI.
+
+    Returns:
+        list: The nodes, views on one table.
+    """
+    nodes = construct_nodes()
+    for key, row, mli in ((900, 0, MLI), (901, 3, None), (902, 5, None)):
+        (x, y, z), angles = node_data[row]['position']
+        data = dict(node_data[row], key=key, name=f"Steel {key}", material=STEEL, position=[[x, y, z - 0.1], angles], mli=mli,
+                    table=nodes[0].table)
+        node = Node(**data)
+        node.add_neighbor(nodes[row], 0.01)
+        nodes.append(node)
+    return nodes
+
+
+def perturbed_temperatures(model: ThermalModel) -> np.ndarray:
+    """
+    Get node temperatures spread around the initial temperatures, so no two nodes are at the same temperature.
+
+    Parameters:
+        model (ThermalModel): The thermal model.
+
+    Returns:
+        numpy.ndarray: Array of node temperatures. K
+    """
+    return model.table.temperatures[model.rows] + np.linspace(-20, 30, len(model.rows))
+
+
+@pytest.fixture(scope='module')
+def model() -> ThermalModel:
+    """The spacecraft model without internal radiation."""
+    return ThermalModel(construct_nodes())
+
+
+@pytest.fixture(scope='module')
+def radiation_model() -> ThermalModel:
+    """The spacecraft model with internal radiation."""
+    return ThermalModel(construct_nodes(), internal_radiation=True)
+
+
+@pytest.fixture(scope='module')
+def tabulated_model() -> ThermalModel:
+    """The spacecraft model with internal radiation and the nodes of tabulated_nodes."""
+    return ThermalModel(tabulated_nodes(), internal_radiation=True)
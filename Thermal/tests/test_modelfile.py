@@ -0,0 +1,123 @@
+"""
+Regression tests of the declarative model file, its sidecar and the operating modes.
+"""
+
+import json
+import os
+import shutil
+import numpy as np
+import pytest
+import modelfile
+from modelfile import load_model, model_modes, save_model, sidecar_path
+from nodes import construct_nodes, modes
+from thermalmodel_v4 import ThermalModel
+from tests.conftest import tabulated_nodes
+
+SPACECRAFT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'spacecraft.json')
+NETWORK_ARRAYS = ('keys', 'areas', 'emissivities', 'emission_offsets', 'radiating_bodies', 'absorptivities', 'gammas',
+                  'thermal_masses', 'q_generated', 'property_tables')
+
+
+@pytest.fixture
+def spacecraft(tmp_path) -> str:
+    """A copy of the shipped model file, so its sidecar is written outside the repository."""
+    path = str(tmp_path / 'spacecraft.json')
+    shutil.copy(SPACECRAFT, path)
+    return path
+
+
+def assert_same_model(model: ThermalModel, expected: ThermalModel) -> None:
+    """
+    Check that two models hold exactly the same matrices and network arrays.
+
+    Parameters:
+        model (ThermalModel): The model under test.
+        expected (ThermalModel): The reference model.
+    """
+    np.testing.assert_array_equal(model.vf_matrix, expected.vf_matrix)
+    np.testing.assert_array_equal(model.gl_matrix.toarray(), expected.gl_matrix.toarray())
+    for name in NETWORK_ARRAYS:
+        np.testing.assert_array_equal(getattr(model.network, name), getattr(expected.network, name), err_msg=name)
+
+
+def test_shipped_model_file_is_up_to_date(tmp_path):
+    path = str(tmp_path / 'spacecraft.json')
+    save_model(path, construct_nodes()[0].table, modes)
+    with open(path) as saved, open(SPACECRAFT) as shipped:
+        assert saved.read() == shipped.read()
+
+
+@pytest.mark.parametrize('mode', [None] + list(modes))
+def test_model_file_matches_nodes(spacecraft, mode):
+    model = ThermalModel(construct_nodes(model_file=spacecraft, mode=mode))
+    expected = ThermalModel(construct_nodes(mode=mode))
+    assert_same_model(model, expected)
+    # Loading again reads the sidecar
+    assert os.path.exists(sidecar_path(spacecraft))
+    assert_same_model(ThermalModel(construct_nodes(model_file=spacecraft, mode=mode)), expected)
+
+
+def test_modes_change_heat_loads():
+    loads = {mode: ThermalModel(construct_nodes(mode=mode)).network.q_generated.sum() for mode in modes}
+    assert loads['standby'] < loads['nominal'] < loads['vispa_peak']
+    with pytest.raises(ValueError):
+        construct_nodes(mode='unknown')
+
+
+def test_sidecar_is_used_until_the_file_changes(spacecraft, monkeypatch):
+    table = load_model(spacecraft)
+    parse_model = modelfile.parse_model
+
+    def no_parsing(model):
+        raise AssertionError("The model file was parsed although its sidecar is up to date")
+
+    monkeypatch.setattr(modelfile, 'parse_model', no_parsing)
+    np.testing.assert_array_equal(load_model(spacecraft).areas, table.areas)
+
+    # Editing the model file makes the sidecar stale
+    with open(spacecraft) as file:
+        model = json.load(file)
+    model['columns']['areas'][0] *= 2
+    with open(spacecraft, 'w') as file:
+        json.dump(model, file)
+    with pytest.raises(AssertionError):
+        load_model(spacecraft)
+    monkeypatch.setattr(modelfile, 'parse_model', parse_model)
+    assert load_model(spacecraft).areas[0] == 2 * table.areas[0]
+
+    # A corrupt sidecar is rebuilt
+    with open(sidecar_path(spacecraft), 'wb') as file:
+        file.write(b'not a sidecar')
+    assert load_model(spacecraft).areas[0] == 2 * table.areas[0]
+
+
+def test_round_trip_keeps_mli_and_tables(tmp_path):
+    nodes = tabulated_nodes()
+    path = str(tmp_path / 'tabulated.json')
+    overlay = {'standby': {'heat_loads': {nodes[10].key: 0.0}}}
+    save_model(path, nodes[0].table, overlay)
+    assert model_modes(path) == ['standby']
+    loaded = ThermalModel(load_model(path), internal_radiation=True)
+    assert_same_model(loaded, ThermalModel(nodes, internal_radiation=True))
+    assert loaded.nodes[900].mli == nodes[-3].mli
+    assert load_model(path, 'standby').heat_loads[nodes[10].row] == 0.0
+
+
+def test_invalid_model_files_are_refused(spacecraft, tmp_path):
+    with pytest.raises(ValueError, match="Unknown mode"):
+        load_model(spacecraft, 'unknown')
+    with open(spacecraft) as file:
+        model = json.load(file)
+    invalid = {
+        'version': dict(model, version=0),
+        'mode column': dict(model, modes={'hot': {'keys': {'1': 2.0}}}),
+        'mode key': dict(model, modes={'hot': {'heat_loads': {'12345': 2.0}}}),
+        'table': dict(model, tables={'1': {'cp': [[300, 200], [1, 2]]}}),
+        'keys': dict(model, columns=dict(model['columns'], keys=[1] * len(model['columns']['keys']))),
+    }
+    for name, content in invalid.items():
+        path = str(tmp_path / f"{name}.json")
+        with open(path, 'w') as file:
+            json.dump(content, file)
+        with pytest.raises(ValueError):
+            load_model(path)
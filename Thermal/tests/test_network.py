@@ -0,0 +1,162 @@
+"""
+Regression tests of the heat balance, its Jacobian and the linearizations of ThermalNetwork.
+"""
+
+import pickle
+import numpy as np
+import pytest
+from kernels import CONDUCTIVITY
+from tests.conftest import perturbed_temperatures
+
+MODELS = ['model', 'radiation_model', 'tabulated_model']
+
+
+def reference_heat_balance(network, temperatures: np.ndarray, q_external: np.ndarray) -> np.ndarray:
+    """
+    Evaluate the heat balance with dense NumPy operations, as the baseline for the compiled kernel.
+
+    Parameters:
+        network (ThermalNetwork): The network.
+        temperatures (numpy.ndarray): Array of node temperatures. K
+        q_external (numpy.ndarray): Array of external heat fluxes on each node. W
+
+    Returns:
+        numpy.ndarray: Array of the rate of change of temperature for each node. K/s
+    """
+    conductance, radiation = network.conductance.toarray(), network.radiation.toarray()
+    if network.tabulated:
+        conductance = conductance * network.lookup(CONDUCTIVITY, temperatures)
+    fourth = temperatures ** 4
+    q_total = (network.q_generated + (conductance * (temperatures[None, :] - temperatures[:, None])).sum(axis=1)
+               + (radiation * (fourth[None, :] - fourth[:, None])).sum(axis=1))
+    emission = network.node_emissivities(temperatures) * network.sigma * network.areas * (fourth - network.T_space ** 4)
+    q_total += np.where(network.radiating, q_external - emission, 0)
+    return q_total / network.node_thermal_masses(temperatures)
+
+
+def finite_difference_jacobian(network, temperatures: np.ndarray, q_external: np.ndarray, step: float = 1e-3) -> np.ndarray:
+    """
+    Approximate the Jacobian of the heat balance by central differences.
+
+    Parameters:
+        network (ThermalNetwork): The network.
+        temperatures (numpy.ndarray): Array of node temperatures. K
+        q_external (numpy.ndarray): Array of external heat fluxes on each node. W
+        step (float): Temperature step. K
+
+    Returns:
+        numpy.ndarray: Dense Jacobian. 1/s
+    """
+    jacobian = np.empty((len(temperatures), len(temperatures)))
+    for column in range(len(temperatures)):
+        offset = np.zeros(len(temperatures))
+        offset[column] = step
+        jacobian[:, column] = (network.heat_balance(temperatures + offset, q_external)
+                               - network.heat_balance(temperatures - offset, q_external)) / (2 * step)
+    return jacobian
+
+
+@pytest.mark.parametrize('name', MODELS)
+def test_heat_balance_matches_reference(name, request):
+    model = request.getfixturevalue(name)
+    temperatures = perturbed_temperatures(model)
+    q_external = model.compute_external_flux(500.0, 20.0, 1000.0)
+    np.testing.assert_allclose(model.network.heat_balance(temperatures, q_external),
+                               reference_heat_balance(model.network, temperatures, q_external), rtol=1e-10, atol=1e-15)
+
+
+@pytest.mark.parametrize('name', MODELS)
+def test_batch_heat_balance_matches_single(name, request):
+    model = request.getfixturevalue(name)
+    temperatures = perturbed_temperatures(model) + np.array([[0.0], [15.0]])
+    q_external = np.stack([model.compute_external_flux(500.0, 20.0, 1000.0), model.compute_external_flux(700.0, 60.0, 4000.0)])
+    batch = model.network.heat_balance_batch(temperatures, q_external)
+    for scenario in range(2):
+        np.testing.assert_array_equal(batch[scenario], model.network.heat_balance(temperatures[scenario], q_external[scenario]))
+
+
+@pytest.mark.parametrize('name', MODELS)
+def test_jacobian_matches_finite_differences(name, request):
+    model = request.getfixturevalue(name)
+    temperatures = perturbed_temperatures(model)
+    q_external = model.compute_external_flux(500.0, 20.0, 1000.0)
+    expected = finite_difference_jacobian(model.network, temperatures, q_external)
+    jacobian = model.network.jacobian(temperatures, q_external).toarray()
+    np.testing.assert_allclose(jacobian, expected, rtol=0, atol=1e-7 * np.abs(expected).max())
+    if not model.network.tabulated:
+        # Without tabulated thermal masses the Jacobian does not depend on the flux
+        np.testing.assert_array_equal(model.network.jacobian(temperatures).toarray(), jacobian)
+
+
+def test_jacobian_batch_is_block_diagonal(tabulated_model):
+    network = tabulated_model.network
+    temperatures = perturbed_temperatures(tabulated_model) + np.array([[0.0], [15.0]])
+    batch = network.jacobian_batch(temperatures).toarray()
+    size = len(network)
+    for scenario in range(2):
+        block = slice(scenario * size, (scenario + 1) * size)
+        np.testing.assert_array_equal(batch[block, block], network.jacobian(temperatures[scenario]).toarray())
+    assert np.count_nonzero(batch[:size, size:]) == 0
+    assert network.jacobian_batch_sparsity(2).nnz == 2 * network.jacobian_sparsity().nnz
+
+
+def test_network_is_read_only_and_pickles(radiation_model):
+    network = radiation_model.network
+    assert not network.areas.flags.writeable
+    with pytest.raises(ValueError):
+        network.q_generated[0] = 1.0
+    copy = pickle.loads(pickle.dumps(network))
+    assert not copy.q_generated.flags.writeable
+    temperatures = perturbed_temperatures(radiation_model)
+    q_external = radiation_model.compute_external_flux(500.0, 20.0, 1000.0)
+    np.testing.assert_array_equal(copy.heat_balance(temperatures, q_external), network.heat_balance(temperatures, q_external))
+
+
+@pytest.mark.parametrize('name', MODELS)
+def test_steady_state_balances(name, request):
+    model = request.getfixturevalue(name)
+    temperatures = model.solve_steady_state(500.0, 20.0)
+    q_external = model.environment(500.0, 20.0).case_flux('average')
+    rates = model.network.heat_balance(temperatures, q_external)
+    assert np.abs(rates).max() < 1e-9
+    assert np.all(temperatures > 0)
+
+
+@pytest.mark.parametrize('name', MODELS)
+def test_linearization_matches_at_operating_point(name, request):
+    model = request.getfixturevalue(name)
+    temperatures = perturbed_temperatures(model)
+    linear = model.linearize(temperatures)
+    network = model.network
+    np.testing.assert_allclose(linear.derivative(temperatures, linear.inputs()), network.heat_balance(temperatures, np.zeros(len(network))),
+                               rtol=1e-9, atol=1e-15)
+    expected = finite_difference_jacobian(network, temperatures, np.zeros(len(network)))
+    np.testing.assert_allclose(linear.A, expected, rtol=0, atol=1e-7 * np.abs(expected).max())
+    # The external flux enters linearly through B
+    q_external = model.compute_external_flux(500.0, 20.0, 1000.0)
+    np.testing.assert_allclose(linear.derivative(temperatures, linear.inputs(q_external=q_external)),
+                               network.heat_balance(temperatures, q_external), rtol=1e-9, atol=1e-15)
+
+
+def test_linear_model_simulation_follows_discretization(model):
+    temperatures = model.solve_steady_state(500.0, 20.0)
+    linear = model.linearize(temperatures)
+    q_external = model.environment(500.0, 20.0).case_flux('average')
+    u = np.repeat(linear.inputs(q_external=q_external)[None], 30, axis=0)
+    states = linear.simulate(u, 60.0)
+    # Held at its own steady state, the linear model stays there
+    np.testing.assert_allclose(states[-1], temperatures, rtol=0, atol=1e-6)
+    Ad, Bd, cd = linear.discretize(60.0)
+    assert linear.discretize(60.0)[0] is Ad
+    profiles = linear.simulate(np.stack([u, 2 * u]), 60.0)
+    np.testing.assert_allclose(profiles[0], states, rtol=1e-12)
+
+
+def test_reduced_model_keeps_steady_state(model):
+    outputs = [model.network.keys[~model.network.radiating][0]]
+    reduced = model.reduce(outputs)
+    assert len(reduced.nodes) < len(model.nodes)
+    full = model.solve_steady_state(500.0, 20.0)
+    kept = np.isin(model.network.keys, reduced.network.keys)
+    np.testing.assert_allclose(reduced.solve_steady_state(500.0, 20.0), full[kept], rtol=1e-8)
+    np.testing.assert_allclose(reduced.expand(full[kept]), full, rtol=1e-8)
@@ -0,0 +1,123 @@
+"""
+Regression tests of the columnar node storage and of the Node views on it.
+"""
+
+import pickle
+import numpy as np
+import pytest
+from nodes import construct_nodes
+from nodetable import NodeTable
+from thermalmodel_v4 import Node
+
+
+def append_nodes(table: NodeTable, keys: list) -> list:
+    """
+    Append plain rows for the given keys.
+
+    Parameters:
+        table (NodeTable): The table.
+        keys (list): Node keys.
+
+    Returns:
+        list: Rows of the nodes.
+    """
+    return [table.append(key, f"Node {key}", 0.1, 1.0, 200.0, 900.0, 0.8, 0.3, 290.0 + key, 0.0, 'internal',
+                         [[key, 0, 0], [0, 0, 0]]) for key in keys]
+
+
+def test_rows_grow_past_capacity():
+    table = NodeTable(2)
+    rows = append_nodes(table, range(10))
+    assert rows == list(range(10)) and len(table) == 10
+    assert table.row(7) == 7 and 7 in table and 10 not in table
+    np.testing.assert_array_equal(table.temperatures, 290.0 + np.arange(10))
+    assert table.positions.shape == (10, 2, 3)
+    with pytest.raises(ValueError):
+        append_nodes(table, [3])
+    with pytest.raises(ValueError):
+        table.append(11, "Bad", 0.1, 1.0, 200.0, 900.0, 0.8, 0.3, 290.0, 0.0, 'internal', [0, 0, 0])
+
+
+def test_contacts_are_indexed_per_row():
+    table = NodeTable(2)
+    append_nodes(table, range(5))
+    for neighbor_row, area in ((3, 0.3), (1, 0.1), (4, 0.4)):
+        assert table.add_contact(0, neighbor_row, area)
+    table.add_contact(2, 0, 0.2)
+    assert not table.add_contact(0, 1, 9.9)
+    rows, areas = table.neighbors(0)
+    np.testing.assert_array_equal(rows, [3, 1, 4])
+    np.testing.assert_array_equal(areas, [0.3, 0.1, 0.4])
+
+    # Removing a contact moves the last contact into its place without changing the neighbours of other rows
+    table.remove_contact(0, 3)
+    table.remove_contact(0, 3)
+    assert table.contact_count == 3
+    rows, areas = table.neighbors(0)
+    np.testing.assert_array_equal(rows, [1, 4])
+    np.testing.assert_array_equal(areas, [0.1, 0.4])
+    np.testing.assert_array_equal(table.neighbors(2)[0], [0])
+    assert table.neighbors(3)[0].size == 0
+    assert sorted(map(tuple, table.contact_rows.tolist())) == [(0, 1), (0, 4), (2, 0)]
+
+
+def test_from_columns_indexes_on_first_use():
+    nodes = construct_nodes()
+    source = nodes[0].table
+    columns = {name: getattr(source, name) for name in ('keys', 'names', 'areas', 'masses', 'conductivities', 'specific_heats',
+                                                        'emissivities', 'absorptivities', 'temperatures', 'gammas',
+                                                        'radiating_bodies', 'positions', 'heat_loads')}
+    table = NodeTable.from_columns(columns, source.contact_rows, source.contact_areas)
+    assert len(table) == len(source) and table.contact_count == source.contact_count
+    for row in (0, 10, len(source) - 1):
+        assert table.row(source.keys[row]) == row
+        for built, expected in zip(table.neighbors(row), source.neighbors(row)):
+            np.testing.assert_array_equal(np.sort(built), np.sort(expected))
+    assert table.mli.tolist() == [None] * len(table) and table.tables.tolist() == [{}] * len(table)
+
+    with pytest.raises(ValueError):
+        NodeTable.from_columns(dict(columns, areas=columns['areas'][:-1]), source.contact_rows, source.contact_areas)
+    with pytest.raises(ValueError):
+        NodeTable.from_columns(columns, [[0, len(source)]], [0.1])
+    with pytest.raises(ValueError):
+        NodeTable.from_columns(dict(columns, keys=np.zeros(len(source), dtype=object)), [], []).row(0)
+
+
+def test_insert_copies_row_and_contacts():
+    nodes = construct_nodes()
+    source = nodes[0].table
+    table = NodeTable()
+    first = table.insert(source, nodes[0].row)
+    second = table.insert(source, nodes[1].row)
+    assert table.keys.tolist() == [nodes[0].key, nodes[1].key]
+    # Only contacts between rows that both tables hold are copied, in both directions
+    expected = nodes[1].key in nodes[0].neighbors
+    assert (second in table.neighbors(first)[0]) == expected
+    assert (first in table.neighbors(second)[0]) == expected
+    # Inserting a key again overwrites the row
+    nodes[0].temperature = 400.0
+    assert table.insert(source, nodes[0].row) == first
+    assert table.temperatures[first] == 400.0 and len(table) == 2
+
+
+def test_node_views_share_the_table():
+    nodes = construct_nodes()
+    node = nodes[0]
+    neighbor = next(other for other in nodes[1:] if other.key not in node.neighbors)
+    view = Node.view(node.table, node.row)
+    assert view == node and hash(view) == hash(node) and view != neighbor
+    view.temperature = 321.0
+    assert node.temperature == 321.0 == node.table.temperatures[node.row]
+
+    node.add_neighbor(neighbor, 0.05)
+    node.add_neighbor(neighbor, 0.5) # Existing contacts are kept
+    assert node.neighbors[neighbor.key] == (neighbor, 0.05)
+    assert neighbor.neighbors[node.key] == (node, 0.05)
+    node.remove_neighbor(neighbor.key)
+    assert neighbor.key not in node.neighbors and node.key in neighbor.neighbors
+    with pytest.raises(ValueError):
+        node.add_neighbor(construct_nodes()[1], 0.05)
+
+    copy = pickle.loads(pickle.dumps(node.table))
+    np.testing.assert_array_equal(copy.temperatures, node.table.temperatures)
+    np.testing.assert_array_equal(copy.neighbors(node.row)[0], node.table.neighbors(node.row)[0])
@@ -0,0 +1,138 @@
+"""
+Regression tests of the parameter sweeps: the process pool, batched scenarios, the results storage, the
+trajectory store and the solvers.
+"""
+
+from types import SimpleNamespace
+import numpy as np
+import pytest
+import thermalmodel_v4
+from thermalmodel_v4 import ThermalModel
+from trajectorystore import TrajectoryStore
+
+BETA_RANGE = np.array([0.0, 60.0])
+H_RANGE = np.array([500.0])
+TIME_RANGE = np.linspace(0, 6000, 4)
+
+
+def serial_trajectories(model: ThermalModel, method: str = 'BDF', **options) -> np.ndarray:
+    """
+    Integrate every scenario of the test sweep one after the other in this process.
+
+    Parameters:
+        model (ThermalModel): The thermal model.
+        method (str): Integration method.
+        **options: Solver options replacing those of ThermalNetwork.solver_options, such as rtol and atol.
+
+    Returns:
+        numpy.ndarray: Array of temperature values with shape (beta, h, time, node). K
+    """
+    solver_options = model.network.solver_options(method, dt=options.pop('dt', 10.0))
+    solver_options.update(options)
+    initial_T = model.table.temperatures[model.rows]
+    return np.array([[ThermalModel.integrate_trajectory(model.network, beta, h, TIME_RANGE, initial_T, solver_options)[0]
+                      for h in H_RANGE] for beta in BETA_RANGE])
+
+
+@pytest.fixture(scope='module')
+def serial(model) -> np.ndarray:
+    """The trajectories of the test sweep integrated serially with BDF."""
+    return serial_trajectories(model)
+
+
+@pytest.fixture(scope='module')
+def converged(model) -> np.ndarray:
+    """The trajectories of the test sweep integrated with BDF far below the default tolerance."""
+    return serial_trajectories(model, rtol=1e-8, atol=1e-8)
+
+
+def test_pool_sweep_matches_serial(model, serial):
+    results = model.integrate_heat_balance(BETA_RANGE, H_RANGE, TIME_RANGE, method='BDF', chunksize=1)
+    np.testing.assert_array_equal(results, serial)
+    assert model.stats['scenarios'] == 2 and model.stats['nfev'] > 0
+
+
+def test_memmap_sweep_matches_serial(model, serial, tmp_path):
+    path = str(tmp_path / 'results.npy')
+    results = model.integrate_heat_balance(BETA_RANGE, H_RANGE, TIME_RANGE, method='BDF', out=path)
+    assert isinstance(results, np.memmap)
+    np.testing.assert_array_equal(results, serial)
+    np.testing.assert_array_equal(np.load(path), serial)
+
+
+def test_batched_sweep_matches_separate_runs(model, converged):
+    results = model.integrate_heat_balance(BETA_RANGE, H_RANGE, TIME_RANGE, method='BDF', batch_size=2)
+    batch, _ = ThermalModel.integrate_batch(model.network, [(beta, H_RANGE[0]) for beta in BETA_RANGE], TIME_RANGE,
+                                            model.table.temperatures[model.rows], 'BDF')
+    np.testing.assert_array_equal(results[:, 0], batch)
+    # The batch shares its steps and error control, so it agrees with separate runs within the solver tolerance
+    np.testing.assert_allclose(results, converged, rtol=5e-3)
+    with pytest.raises(ValueError):
+        model.integrate_heat_balance(BETA_RANGE, H_RANGE, TIME_RANGE, trajectory=False, batch_size=2)
+
+
+def test_scenario_sweep_matches_single_scenarios(model):
+    options = model.network.solver_options('BDF')
+    initial_T = model.table.temperatures[model.rows]
+    results = model.integrate_heat_balance(BETA_RANGE[:1], H_RANGE, TIME_RANGE[1:3], trajectory=False, method='BDF')
+    for j, time in enumerate(TIME_RANGE[1:3]):
+        np.testing.assert_array_equal(results[0, 0, j], ThermalModel.integrate_one_scenario(model.network, BETA_RANGE[0], H_RANGE[0],
+                                                                                            time, initial_T, options))
+
+
+@pytest.mark.parametrize('method', ['BDF', 'RK45', 'Radau', 'LSODA'])
+def test_adaptive_solvers_converge(model, converged, method):
+    np.testing.assert_allclose(serial_trajectories(model, method, rtol=1e-7, atol=1e-7), converged, rtol=0, atol=1e-3)
+
+
+def test_fixed_step_solvers_converge(model, converged):
+    errors = {(method, dt): np.abs(serial_trajectories(model, method, dt=dt) - converged).max()
+              for method in ('BE', 'CN') for dt in (10.0, 1.0)}
+    assert errors['BE', 10.0] < 2 and errors['CN', 10.0] < errors['BE', 10.0] / 4
+    # Backward Euler is first order in the step size, Crank-Nicolson more accurate
+    assert errors['BE', 1.0] < errors['BE', 10.0] / 5
+    assert errors['CN', 1.0] < errors['CN', 10.0] / 5
+
+
+def test_failed_integration_raises(model, monkeypatch):
+    def failing_solve_ivp(fun, t_span, y0, **options):
+        return SimpleNamespace(status=-1, message="step size too small", y=np.zeros((len(y0), 1)), nfev=1, njev=0)
+
+    monkeypatch.setattr(thermalmodel_v4, 'solve_ivp', failing_solve_ivp)
+    options = model.network.solver_options('BDF')
+    initial_T = model.table.temperatures[model.rows]
+    with pytest.raises(RuntimeError, match="Integration failed for beta=20.0, h=500.0"):
+        ThermalModel.integrate_trajectory(model.network, 20.0, 500.0, TIME_RANGE, initial_T, options)
+    with pytest.raises(RuntimeError, match="Integration failed for beta=20.0, h=500.0, t=6000.0"):
+        ThermalModel.integrate_one_scenario(model.network, 20.0, 500.0, 6000.0, initial_T, options)
+
+
+def test_store_sweep_resumes(model, serial, tmp_path):
+    directory = str(tmp_path / 'store')
+    store = model.integrate_to_store(directory, BETA_RANGE, H_RANGE, TIME_RANGE, method='BDF')
+    np.testing.assert_array_equal(store.to_array(), serial)
+    assert model.stats['scenarios'] == 2
+
+    # An interrupted sweep only integrates the missing scenarios
+    written = store.read(0, 0).copy()
+    tmp_path.joinpath('store', 'scenario_1_0.npy').unlink()
+    assert store.completed() == {(0, 0)}
+    assert np.isnan(store.to_array()[1]).all()
+    resumed = model.integrate_to_store(directory, BETA_RANGE, H_RANGE, TIME_RANGE, method='BDF')
+    assert model.stats['scenarios'] == 1
+    np.testing.assert_array_equal(resumed.read(0, 0), written)
+    np.testing.assert_array_equal(resumed.to_array(), serial)
+    np.testing.assert_array_equal(TrajectoryStore(directory).to_array(), serial)
+
+
+def test_store_refuses_other_sweep(model, tmp_path):
+    directory = str(tmp_path / 'store')
+    keys = list(model.network.keys)
+    TrajectoryStore(directory, BETA_RANGE, H_RANGE, TIME_RANGE, keys)
+    TrajectoryStore(directory, BETA_RANGE, H_RANGE, TIME_RANGE, keys)
+    with pytest.raises(ValueError, match="different sweep"):
+        TrajectoryStore(directory, BETA_RANGE, H_RANGE, TIME_RANGE[:2], keys)
+    with pytest.raises(ValueError, match="different sweep"):
+        TrajectoryStore(directory, BETA_RANGE, H_RANGE, TIME_RANGE, keys[:-1])
+    with pytest.raises(ValueError):
+        TrajectoryStore(str(tmp_path / 'missing'))
@@ -0,0 +1,139 @@
+"""
+Regression tests of the matrices of ThermalModel: incremental node changes, Gebhart radiation, MLI, material
+property tables and the matrix cache.
+"""
+
+import os
+import numpy as np
+import pytest
+from kernels import CONDUCTIVITY, EMISSIVITY, THERMAL_MASS
+from matrixcache import model_hash
+from nodes import construct_nodes
+from thermalmodel_v4 import ThermalModel, mli_emission_coefficients, mli_emissivity
+from tests.conftest import MLI, STEEL, perturbed_temperatures, tabulated_nodes
+
+
+def assert_same_matrices(model: ThermalModel, expected: ThermalModel) -> None:
+    """
+    Check that two models hold the same nodes and exactly the same matrices.
+
+    Parameters:
+        model (ThermalModel): The model under test.
+        expected (ThermalModel): The model built from scratch.
+    """
+    assert list(model.nodes) == list(expected.nodes)
+    np.testing.assert_array_equal(model.vf_matrix, expected.vf_matrix)
+    np.testing.assert_array_equal(model.gl_matrix.toarray(), expected.gl_matrix.toarray())
+    np.testing.assert_array_equal(model.network.thermal_masses, expected.network.thermal_masses)
+
+
+@pytest.mark.parametrize('position', [0, 5, 20, -1])
+def test_remove_and_add_node_match_rebuild(position):
+    nodes = construct_nodes()
+    model = ThermalModel(nodes)
+    node = nodes[position]
+    others = [other for other in nodes if other.key != node.key]
+
+    model.remove_node(node.key)
+    assert_same_matrices(model, ThermalModel(others))
+    model.add_node(node)
+    assert_same_matrices(model, ThermalModel(others + [node]))
+    temperatures = perturbed_temperatures(model)
+    q_external = model.compute_external_flux(500.0, 20.0, 1000.0)
+    np.testing.assert_array_equal(model.network.heat_balance(temperatures, q_external),
+                                  ThermalModel(others + [node]).network.heat_balance(temperatures, q_external))
+
+
+def test_gebhart_matches_parallel_plates():
+    nodes = construct_nodes()[:2]
+    for node, emissivity in zip(nodes, (0.3, 0.6)):
+        node.area = 1.0
+        node.emissivity = emissivity
+    model = ThermalModel(nodes)
+    model.vf_matrix = np.array([[0.0, 1.0], [1.0, 0.0]])
+    radiation = model.radiative_conductance_matrix().toarray()
+    expected = 5.67e-8 / (1 / 0.3 + 1 / 0.6 - 1)
+    np.testing.assert_allclose(radiation, [[0, expected], [expected, 0]], rtol=1e-12)
+
+
+def test_radiative_conductances_conserve_energy(radiation_model):
+    radiation = radiation_model.network.radiation.toarray()
+    np.testing.assert_array_equal(radiation, radiation.T)
+    assert np.all(radiation >= 0) and np.all(np.diag(radiation) == 0)
+    # A node absorbs at most what all nodes in view emit, and the exchange sums to zero
+    emission = 5.67e-8 * radiation_model.table.emissivities[radiation_model.rows] * radiation_model.table.areas[radiation_model.rows]
+    assert np.all(radiation.sum(axis=1) <= emission * (1 + 1e-12))
+    fourth = perturbed_temperatures(radiation_model) ** 4
+    exchange = (radiation * (fourth[None, :] - fourth[:, None])).sum(axis=1)
+    assert abs(exchange.sum()) < 1e-12 * np.abs(exchange).max()
+
+
+def test_mli_closed_form_matches_layer_model():
+    offset, scale = mli_emission_coefficients(MLI, 0.5)
+    for temperature in np.linspace(150, 450, 13):
+        expected = mli_emissivity(MLI, 0.5, temperature)
+        assert np.clip(offset / temperature ** 4 + scale, 0, 1) == pytest.approx(expected, rel=1e-12, abs=1e-15)
+
+
+def test_mli_node_emissivity_follows_temperature(tabulated_model):
+    node = tabulated_model.nodes[900]
+    assert node.emissivity == mli_emissivity(MLI, node.area, node.temperature)
+    row = list(tabulated_model.nodes).index(900)
+    temperatures = perturbed_temperatures(tabulated_model)
+    assert tabulated_model.network.node_emissivities(temperatures)[row] == pytest.approx(
+        node.get_emissivity(temperatures[row]), rel=1e-12, abs=1e-15)
+
+
+def test_property_tables_are_resampled_on_grid(tabulated_model):
+    network = tabulated_model.network
+    row = list(tabulated_model.nodes).index(901)
+    mass = tabulated_model.table.masses[tabulated_model.nodes[901].row]
+    grid_start, grid_step = network.property_grid
+    grid = grid_start + grid_step * np.arange(network.property_tables.shape[2])
+    temperatures = np.full((len(grid), len(network)), 293.15)
+    temperatures[:, row] = grid
+    np.testing.assert_allclose(network.lookup(THERMAL_MASS, temperatures)[:, row], mass * np.interp(grid, *STEEL.tables['cp']), rtol=1e-12)
+    np.testing.assert_allclose(network.lookup(CONDUCTIVITY, temperatures)[:, row],
+                               np.interp(grid, *STEEL.tables['conductivity']) / STEEL.conductivity, rtol=1e-12)
+    np.testing.assert_allclose(network.lookup(EMISSIVITY, temperatures)[:, row], np.interp(grid, *STEEL.tables['emissivity']), rtol=1e-12)
+    # Constant beyond the grid, with a zero slope
+    outside = np.full(len(network), grid[0] - 50)
+    assert network.lookup(THERMAL_MASS, outside)[row] == pytest.approx(mass * STEEL.tables['cp'][1][0])
+    assert network.lookup(THERMAL_MASS, outside, derivative=True)[row] == 0
+    # Nodes without tables keep their nominal properties
+    plain = list(tabulated_model.nodes).index(1)
+    np.testing.assert_array_equal(network.node_thermal_masses(temperatures)[:, plain], network.thermal_masses[plain])
+
+
+def test_material_tables_are_validated():
+    with pytest.raises(ValueError):
+        type(STEEL)("Bad", 1, 1, 0.5, 0.5, tables={'density': ([200, 300], [1, 2])})
+    with pytest.raises(ValueError):
+        type(STEEL)("Bad", 1, 1, 0.5, 0.5, tables={'cp': ([300, 200], [1, 2])})
+
+
+def test_matrix_cache_reuses_and_invalidates(tmp_path):
+    nodes = construct_nodes()
+    model = ThermalModel(nodes, cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 1
+    cached = ThermalModel(nodes, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(cached.vf_matrix, model.vf_matrix)
+    np.testing.assert_array_equal(cached.gl_matrix.toarray(), model.gl_matrix.toarray())
+
+    digest = model_hash(model.table, model.rows)
+    nodes[0].temperature += 10 # Temperatures do not change the matrices
+    assert model_hash(model.table, model.rows) == digest
+    nodes[0].add_neighbor(nodes[30], 0.05)
+    assert model_hash(model.table, model.rows) != digest
+    changed = ThermalModel(nodes, cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 2
+    np.testing.assert_array_equal(changed.gl_matrix.toarray(), ThermalModel(nodes).gl_matrix.toarray())
+
+
+def test_nodes_of_several_tables_are_copied():
+    first, second = construct_nodes(), tabulated_nodes()
+    model = ThermalModel(first[:10] + second[-3:])
+    assert len(model.table) == 13 and model.table is not first[0].table
+    assert list(model.nodes) == [node.key for node in first[:10] + second[-3:]]
+    # Only the contacts between the copied nodes are kept
+    assert set(model.nodes[900].neighbors) == {1}
@@ -2,18 +2,174 @@
 A module for the thermal model.
 """
 
+import os
 from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
 import numpy as np
-from numba import njit
 from tqdm import tqdm
-from scipy.integrate import solve_ivp, dblquad
+from scipy.integrate import solve_ivp
+from scipy.optimize import anderson, NoConvergence
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.linalg import spsolve, splu
 from constants import Constants as C
 from materials import Component, Material
+from nodetable import NodeTable
+from kernels import heat_balance_kernel, heat_balance_batch_kernel, CONDUCTIVITY, THERMAL_MASS, EMISSIVITY
+from matrixcache import model_hash, load_matrices, save_matrices
+from linearmodel import LinearModel
+from integrators import FIXED_STEP_METHODS, ThetaIntegrator
+from trajectorystore import TrajectoryStore
+
+VF_BLOCK_SIZE = 512 # Rows of the view factor matrix evaluated per batch, bounds the temporary memory
+PROPERTY_TABLE_SIZE = 256 # Temperatures of the uniform grid that material property tables are resampled onto
+
+
+def mli_layer_flux(layers: list, index: int, temperature: float) -> tuple:
+    """
+    Calculate the radiation flux terms F1 and F2 for a given layer in an MLI stack.
+
+    Parameters:
+        layers (list): Layers of the MLI stack, see Node.
+        index (int): The index of the layer within the MLI stack.
+        temperature (float): Temperature of the node under the MLI. K
+
+    Returns:
+        tuple: A tuple containing the F1 and F2 flux terms for the given layer.
+    """
+    # Retrieve the properties of the current layer and adjacent layers
+    current_layer = layers[index]
+    epsilon_i = current_layer['emissivity']
+    alpha_i = current_layer['absorptivity']
+    T_i = current_layer['temperature']  # Temperature of the current layer
+
+    # Calculate the radiative conductance for the current layer
+    k_rad_i = C.sigma * (epsilon_i + alpha_i) / (1 - epsilon_i)
+
+    # Determine the temperature of the adjacent layers
+    # For the outermost layers, if there's no adjacent MLI, use the node's temperature
+    T_above = layers[index - 1]['temperature'] if index > 0 else temperature
+    T_below = layers[index + 1]['temperature'] if index < len(layers) - 1 else temperature
+
+    # Calculate the radiation flux terms F1 and F2
+    F1 = k_rad_i * (T_above**4 - T_i**4)  # Flux from the layer above to the current layer
+    F2 = k_rad_i * (T_i**4 - T_below**4)  # Flux from the current layer to the layer below
+
+    return F1, F2
+
+
+def mli_emissivity(layers: list, area: float, temperature: float) -> float:
+    """
+    Calculate the effective emissivity of a node covered by an MLI stack. Only plain data is used,
+    so the stack can be evaluated in worker processes without the Node objects.
+
+    Parameters:
+        layers (list): Layers of the MLI stack, see Node.
+        area (float): Area of the node. m^2
+        temperature (float): Temperature of the node under the MLI. K
+
+    Returns:
+        float: Effective emissivity, clipped to [0, 1].
+    """
+    total_radiative_power = 0
+
+    # Iterate through each layer to calculate the radiative power
+    for i, layer in enumerate(layers):
+        F1, F2 = mli_layer_flux(layers, i, temperature)
+        # Total power radiated by this layer
+        total_radiative_power += layer['xi'] * layer['emissivity'] * (F1 + F2 - 2 * C.sigma * temperature**4)
+
+    # The effective emissivity is the total radiative power divided by the Stefan-Boltzmann law for the entire node
+    effective_emissivity = total_radiative_power / (C.sigma * area * temperature**4)
+
+    # Ensure emissivity is within physical bounds [0, 1]
+    return max(0, min(effective_emissivity, 1))
+
+
+def mli_emission_coefficients(layers: list, area: float) -> tuple:
+    """
+    Reduce an MLI stack to the two constants of its effective emissivity. The layer temperatures are fixed,
+    so in the radiative power of mli_emissivity only the node temperature T varies, and it enters as T^4:
+    the effective emissivity is clip(offset / T^4 + scale, 0, 1).
+
+    Parameters:
+        layers (list): Layers of the MLI stack, see Node.
+        area (float): Area of the node. m^2
+
+    Returns:
+        tuple: The offset (K^4) and scale of the effective emissivity.
+    """
+    xi, emissivity, absorptivity, temperature = np.array([[layer['xi'], layer['emissivity'], layer['absorptivity'], layer['temperature']]
+                                                          for layer in layers], dtype=float).T
+    # Layer i radiates xi * epsilon * (k_rad * (T_above^4 - T_below^4) - 2 * sigma * T^4), its own temperature cancels
+    weight = xi * emissivity * C.sigma * (emissivity + absorptivity) / (1 - emissivity)
+    fourth_power = temperature ** 4
+    constant = weight[1:] @ fourth_power[:-1] - weight[:-1] @ fourth_power[1:]
+    quartic = weight[0] - weight[-1] - 2 * C.sigma * np.sum(xi * emissivity)
+    return constant / (C.sigma * area), quartic / (C.sigma * area)
+
+
+def tabulate_properties(table: NodeTable, rows, emissivities: np.ndarray) -> tuple:
+    """
+    Resample the temperature-dependent material properties of the nodes onto one uniform temperature grid
+    spanning all their tables, so the heat balance kernel looks them up in constant time. Conductivity is
+    stored relative to the nominal conductivity of the conductance matrix, and cp as the thermal mass of the node.
+
+    Parameters:
+        table (NodeTable): Table of the nodes.
+        rows (slice or numpy.ndarray): Table rows of the nodes of the thermal model, in row order.
+        emissivities (numpy.ndarray): Emissivity of the nodes without an emissivity table, for MLI nodes the
+                                      scale of the effective emissivity.
+
+    Returns:
+        tuple: (grid, tables), with grid = (start, step) of the temperatures and tables of shape (3, N, PROPERTY_TABLE_SIZE)
+               holding the relative conductivity, thermal mass and emissivity, or of shape (3, N, 0) if no node has a table.
+    """
+    node_tables = table.tables[rows]
+    tabulated = np.flatnonzero(node_tables.astype(bool))
+    if not tabulated.size:
+        return (0.0, 1.0), np.empty((3, len(node_tables), 0))
+    samples = [sample for properties in node_tables[tabulated] for sample in properties.values()]
+    grid = np.linspace(min(sample[0][0] for sample in samples), max(sample[0][-1] for sample in samples), PROPERTY_TABLE_SIZE)
+    masses, conductivities, mli = table.masses[rows], table.conductivities[rows], table.mli[rows]
+    tables = np.empty((3, len(node_tables), len(grid)))
+    tables[CONDUCTIVITY] = 1.0
+    tables[THERMAL_MASS] = (masses * table.specific_heats[rows])[:, None]
+    tables[EMISSIVITY] = emissivities[:, None]
+    for row in tabulated:
+        properties = node_tables[row]
+        if 'conductivity' in properties and conductivities[row] != 0:
+            tables[CONDUCTIVITY, row] = np.interp(grid, *properties['conductivity']) / conductivities[row]
+        if 'cp' in properties:
+            tables[THERMAL_MASS, row] = masses[row] * np.interp(grid, *properties['cp'])
+        if 'emissivity' in properties and not mli[row]:
+            tables[EMISSIVITY, row] = np.interp(grid, *properties['emissivity'])
+    return (grid[0], grid[1] - grid[0]), tables
+
+
+def _row_property(column: str, doc: str) -> property:
+    """
+    Make a property reading and writing the row of a node in a column of its table.
+
+    Parameters:
+        column (str): Name of the column, see NodeTable.
+        doc (str): Docstring of the property.
+
+    Returns:
+        property: The property.
+    """
+    def getter(node):
+        return getattr(node.table, column)[node.row]
+
+    def setter(node, value):
+        getattr(node.table, column)[node.row] = value
+
+    return property(getter, setter, doc=doc)
 
 
 class Node:
     """
-    Represents a node in the thermal model.
+    Represents a node in the thermal model, as a view on a row of a NodeTable. The properties of the node are
+    read from and written to the columns of the table, and its neighbours are the contacts of the row.
 
     Methods:
         name(name): Returns the name of the node.
@@ -21,16 +177,29 @@ class Node:
         remove_neighbor(key): Removes a neighbor from the node.
         get_neighbors(): Returns a list of neighbors.
         update_temperature(temperature): Updates the temperature of the node.
-        get_effective_emissivity(param): Calculate the effective emissivity of the node with MLI.
-        calculate_flux(index): Calculate the radiation flux terms F1 and F2 for a given layer in the MLI.
+        get_emissivity(temperature): Calculate the effective emissivity of the node with MLI.
+        calculate_flux(index, temperature): Calculate the radiation flux terms F1 and F2 for a given layer in the MLI.
     """
 
-    __slots__ = ['key', 'neighbors', 'area', 'conductivity', '_mass', '_cp', 'emissivity', 'absorptivity', 'temperature', 'gamma',
-                 'radiating_body', 'position', 'mli', 'heat_flux_int', 'name', '_thermal_mass']
-
-    def __init__(self, key: int, name: str, area: float, mass: float, material: Material, temperature: float, gamma: float, rb: str, position: list, mli: list=None) -> None:
+    __slots__ = ['table', 'row']
+
+    name = _row_property('names', "str: Name of the node.")
+    area = _row_property('areas', "float: Incident area. m^2")
+    conductivity = _row_property('conductivities', "float: Nominal thermal conductivity. W/mK")
+    emissivity = _row_property('emissivities', "float: Emissivity, for MLI nodes the effective emissivity.")
+    absorptivity = _row_property('absorptivities', "float: Absorptivity.")
+    temperature = _row_property('temperatures', "float: Temperature. K")
+    gamma = _row_property('gammas', "float: Angle between the node and the sun/earth. degrees")
+    radiating_body = _row_property('radiating_bodies', "str: Radiating body (earth, sun or internal).")
+    position = _row_property('positions', "numpy.ndarray: Position and normal angles ([x, y, z], [theta_xy, theta_yz, theta_xz]).")
+    heat_flux_int = _row_property('heat_loads', "float: Internal heat load. W")
+    mli = _row_property('mli', "list: MLI stack of the node, or None.")
+    tables = _row_property('tables', "dict: Temperature-dependent material properties, see Material.")
+
+    def __init__(self, key: int, name: str, area: float, mass: float, material: Material, temperature: float, gamma: float, rb: str, position: list, mli: list=None,
+                 table: NodeTable=None) -> None:
         """ 
-        Initializes a new instance of the Node class.
+        Initializes a new instance of the Node class, appending a row for it to a table.
 
         Parameters:
             key (int): Unique identifier for the node.
@@ -51,27 +220,43 @@ class Node:
             heat_flux (float): Heat flux in watts (default: 0).
             mli (dict): Additional arguments for the MLI model.
                 [{temperature: float, emissivity: float, absorptivity: float, cp: float, area: float, mass: float, xi: float]}]
+            table (NodeTable): Table to add the node to, nodes can only be neighbours within a table (default: a new table).
         """
-        self.key = key
-        self.name = name
-        self.neighbors = {}
-        self.area = area
-        self.conductivity = material.conductivity
-        self._mass = mass
-        self._cp = material.cp
-        self.emissivity = material.emissivity
-        self.absorptivity = material.absorptivity
-        self.temperature = temperature
-        self.gamma = gamma
-        self.radiating_body = rb
-        self.position = np.array(position)
-        self.heat_flux_int = 0
-        self.mli = mli
-        if self.mli is not None:
-            self.emissivity = self.get_emissivity() # Calculate the effective emissivity of the node with MLI
+        heat_flux_int = 0.0
         if isinstance(material, Component):
-            self.heat_flux_int = material.power * material.efficiency # if node is electronic component, heat flux in W
-        self._thermal_mass = self._mass * self._cp
+            heat_flux_int = material.power * material.efficiency # if node is electronic component, heat flux in W
+        self.table = NodeTable() if table is None else table
+        self.row = self.table.append(key, name, area, mass, material.conductivity, material.cp, material.emissivity, material.absorptivity,
+                                     temperature, gamma, rb, position, heat_flux_int, mli, material.tables)
+        if mli is not None:
+            self.emissivity = self.get_emissivity() # Calculate the effective emissivity of the node with MLI
+
+    @classmethod
+    def view(cls, table: NodeTable, row: int):
+        """
+        Get a view on an existing row of a table.
+
+        Parameters:
+            table (NodeTable): The table.
+            row (int): Row of the node.
+
+        Returns:
+            Node: The node.
+        """
+        node = cls.__new__(cls)
+        node.table = table
+        node.row = row
+        return node
+
+    @property
+    def key(self):
+        """
+        Returns the key of the node.
+
+        Returns:
+            int: Unique identifier of the node.
+        """
+        return self.table.keys[self.row]
 
     @property
     def thermal_mass(self):
@@ -81,7 +266,36 @@ class Node:
         Returns:
             float: Thermal mass of the node.
         """
-        return self._thermal_mass
+        return self.table.masses[self.row] * self.table.specific_heats[self.row]
+
+    @property
+    def neighbors(self):
+        """
+        Returns the neighbors of the node.
+
+        Returns:
+            dict: (neighbor node, contact area) by neighbor key.
+        """
+        neighbor_rows, contact_areas = self.table.neighbors(self.row)
+        return {self.table.keys[row]: (Node.view(self.table, row), contact_area) for row, contact_area in zip(neighbor_rows, contact_areas)}
+
+    def __eq__(self, other) -> bool:
+        """
+        Check whether two nodes are views on the same row.
+
+        Returns:
+            bool: True for the same row of the same table.
+        """
+        return isinstance(other, Node) and other.table is self.table and other.row == self.row
+
+    def __hash__(self) -> int:
+        """
+        Returns a hash of the row of the node.
+
+        Returns:
+            int: Hash of the table and row.
+        """
+        return hash((id(self.table), self.row))
 
     def change_name(self, name):
         """
@@ -120,16 +334,14 @@ class Node:
         Adds a neighbor to the node.
 
         Parameters:
-            node (Node): The neighbor node to be added.
+            node (Node): The neighbor node to be added, from the same table.
             contact_area (float): Contact area between the node and the neighbor. m^2
         """
-        # check if neighbor already exists
-        if node.key not in self.neighbors:
-            self.neighbors[node.key] = (node, contact_area)
-
-        # Add this node as a neighbor to the added neighbor, if not already present
-        if self.key not in node.neighbors:
-            node.neighbors[self.key] = (self, contact_area)
+        if node.table is not self.table:
+            raise ValueError(f"Node {node.key!r} is in another table, nodes can only be neighbours within a table")
+        # Contacts already present are kept, in both directions
+        self.table.add_contact(self.row, node.row, contact_area)
+        self.table.add_contact(node.row, self.row, contact_area)
    
     def remove_neighbor(self, key):
         """
@@ -138,8 +350,8 @@ class Node:
         Parameters:
             key (int): The key of the neighbor node to be removed.
         """
-        if key in self.neighbors:
-            del self.neighbors[key]
+        if key in self.table:
+            self.table.remove_contact(self.row, self.table.row(key))
 
     def get_neighbors(self):
         """
@@ -160,58 +372,34 @@ class Node:
         # if self.heat_flux_int == 0:  # Update temperature only if it's not an electronic component
         self.temperature = temperature
         
-    def get_emissivity(self):
+    def get_emissivity(self, temperature=None):
         """
         Calculate the effective emissivity of the node with MLI, using the provided physical model.
 
+        Parameters:
+            temperature (float): Node temperature to evaluate at (default: the current node temperature). K
+
         Returns:
             float: Effective emissivity of the node.
         """
-        total_radiative_power = 0
-
-        # Iterate through each layer to calculate the radiative power
-        for i, layer in enumerate(self.mli):
-            F1, F2 = self.calculate_flux(i)
-            # Total power radiated by this layer
-            total_radiative_power += layer['xi'] * layer['emissivity'] * (F1 + F2 - 2 * C.sigma * self.temperature**4)
-
-        # The effective emissivity is the total radiative power divided by the Stefan-Boltzmann law for the entire node
-        effective_emissivity = total_radiative_power / (C.sigma * self.area * self.temperature**4)
-
-        # Ensure emissivity is within physical bounds [0, 1]
-        effective_emissivity = max(0, min(effective_emissivity, 1))
+        if temperature is None:
+            temperature = self.temperature
+        return mli_emissivity(self.mli, self.area, temperature)
 
-        return effective_emissivity
-
-    def calculate_flux(self, index):
+    def calculate_flux(self, index, temperature=None):
         """
         Calculate the radiation flux terms F1 and F2 for a given layer in the MLI.
 
         Parameters:
             index (int): The index of the layer within the MLI stack.
+            temperature (float): Node temperature to evaluate at (default: the current node temperature). K
 
         Returns:
             tuple: A tuple containing the F1 and F2 flux terms for the given layer.
         """
-        # Retrieve the properties of the current layer and adjacent layers
-        current_layer = self.mli[index]
-        epsilon_i = current_layer['emissivity']
-        alpha_i = current_layer['absorptivity']
-        T_i = current_layer['temperature']  # Temperature of the current layer
-
-        # Calculate the radiative conductance for the current layer
-        k_rad_i = C.sigma * (epsilon_i + alpha_i) / (1 - epsilon_i)
-        
-        # Determine the temperature of the adjacent layers
-        # For the outermost layers, if there's no adjacent MLI, use the node's temperature
-        T_above = self.mli[index - 1]['temperature'] if index > 0 else self.temperature
-        T_below = self.mli[index + 1]['temperature'] if index < len(self.mli) - 1 else self.temperature
-
-        # Calculate the radiation flux terms F1 and F2
-        F1 = k_rad_i * (T_above**4 - T_i**4)  # Flux from the layer above to the current layer
-        F2 = k_rad_i * (T_i**4 - T_below**4)  # Flux from the current layer to the layer below
-
-        return F1, F2
+        if temperature is None:
+            temperature = self.temperature
+        return mli_layer_flux(self.mli, index, temperature)
 
 
 class OrbitProperties():
@@ -365,26 +553,18 @@ class OrbitProperties():
         phi_m = np.arcsin(1 / H)
         b = np.sqrt(H ** 2 - 1)
 
-        # Initialize view factor array
-        view_factors = np.zeros_like(gamma_rads)
-
-        # Compute view factors for each node
-        for i, gamma_rad in enumerate(gamma_rads):
-            if np.isnan(gamma_rad) or np.isnan(H[i]) or np.isnan(b[i]):
-                view_factors[i] = 0  # Set view factor to 0 for invalid inputs
-                continue
+        # Evaluate both branches for all nodes and select per node, invalid inputs give a view factor of 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            full_view = np.cos(gamma_rads) / H ** 2
+            t1 = 1/2 * np.arcsin(b / (H * np.sin(gamma_rads)))
+            t2 = 1 / (2 * H ** 2) * (np.cos(gamma_rads) * np.arccos(-b / np.tan(gamma_rads)) - b * np.sqrt(1 - H ** 2 * np.cos(gamma_rads) ** 2))
+            partial_view = 2 / np.pi * (np.pi / 4 - t1 + t2)
 
-            # Check the range of gamma and calculate the view factor accordingly
-            if gamma_rad <= (np.pi / 2 - phi_m[i]):
-                view_factors[i] = np.cos(gamma_rad) / H[i] ** 2
-            elif (np.pi / 2 - phi_m[i]) < gamma_rad <= (np.pi / 2 + phi_m[i]):
-                t1 = 1/2 * np.arcsin(b[i] / (H[i] * np.sin(gamma_rad)))
-                t2 = 1 / (2 * H[i] ** 2) * (np.cos(gamma_rad) * np.arccos(-b[i] / np.tan(gamma_rad)) - b[i] * np.sqrt(1 - H[i] ** 2 * np.cos(gamma_rad) ** 2))
-                view_factors[i] = 2 / np.pi * (np.pi / 4 - t1 + t2)
-            else:
-                view_factors[i] = 0  # Set view factor to 0 for angles outside the specified range
+            valid = ~(np.isnan(gamma_rads) | np.isnan(H) | np.isnan(b))
+            full = valid & (gamma_rads <= (np.pi / 2 - phi_m))
+            partial = valid & ~full & (gamma_rads <= (np.pi / 2 + phi_m))
 
-        return view_factors
+        return np.where(full, full_view, np.where(partial, partial_view, 0.0))
 
     def albedo(self):
         """
@@ -431,7 +611,7 @@ class ExternalHeatFlux:
         Initializes an instance of the ExternalHeatFlux class.
 
         Parameters:
-            nodes (dict): The node on which the external heat flux is applied.
+            nodes (dict or NodeTable): The node on which the external heat flux is applied, by key or as a table.
             h (float): The altitude of the node.
             beta (float): The angle between the node's normal vector and the sun vector.
             t (float): The time at which the external heat flux is calculated.
@@ -444,10 +624,13 @@ class ExternalHeatFlux:
         self._albedo = self.op.albedo()
         self._earth_ir = self.op.earth_ir()
         # Precompute node properties
-        self.areas = np.array([node.area for node in self.nodes.values()])
-        self.absorptivities = np.array([node.absorptivity for node in self.nodes.values()])
-        self.radiating_bodies = np.array([node.radiating_body for node in self.nodes.values()])
-        self.gammas = np.array([node.gamma for node in self.nodes.values()])
+        if isinstance(nodes, NodeTable):
+            self.areas, self.absorptivities, self.radiating_bodies, self.gammas = nodes.areas, nodes.absorptivities, nodes.radiating_bodies, nodes.gammas
+        else:
+            self.areas = np.array([node.area for node in self.nodes.values()])
+            self.absorptivities = np.array([node.absorptivity for node in self.nodes.values()])
+            self.radiating_bodies = np.array([node.radiating_body for node in self.nodes.values()])
+            self.gammas = np.array([node.gamma for node in self.nodes.values()])
 
     @property
     def t(self):
@@ -497,8 +680,8 @@ class ExternalHeatFlux:
         Returns:
             numpy.ndarray: Array of eclipse status (True/False) for each node.
         """
-        # Calculate eclipse status based on the time 't' for all nodes
-        return np.array([self.op.eclipse(self.t) for node in self.nodes.values()])
+        # The eclipse status is the same for all nodes
+        return np.full(len(self.nodes), self.op.eclipse(self.t))
 
     def solar_flux(self):
         """
@@ -548,326 +731,1504 @@ class ExternalHeatFlux:
         return solar_flux + albedo_flux + earth_flux
    
 
-class ThermalModel:
+class OrbitEnvironment:
     """
-    A class representing a thermal model.
+    The external heating of all nodes for one (h, beta) scenario. Everything that does not depend on time is
+    computed once, so evaluating the external flux at a time t only checks the eclipse window.
 
     Attributes:
-        nodes (list): List of nodes in the thermal model.
-
-    Methods:
-        __init__(self, nodes: list) -> None: Initializes the ThermalModel object.
-        add_node(self, node: Node): Adds a node to the list of nodes.
-        remove_node(self, key): Removes a node from the list of nodes.
-        get_node(self, key): Retrieves a node by its key.
-        normal_vector_from_angles(theta_xy, theta_yz, theta_xz): Calculates the normal vector from given angles.
-        calculate_angles(node_i, node_j, normal1, normal2): Calculates the angles between the normal vectors of two faces.
-        compute_view_factor(args): Computes the view factor between two nodes.
-        is_occluded(self, index_i, index_j, positions): Checks if any node occludes the view between two nodes.
-        internal_vf(self): Calculates the view factor between different nodes.
-        compute_conductivity_matrix(self): Calculates the conductivity matrix.
-        compute_area_matrix(self): Calculates the area matrix.
-        compute_distance_matrix(self): Calculates the distance matrix.
-        heat_balance(self, h, beta, t): Calculates the heat balance equation.
-        integrate_heat_balance(self, beta_range, h_range, time_range): Integrates the heat balance equation over a range of parameters.
+        h (float): Altitude in km.
+        beta (float): Angle between orbit and equator in degrees.
+        period (float): Orbital period in seconds.
+        eclipse_start (float): Time after the start of each orbit at which the eclipse starts. s
+        eclipse_end (float): Time after the start of each orbit at which the eclipse ends. s
+        view_factors (numpy.ndarray): View factor between each node and its radiating body.
+        albedo (float): Albedo of the earth.
+        earth_ir (float): Earth IR. W/m^2
+        q_sunlit (numpy.ndarray): External heat flux on each node outside eclipse. W
+        q_eclipse (numpy.ndarray): External heat flux on each node in eclipse. W
     """
 
-    __slots__ = ['nodes', 'vf_matrix', 'k_matrix', 'a_matrix', 'l_matrix']
+    __slots__ = ['h', 'beta', 'period', 'eclipse_start', 'eclipse_end', 'view_factors', 'albedo', 'earth_ir',
+                 'q_sunlit', 'q_eclipse']
 
-    def __init__(self, nodes: list) -> None:
+    def __init__(self, network, h: float, beta: float) -> None:
         """
-        Initializes a ThermalModel object.
+        Initializes the environment of a scenario.
 
         Parameters:
-            nodes (list): List of nodes in the thermal model.
-            vf_matrix (numpy.ndarray): View factor matrix.
-            k_matrix (numpy.ndarray): Conductivity matrix.
-            a_matrix (numpy.ndarray): Area matrix.
-            l_matrix (numpy.ndarray): Distance matrix.
+            network (ThermalNetwork): The thermal network.
+            h (float): Altitude in km.
+            beta (float): Angle between orbit and equator in degrees.
         """
-        self.nodes = {node.key: node for node in nodes}
-        self.vf_matrix = self.internal_vf()
-        self.k_matrix = self.compute_conductivity_matrix()
-        self.a_matrix = self.compute_area_matrix()
-        self.l_matrix = self.compute_distance_matrix()
-
-    def add_node(self, node: Node) -> None:
+        op = OrbitProperties(h, beta)
+        self.h = h
+        self.beta = beta
+        self.period = op.period()
+        eclipse_fraction = op.eclipse_fraction()
+        self.eclipse_start = self.period / 2 * (1 - eclipse_fraction)
+        self.eclipse_end = self.period / 2 * (1 + eclipse_fraction)
+        self.view_factors = op.view_factor(network.gammas, network.radiating_bodies)
+        self.albedo = op.albedo()
+        self.earth_ir = op.earth_ir()
+
+        # Same terms as ExternalHeatFlux.total_flux, the heat balance only applies them to radiating nodes
+        absorbed_sun = network.areas * C.q_sun * network.absorptivities
+        earth_flux = self.earth_ir * network.areas
+        self.q_eclipse = earth_flux
+        self.q_sunlit = self.view_factors * absorbed_sun + self.albedo * absorbed_sun + earth_flux
+
+    def in_eclipse(self, t: float) -> bool:
         """
-        Adds a node to the list of nodes in the thermal model.
+        Check if the satellite is in eclipse.
 
         Parameters:
-            node (Node): The node to be added.
+            t (float): Time in seconds.
+
+        Returns:
+            bool: True if in eclipse, False if not.
         """
-        self.nodes[node.key] = node
-        self.vf_matrix = self.internal_vf()
-        self.k_matrix = self.compute_conductivity_matrix()
-        self.a_matrix = self.compute_area_matrix()
-        self.l_matrix = self.compute_distance_matrix()
+        return self.eclipse_start < t % self.period < self.eclipse_end
 
-    def remove_node(self, key: str) -> None:
+    def flux(self, t: float, eclipse: bool = None) -> np.ndarray:
         """
-        Removes a node from the list of nodes based on the given key.
+        Get the external heat flux on each node. The returned array is shared and must not be modified.
 
         Parameters:
-            key (str): The key of the node to be removed.
+            t (float): Time in seconds.
+            eclipse (bool): Eclipse state to use instead of the one at t, for one-sided values at the
+                            eclipse entry and exit (default: the eclipse state at t).
+
+        Returns:
+            numpy.ndarray: Array of external heat flux on each node. W
         """
-        if key in self.nodes:
-            del self.nodes[key]
-            self.vf_matrix = self.internal_vf()
-            self.k_matrix = self.compute_conductivity_matrix()
-            self.a_matrix = self.compute_area_matrix()
-            self.l_matrix = self.compute_distance_matrix()
+        if eclipse is None:
+            eclipse = self.in_eclipse(t)
+        return self.q_eclipse if eclipse else self.q_sunlit
 
-    def get_node(self, key: str) -> Node:
+    def segments(self) -> list:
         """
-        Get a node from the thermal model by its key.
+        Get the intervals of one orbit with a constant eclipse state.
+
+        Returns:
+            list: (start, end, eclipse) tuples covering [0, period], in seconds.
+        """
+        if self.eclipse_end <= self.eclipse_start:
+            return [(0.0, self.period, False)]
+        return [(0.0, self.eclipse_start, False), (self.eclipse_start, self.eclipse_end, True),
+                (self.eclipse_end, self.period, False)]
+
+    def discontinuities(self, t_start: float, t_end: float) -> np.ndarray:
+        """
+        Get the eclipse entry and exit times strictly between two times, where the external flux jumps.
 
         Parameters:
-            key (str): The key of the node to retrieve.
+            t_start (float): Start time in seconds.
+            t_end (float): End time in seconds.
 
         Returns:
-            Node or None: The node with the specified key, or None if not found.
+            numpy.ndarray: Sorted array of eclipse entry and exit times in seconds.
         """
-        return self.nodes.get(key, None)
-    
-    @staticmethod
-    def normal_vector_from_angles(theta_xy: float, theta_yz: float, theta_xz: float) -> np.ndarray:
+        if self.eclipse_end <= self.eclipse_start:
+            return np.empty(0)
+        first_orbit = np.floor(t_start / self.period)
+        orbit_starts = self.period * np.arange(first_orbit, np.floor(t_end / self.period) + 1)
+        times = np.sort(np.concatenate([orbit_starts + self.eclipse_start, orbit_starts + self.eclipse_end]))
+        return times[(times > t_start) & (times < t_end)]
+
+    def case_flux(self, case: str = 'average') -> np.ndarray:
         """
-        Calculate the normal vector from given angles.
+        Get a constant external heat flux for a steady-state load case.
 
         Parameters:
-            theta_xy (float): Angle in degrees between the x-y plane and the normal vector.
-            theta_yz (float): Angle in degrees between the y-z plane and the normal vector.
-            theta_xz (float): Angle in degrees between the x-z plane and the normal vector.
+            case (str): 'average' for the flux averaged over one orbit, 'hot' for the sunlit flux or 'cold'
+                        for the eclipse flux.
 
         Returns:
-            numpy.ndarray: Normal vector with components in x, y, and z directions.
+            numpy.ndarray: Array of external heat flux on each node. W
         """
-        # Calculate direction cosines
-        cos_theta_xy = np.cos(np.radians(theta_xy))
-        cos_theta_yz = np.cos(np.radians(theta_yz))
-        cos_theta_xz = np.cos(np.radians(theta_xz))
+        if case == 'average':
+            eclipse_fraction = max(self.eclipse_end - self.eclipse_start, 0) / self.period
+            return (1 - eclipse_fraction) * self.q_sunlit + eclipse_fraction * self.q_eclipse
+        if case == 'hot':
+            return self.q_sunlit
+        if case == 'cold':
+            return self.q_eclipse
+        raise ValueError(f"Unknown load case {case!r}, expected 'average', 'hot' or 'cold'")
 
-        normal_vector = np.array([cos_theta_xy, cos_theta_yz, cos_theta_xz])
-        normal_vector /= np.linalg.norm(normal_vector)
-        return normal_vector
-
-    @staticmethod
-    def calculate_angles(node_i: Node, node_j: Node, normal1: np.ndarray, normal2: np.ndarray) -> tuple:
+    def tabulate(self, n_samples: int = 360):
         """
-        Calculate the angles between the normal vectors of two faces.
+        Tabulate the external flux over one orbit, see FluxTable. With the current fixed-attitude model the
+        flux is piecewise constant and flux(t) is already a lookup, so the table is slower, not faster.
 
         Parameters:
-            node_i (Node): The first node.
-            node_j (Node): The second node.
-            normal1 (numpy.ndarray): Normal vector of the first node.
-            normal2 (numpy.ndarray): Normal vector of the second node.
+            n_samples (int): Approximate number of samples per orbit.
 
         Returns:
-            tuple: Tuple containing the following values:
-                theta_i (float): Angle between the normal vector of the first node and the vector connecting the two nodes.
-                theta_j (float): Angle between the normal vector of the second node and the vector connecting the two nodes.
-                R_ij (numpy.ndarray): Vector connecting the centers of the two faces.
+            FluxTable: Tabulated external flux with the same flux(t) interface.
         """
-        # Calculate the vector connecting the centers of the two faces
-        R_ij = np.array(node_i.position[0]) - np.array(node_j.position[0])
+        return FluxTable(self, n_samples)
 
-        # Normalize the vector connecting the centers
-        vector_ij_normalized = R_ij / np.linalg.norm(R_ij)
 
-        # Calculate the dot product of the connecting vector with the normal vectors
-        dot_product1 = np.dot(vector_ij_normalized, normal1)
-        dot_product2 = np.dot(-vector_ij_normalized, normal2)  # Reverse direction for face2
+class FluxTable:
+    """
+    The external heat flux of all nodes tabulated over one orbit, served by linear interpolation in the
+    orbit phase. Each interval with a constant eclipse state is sampled separately and both of its ends
+    are stored, so the eclipse entry and exit stay exact breakpoints instead of being smeared out.
 
-        # Calculate the angles using the arccosine of the dot product
-        theta_i = np.degrees(np.arccos(dot_product1))
-        theta_j = np.degrees(np.arccos(dot_product2))
+    The table is meant for flux models that vary within an orbit, for example a rotating attitude, where
+    sampling once replaces repeated trigonometry. The current OrbitEnvironment flux is constant between
+    the eclipse breakpoints, so the interpolation is exact but a lookup costs several times more than
+    OrbitEnvironment.flux and brings no speedup.
 
-        return theta_i, theta_j, R_ij
+    Attributes:
+        period (float): Orbital period in seconds.
+        phases (numpy.ndarray): Sample phases in seconds, sorted, with the breakpoints repeated.
+        table (numpy.ndarray): Array of shape (n_samples, N) with the external flux on each node. W
+        environment (OrbitEnvironment): The environment that was tabulated.
+    """
 
-    @staticmethod
-    def compute_view_factor(args) -> float:
+    __slots__ = ['period', 'phases', 'table', 'environment', '_segments', '_buffer']
+
+    def __init__(self, environment: OrbitEnvironment, n_samples: int = 360) -> None:
         """
-        Compute the view factor between two nodes.
+        Initializes the table by sampling an environment.
 
         Parameters:
-            args (tuple): Tuple containing the following arguments:
-                node_i (Node): The first node.
-                node_j (Node): The second node.
-                normal1 (numpy.ndarray): Normal vector of the first node.
-                normal2 (numpy.ndarray): Normal vector of the second node.
-                A_i (float): Area of the first node.
+            environment (OrbitEnvironment): The environment to tabulate.
+            n_samples (int): Approximate number of samples per orbit, spread over the intervals by length.
+        """
+        self.environment = environment
+        self.period = environment.period
+        phases, rows, self._segments = [], [], []
+        for start, end, eclipse in environment.segments():
+            count = max(2, int(round(n_samples * (end - start) / self.period)) + 1)
+            self._segments.append((start, end, eclipse, len(phases), len(phases) + count))
+            for phase in np.linspace(start, end, count):
+                phases.append(phase)
+                rows.append(environment.flux(phase, eclipse))
+        self.phases = np.array(phases)
+        self.table = np.array(rows)
+        self._buffer = np.empty(self.table.shape[1])
+
+    def in_eclipse(self, t: float) -> bool:
+        """
+        Check if the satellite is in eclipse, see OrbitEnvironment.in_eclipse.
+
+        Parameters:
+            t (float): Time in seconds.
 
         Returns:
-            float: The view factor between the two nodes.
+            bool: True if in eclipse, False if not.
         """
-        node_i, node_j, normal1, normal2, A_i = args
-        theta_i, theta_j, R_ij = ThermalModel.calculate_angles(node_i, node_j, normal1, normal2)
-        R_ij_norm = np.linalg.norm(R_ij)
+        return self.environment.in_eclipse(t)
+
+    def flux(self, t: float, eclipse: bool = None) -> np.ndarray:
+        """
+        Get the interpolated external heat flux on each node. The returned array is reused by the next call.
+
+        Parameters:
+            t (float): Time in seconds.
+            eclipse (bool): Eclipse state to use instead of the one at t, for one-sided values at the
+                            eclipse entry and exit (default: the eclipse state at t).
 
-        def integrand(x, y, A_i, A_j, R_ij_norm, theta_i, theta_j):
-            return np.cos(np.deg2rad(theta_i)) * np.cos(np.deg2rad(theta_j)) / (np.pi * R_ij_norm**2)
+        Returns:
+            numpy.ndarray: Array of external heat flux on each node. W
+        """
+        phase = t % self.period
+        first, last = 0, len(self.phases)
+        if eclipse is not None:
+            # Restrict the lookup to the samples of the interval with the requested eclipse state
+            for start, end, segment_eclipse, segment_first, segment_last in self._segments:
+                if segment_eclipse == eclipse and start <= phase <= end:
+                    first, last = segment_first, segment_last
+                    break
+        i = np.searchsorted(self.phases[first:last], phase, side='right') - 1 + first
+        i = min(max(i, first), last - 2)
+        width = self.phases[i + 1] - self.phases[i]
+        weight = (phase - self.phases[i]) / width if width > 0 else 0.0
+        np.subtract(self.table[i + 1], self.table[i], out=self._buffer)
+        self._buffer *= weight
+        self._buffer += self.table[i]
+        return self._buffer
+
+    def discontinuities(self, t_start: float, t_end: float) -> np.ndarray:
+        """
+        Get the eclipse entry and exit times strictly between two times, see OrbitEnvironment.discontinuities.
 
-        x_i_min, x_i_max = -np.sqrt(A_i)/2, np.sqrt(A_i)/2
-        y_j_min, y_j_max = -np.sqrt(node_j.area)/2, np.sqrt(node_j.area)/2
+        Parameters:
+            t_start (float): Start time in seconds.
+            t_end (float): End time in seconds.
 
-        result, _ = dblquad(
-            integrand,
-            x_i_min, x_i_max,
-            lambda x: y_j_min, lambda x: y_j_max,
-            args=(A_i, node_j.area, R_ij_norm, theta_i, theta_j)
-        )
+        Returns:
+            numpy.ndarray: Sorted array of eclipse entry and exit times in seconds.
+        """
+        return self.environment.discontinuities(t_start, t_end)
 
-        return result / A_i
 
-    def is_occluded(self, index_i: int, index_j: int, positions: np.ndarray) -> bool:
+class OrbitEnvironmentBatch:
+    """
+    The external heating of S (h, beta) scenarios stacked in one array, for integrating the scenarios together.
+
+    Attributes:
+        environments (list): OrbitEnvironment of each scenario.
+        period (numpy.ndarray): Orbital period of each scenario. s
+        eclipse_start (numpy.ndarray): Eclipse start of each scenario after the start of each orbit. s
+        eclipse_end (numpy.ndarray): Eclipse end of each scenario after the start of each orbit. s
+        q_sunlit (numpy.ndarray): Array of shape (S, N) with the external heat flux outside eclipse. W
+        q_eclipse (numpy.ndarray): Array of shape (S, N) with the external heat flux in eclipse. W
+    """
+
+    __slots__ = ['environments', 'period', 'eclipse_start', 'eclipse_end', 'q_sunlit', 'q_eclipse', '_buffer']
+
+    def __init__(self, environments: list) -> None:
         """
-        Check if any node occludes the view between two nodes.
+        Initializes the stacked environment.
 
         Parameters:
-            index_i (int): Index of the first node.
-            index_j (int): Index of the second node.
-            positions (numpy.ndarray): Array of node positions.
+            environments (list): OrbitEnvironment of each scenario.
+        """
+        self.environments = environments
+        self.period = np.array([environment.period for environment in environments])
+        self.eclipse_start = np.array([environment.eclipse_start for environment in environments])
+        self.eclipse_end = np.array([environment.eclipse_end for environment in environments])
+        self.q_sunlit = np.array([environment.q_sunlit for environment in environments])
+        self.q_eclipse = np.array([environment.q_eclipse for environment in environments])
+        self._buffer = np.empty(self.q_sunlit.shape)
 
-        Returns:
-            bool: True if the view is occluded, False otherwise.
+    def in_eclipse(self, t: float) -> np.ndarray:
         """
-        position_i = positions[index_i]
-        position_j = positions[index_j]
+        Check which scenarios are in eclipse.
 
-        for k, position_k in enumerate(positions):
-            if k != index_i and k != index_j:
-                # Simple occlusion check along straight lines (x, y, z axes)
-                if all(position_i <= position_k) and all(position_k <= position_j):
-                    return True  # Node k occludes the view between node i and j
+        Parameters:
+            t (float): Time in seconds.
 
-        return False
+        Returns:
+            numpy.ndarray: Boolean array, True for the scenarios in eclipse.
+        """
+        phase = t % self.period
+        return (self.eclipse_start < phase) & (phase < self.eclipse_end)
 
-    def internal_vf(self) -> np.ndarray:
+    def flux(self, t: float, eclipse: np.ndarray = None) -> np.ndarray:
         """
-        Calculate the view factor matrix between different nodes.
-        Based on: https://shorturl.at/rvyQ4
+        Get the external heat flux on each node of every scenario. The returned array is reused by the next call.
+
+        Parameters:
+            t (float): Time in seconds.
+            eclipse (numpy.ndarray): Eclipse state of each scenario to use instead of the one at t
+                                     (default: the eclipse states at t).
 
         Returns:
-            numpy.ndarray: View factor matrix.
+            numpy.ndarray: Array of shape (S, N) with the external heat flux on each node. W
         """
-        node_count = len(self.nodes)
-        vf_matrix = np.zeros((node_count, node_count))  # Initialize matrix
-        nodes_list = list(self.nodes.values())
+        if eclipse is None:
+            eclipse = self.in_eclipse(t)
+        np.copyto(self._buffer, self.q_sunlit)
+        np.copyto(self._buffer, self.q_eclipse, where=np.asarray(eclipse)[:, None])
+        return self._buffer
 
-        # Precompute normal vectors and positions
-        normal_vectors = [self.normal_vector_from_angles(*node.position[1]) for node in nodes_list]
-        positions = np.array([node.position[0] for node in nodes_list])
-        areas = np.array([node.area for node in nodes_list])
-
-        for i, node_i in enumerate(nodes_list):
-            normal_i = normal_vectors[i]
-            position_i = positions[i]
-            area_i = areas[i]
+    def discontinuities(self, t_start: float, t_end: float) -> np.ndarray:
+        """
+        Get the eclipse entry and exit times of all scenarios strictly between two times. Between two
+        consecutive times every scenario keeps its eclipse state.
 
-            for j, node_j in enumerate(nodes_list):
-                if i != j:
-                    normal_j = normal_vectors[j]
-                    position_j = positions[j]
+        Parameters:
+            t_start (float): Start time in seconds.
+            t_end (float): End time in seconds.
 
-                    # Check if any node is occluding the view between node_i and node_j
-                    if self.is_occluded(i, j, positions):
-                        vf_matrix[i][j] = 0
-                        continue
+        Returns:
+            numpy.ndarray: Sorted array of the union of the eclipse entry and exit times in seconds.
+        """
+        return np.unique(np.concatenate([np.empty(0)] + [environment.discontinuities(t_start, t_end)
+                                                         for environment in self.environments]))
 
-                    R_ij = position_i - position_j
-                    R_ij_norm = np.linalg.norm(R_ij)
 
-                    # Calculate the dot product of the connecting vector with the normal vectors
-                    vector_ij_normalized = R_ij / R_ij_norm
-                    dot_product1 = np.dot(vector_ij_normalized, normal_i)
-                    dot_product2 = np.dot(-vector_ij_normalized, normal_j)
+class ThermalNetwork:
+    """
+    Struct of arrays describing the thermal network, in node order, as consumed by the compiled heat balance kernel.
 
-                    # Calculate the angles using the arccosine of the dot product
-                    theta_i_rad = np.arccos(dot_product1)
-                    theta_j_rad = np.arccos(dot_product2)
-                    theta_i = np.degrees(theta_i_rad)
-                    theta_j = np.degrees(theta_j_rad)
+    Attributes:
+        keys (numpy.ndarray): Node keys in row order.
+        conductance (scipy.sparse.csr_matrix): Linear conductance matrix k*A/L between nodes. W/K
+        radiation (scipy.sparse.csr_matrix): Symmetric radiative conductance matrix sigma*epsilon*A*B between nodes,
+                                             empty when internal radiation is off. W/K^4
+        areas (numpy.ndarray): Node areas. m^2
+        emissivities (numpy.ndarray): Node emissivities, for MLI nodes the scale of the effective emissivity.
+        emission_offsets (numpy.ndarray): Offsets of the effective emissivity of MLI nodes, zero for bare nodes, so
+                                          the emissivity of every node is clip(offset / T^4 + emissivity, 0, 1). K^4
+        radiating (numpy.ndarray): Boolean mask of the nodes that exchange heat with the environment.
+        radiating_bodies (numpy.ndarray): Radiating body of each node (earth, sun or internal).
+        absorptivities (numpy.ndarray): Node absorptivities.
+        gammas (numpy.ndarray): Angle between each node and its radiating body. degrees
+        thermal_masses (numpy.ndarray): Nominal node thermal masses, see property_tables. J/K
+        q_generated (numpy.ndarray): Internal heat loads of the nodes. W
+        sigma (float): Stefan-Boltzmann constant. W/m^2K^4
+        T_space (float): Temperature of space. K
+        thermal_control (bool): If True, nodes with an internal heat load are held at constant temperature.
+        property_grid (tuple): First temperature and spacing (K) of the uniform grid of the property tables.
+        property_tables (numpy.ndarray): Conductivity relative to the nominal value, thermal mass and emissivity of each
+                                         node on the grid, of shape (3, N, K), or (3, N, 0) when all properties are constant.
+
+    The network holds only arrays and plain data and its arrays are read-only, so it is a compact
+    snapshot of the model that can be sent once to each worker process of a parameter sweep.
+    """
 
-                    def integrand(x, y, A_i, A_j, R_ij_norm, theta_i, theta_j):
-                        return np.cos(np.deg2rad(theta_i)) * np.cos(np.deg2rad(theta_j)) / (np.pi * R_ij_norm**2)
+    __slots__ = ['keys', 'conductance', 'radiation', 'areas', 'emissivities', 'emission_offsets', 'radiating', 'radiating_bodies', 'absorptivities', 'gammas',
+                 'thermal_masses', 'q_generated',
+                 'sigma', 'T_space', 'thermal_control', 'property_grid', 'property_tables', '_laplacian', '_diagonal', '_jacobian_rows',
+                 '_radiation_positions', '_radiation_totals', '_conductance_positions']
 
-                    x_i_min, x_i_max = -np.sqrt(area_i)/2, np.sqrt(area_i)/2
-                    y_j_min, y_j_max = -np.sqrt(node_j.area)/2, np.sqrt(node_j.area)/2
+    def __init__(self, table: NodeTable, conductance: csr_matrix, radiation: csr_matrix = None, rows: np.ndarray = None) -> None:
+        """
+        Initializes a ThermalNetwork from the node table of a thermal model. When the model uses every row of
+        the table in order, the node arrays are read-only views of the table columns rather than copies.
 
-                    result, _ = dblquad(
-                        integrand,
-                        x_i_min, x_i_max,
-                        lambda x: y_j_min, lambda x: y_j_max,
-                        args=(area_i, node_j.area, R_ij_norm, theta_i, theta_j)
-                    )
+        Parameters:
+            table (NodeTable): Table of the nodes of the thermal model.
+            conductance (scipy.sparse.csr_matrix): Linear conductance matrix k*A/L between nodes. W/K
+            radiation (scipy.sparse.csr_matrix): Radiative conductance matrix between nodes, see
+                                                 ThermalModel.radiative_conductance_matrix (default: no internal radiation). W/K^4
+            rows (numpy.ndarray): Table rows of the nodes, in network order (default: all rows).
+        """
+        if rows is None or np.array_equal(rows, np.arange(len(table))):
+            rows = slice(None)
+        self.keys = np.array(table.keys[rows].tolist())
+        node_count = len(self.keys)
+        self.conductance = csr_matrix(conductance, dtype=float)
+        self.radiation = csr_matrix((node_count, node_count)) if radiation is None else csr_matrix(radiation, dtype=float)
+        self.areas = table.areas[rows]
+        self.emissivities = np.array(table.emissivities[rows], dtype=float)
+        self.emission_offsets = np.zeros(node_count)
+        mli = table.mli[rows]
+        for row in np.flatnonzero(mli.astype(bool)):
+            self.emission_offsets[row], self.emissivities[row] = mli_emission_coefficients(mli[row], self.areas[row])
+        self.radiating_bodies = table.radiating_bodies[rows]
+        self.radiating = np.isin(self.radiating_bodies, ['earth', 'sun'])
+        self.absorptivities = table.absorptivities[rows]
+        self.gammas = table.gammas[rows]
+        self.thermal_masses = table.masses[rows] * table.specific_heats[rows]
+        self.q_generated = table.heat_loads[rows]
+        self.sigma = 5.67e-8
+        self.T_space = 2.7
+        self.thermal_control = False
+        self.property_grid, self.property_tables = tabulate_properties(table, rows, self.emissivities)
+        self._build()
+
+    @classmethod
+    def from_arrays(cls, keys: np.ndarray, conductance: csr_matrix, areas: np.ndarray, emissivities: np.ndarray,
+                    radiating_bodies: np.ndarray, absorptivities: np.ndarray, gammas: np.ndarray, thermal_masses: np.ndarray,
+                    q_generated: np.ndarray, emission_offsets: np.ndarray = None, thermal_control: bool = False,
+                    radiation: csr_matrix = None, property_tables: tuple = None):
+        """
+        Create a ThermalNetwork directly from node arrays, for networks that do not come from Node objects.
 
-                    vf_matrix[i][j] = result / area_i
+        Parameters:
+            keys (numpy.ndarray): Node keys in row order.
+            conductance (scipy.sparse.csr_matrix): Linear conductance matrix between nodes. W/K
+            areas (numpy.ndarray): Node areas. m^2
+            emissivities (numpy.ndarray): Node emissivities, for MLI nodes the scale of the effective emissivity.
+            radiating_bodies (numpy.ndarray): Radiating body of each node (earth, sun or internal).
+            absorptivities (numpy.ndarray): Node absorptivities.
+            gammas (numpy.ndarray): Angle between each node and its radiating body. degrees
+            thermal_masses (numpy.ndarray): Node thermal masses. J/K
+            q_generated (numpy.ndarray): Internal heat loads of the nodes. W
+            emission_offsets (numpy.ndarray): Offsets of the effective emissivity of MLI nodes (default: no MLI). K^4
+            thermal_control (bool): If True, nodes with an internal heat load are held at constant temperature.
+            radiation (scipy.sparse.csr_matrix): Radiative conductance matrix between nodes (default: no internal radiation). W/K^4
+            property_tables (tuple): Temperature-dependent properties, see tabulate_properties (default: constant properties).
 
-        return vf_matrix
-    
-    def compute_conductivity_matrix(self) -> np.ndarray:
-        """
-        Calculate the conductivity matrix.
+        Returns:
+            ThermalNetwork: The network.
+        """
+        network = cls.__new__(cls)
+        network.keys = np.array(keys)
+        network.conductance = csr_matrix(conductance, dtype=float)
+        network.radiation = csr_matrix((len(network.keys), len(network.keys))) if radiation is None else csr_matrix(radiation, dtype=float)
+        network.areas = np.array(areas, dtype=float)
+        network.emissivities = np.array(emissivities, dtype=float)
+        network.emission_offsets = np.zeros(len(network.keys)) if emission_offsets is None else np.array(emission_offsets, dtype=float)
+        network.radiating_bodies = np.array(radiating_bodies)
+        network.radiating = np.isin(network.radiating_bodies, ['earth', 'sun'])
+        network.absorptivities = np.array(absorptivities, dtype=float)
+        network.gammas = np.array(gammas, dtype=float)
+        network.thermal_masses = np.array(thermal_masses, dtype=float)
+        network.q_generated = np.array(q_generated, dtype=float)
+        network.sigma = 5.67e-8
+        network.T_space = 2.7
+        network.thermal_control = thermal_control
+        grid, tables = ((0.0, 1.0), np.empty((3, len(network.keys), 0))) if property_tables is None else property_tables
+        network.property_grid = tuple(float(value) for value in grid)
+        network.property_tables = np.array(tables, dtype=float)
+        network._build()
+        return network
+
+    def _build(self) -> None:
+        """
+        Precompute the structure of the Jacobian and make the arrays read-only.
+        """
+        # Conduction part of the Jacobian, G - diag(sum(G)), with an explicit diagonal so the sparsity is fixed.
+        # The radiative links enter the structure as explicit zeros, their values depend on temperature.
+        node_count = len(self.keys)
+        self.radiation.sort_indices()
+        links = self.conductance.tocoo()
+        radiative_links = self.radiation.tocoo()
+        diagonal = np.arange(node_count)
+        laplacian = coo_matrix((np.concatenate([links.data, np.zeros(radiative_links.nnz), -np.asarray(self.conductance.sum(axis=1)).ravel()]),
+                                (np.concatenate([links.row, radiative_links.row, diagonal]),
+                                 np.concatenate([links.col, radiative_links.col, diagonal]))),
+                               shape=(node_count, node_count)).tocsr()
+        laplacian.sort_indices()
+        self._laplacian = laplacian
+        self._jacobian_rows = np.repeat(diagonal, np.diff(laplacian.indptr))
+        self._diagonal = np.flatnonzero(laplacian.indices == self._jacobian_rows)
+        # Position of each radiative link in the Jacobian structure
+        positions = node_count * self._jacobian_rows + laplacian.indices
+        self._radiation_positions = np.searchsorted(positions, node_count * radiative_links.row + radiative_links.col)
+        self._radiation_totals = np.asarray(self.radiation.sum(axis=1)).ravel()
+        conductive_links = self.conductance.tocoo()
+        self._conductance_positions = np.searchsorted(positions, node_count * conductive_links.row + conductive_links.col)
+        self._freeze()
+
+    def __getstate__(self) -> dict:
+        """
+        Returns the state of the network for pickling.
 
         Returns:
-            numpy.ndarray: Conductivity matrix.
+            dict: Attribute values by name.
         """
-        node_count = len(self.nodes)
-
-        node_indices = {node_key: idx for idx, node_key in enumerate(self.nodes.keys())}
-
-        k_matrix = np.zeros((node_count, node_count))
-        for i, (key_i, node_i) in enumerate(self.nodes.items()):
-            for neighbor_node, _ in node_i.get_neighbors():
-                j = node_indices[neighbor_node.key]
-                k_matrix[i, j] = neighbor_node.conductivity
-                k_matrix[i, i] -= neighbor_node.conductivity
+        return {name: getattr(self, name) for name in self.__slots__}
 
-        return k_matrix
-    
-    def compute_area_matrix(self) -> np.ndarray:
+    def __setstate__(self, state: dict) -> None:
         """
-        Calculate the area matrix.
+        Restores the network from a pickled state. Pickling does not keep the read-only flag of the arrays,
+        so they are frozen again.
 
-        Returns:
-            numpy.ndarray: Area matrix.
+        Parameters:
+            state (dict): Attribute values by name.
         """
-        node_count = len(self.nodes)
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._freeze()
 
-        node_indices = {node_key: idx for idx, node_key in enumerate(self.nodes.keys())}
+    def _freeze(self) -> None:
+        """
+        Make the arrays of the network read-only.
+        """
+        for array in (self.keys, self.areas, self.emissivities, self.emission_offsets, self.radiating_bodies, self.radiating, self.absorptivities,
+                      self.gammas, self.thermal_masses, self.q_generated, self.conductance.data, self.conductance.indices,
+                      self.conductance.indptr, self.radiation.data, self.radiation.indices, self.radiation.indptr,
+                      self._laplacian.data, self._laplacian.indices, self._laplacian.indptr, self._jacobian_rows, self._diagonal,
+                      self._radiation_positions, self._radiation_totals, self._conductance_positions,
+                      self.property_tables):
+            array.flags.writeable = False
 
-        area_matrix = np.zeros((node_count, node_count))
-        for i, (key_i, node_i) in enumerate(self.nodes.items()):
-            for neighbor_node, contact_area in node_i.get_neighbors():
-                j = node_indices[neighbor_node.key]
-                area_matrix[i, j] = contact_area
-        
-        return area_matrix
-    
-    def compute_distance_matrix(self) -> np.ndarray:
+    def __len__(self) -> int:
         """
-        Calculate the distance matrix.
+        Returns the number of nodes in the network.
 
         Returns:
-            numpy.ndarray: Distance matrix.
+            int: Number of nodes.
         """
-        node_count = len(self.nodes)
+        return len(self.keys)
+
+    def node_emissivities(self, temperatures: np.ndarray) -> np.ndarray:
+        """
+        Get the emissivity of each node, evaluating the effective emissivity of the MLI nodes at the given temperatures.
+
+        Parameters:
+            temperatures (numpy.ndarray): Array of node temperatures, of shape (N,) or (S, N) for S scenarios. K
+
+        Returns:
+            numpy.ndarray: Array of node emissivities with the shape of temperatures.
+        """
+        temperatures = np.asarray(temperatures, dtype=float)
+        emissivities = self.lookup(EMISSIVITY, temperatures) if self.tabulated else self.emissivities
+        return np.clip(self.emission_offsets / temperatures ** 4 + emissivities, 0, 1)
+
+    @property
+    def tabulated(self) -> bool:
+        """
+        Whether any node has temperature-dependent properties.
+
+        Returns:
+            bool: True if the property tables are used.
+        """
+        return self.property_tables.shape[2] > 0
+
+    def lookup(self, prop: int, temperatures: np.ndarray, derivative: bool = False) -> np.ndarray:
+        """
+        Interpolate a property table at the node temperatures, as the kernel does.
+
+        Parameters:
+            prop (int): CONDUCTIVITY, THERMAL_MASS or EMISSIVITY, see tabulate_properties.
+            temperatures (numpy.ndarray): Array of node temperatures, of shape (N,) or (S, N). K
+            derivative (bool): If True, return the temperature derivative of the property instead, zero beyond the grid.
+
+        Returns:
+            numpy.ndarray: Property of each node with the shape of temperatures.
+        """
+        table = self.property_tables[prop]
+        grid_start, grid_step = self.property_grid
+        position = (np.asarray(temperatures, dtype=float) - grid_start) / grid_step
+        clipped = np.clip(position, 0, table.shape[1] - 1)
+        index = np.minimum(clipped.astype(int), table.shape[1] - 2)
+        rows = np.arange(len(self))
+        if derivative:
+            return np.where(clipped == position, (table[rows, index + 1] - table[rows, index]) / grid_step, 0)
+        fraction = clipped - index
+        return table[rows, index] * (1 - fraction) + table[rows, index + 1] * fraction
+
+    def node_thermal_masses(self, temperatures: np.ndarray) -> np.ndarray:
+        """
+        Get the thermal mass of each node at the given temperatures.
+
+        Parameters:
+            temperatures (numpy.ndarray): Array of node temperatures, of shape (N,) or (S, N). K
+
+        Returns:
+            numpy.ndarray: Array of node thermal masses with the shape of temperatures. J/K
+        """
+        temperatures = np.asarray(temperatures, dtype=float)
+        if not self.tabulated:
+            return np.broadcast_to(self.thermal_masses, temperatures.shape)
+        return self.lookup(THERMAL_MASS, temperatures)
+
+    def heat_balance(self, temperatures: np.ndarray, q_external: np.ndarray) -> np.ndarray:
+        """
+        Calculate the rate of change of temperature for each node.
+
+        Parameters:
+            temperatures (numpy.ndarray): Array of node temperatures. K
+            q_external (numpy.ndarray): Array of external heat fluxes on each node. W
+
+        Returns:
+            numpy.ndarray: Array of the rate of change of temperature for each node. K/s
+        """
+        temperatures = np.asarray(temperatures, dtype=float)
+        conductance, radiation = self.conductance, self.radiation
+        return heat_balance_kernel(temperatures, conductance.indptr, conductance.indices, conductance.data, radiation.indptr,
+                                   radiation.indices, radiation.data, self.areas, self.emissivities, self.emission_offsets,
+                                   self.radiating, self.thermal_masses, self.q_generated, np.asarray(q_external, dtype=float),
+                                   self.sigma, self.T_space, self.thermal_control, *self.property_grid, self.property_tables)
+
+    def heat_balance_batch(self, temperatures: np.ndarray, q_external: np.ndarray) -> np.ndarray:
+        """
+        Calculate the rate of change of temperature for each node of S scenarios in one kernel call.
+
+        Parameters:
+            temperatures (numpy.ndarray): Array of shape (S, N) with the node temperatures of each scenario. K
+            q_external (numpy.ndarray): Array of shape (S, N) with the external heat fluxes of each scenario. W
+
+        Returns:
+            numpy.ndarray: Array of shape (S, N) with the rate of change of temperature for each node. K/s
+        """
+        temperatures = np.asarray(temperatures, dtype=float)
+        conductance, radiation = self.conductance, self.radiation
+        return heat_balance_batch_kernel(temperatures, conductance.indptr, conductance.indices, conductance.data, radiation.indptr,
+                                         radiation.indices, radiation.data, self.areas, self.emissivities, self.emission_offsets,
+                                         self.radiating, self.thermal_masses, self.q_generated, np.asarray(q_external, dtype=float),
+                                         self.sigma, self.T_space, self.thermal_control, *self.property_grid,
+                                         self.property_tables)
+
+    def jacobian(self, temperatures: np.ndarray, q_external: np.ndarray = None) -> csr_matrix:
+        """
+        Calculate the analytic Jacobian of the heat balance with respect to the node temperatures.
+        Conduction contributes the constant matrix (G - diag(sum(G))) / C, internal radiation the matrix
+        4 * (R - diag(sum(R))) * diag(T^3) / C and radiation to space the diagonal term
+        -d(epsilon(T) * sigma * A * (T^4 - T_space^4))/dT / C, which includes the temperature dependence of
+        the effective emissivity of MLI nodes and of tabulated conductivities and emissivities.
+
+        Tabulated thermal masses add the diagonal term -(dC/dT) / C * dT/dt, which needs the rate of change
+        and so the external flux. It is included when q_external is given and neglected otherwise, as in the
+        solve_ivp callbacks: it vanishes at a steady state and only affects the convergence of the implicit
+        solvers, not their result.
+
+        Parameters:
+            temperatures (numpy.ndarray): Array of node temperatures. K
+            q_external (numpy.ndarray): Array of external heat fluxes on each node, for the thermal mass term. W
+
+        Returns:
+            scipy.sparse.csr_matrix: Jacobian d(dT/dt)/dT. 1/s
+        """
+        return csr_matrix((self._jacobian_data(temperatures, q_external), self._laplacian.indices, self._laplacian.indptr),
+                          shape=self._laplacian.shape)
+
+    def jacobian_batch(self, temperatures: np.ndarray) -> csr_matrix:
+        """
+        Calculate the Jacobian of S stacked scenarios, which do not interact: the block diagonal matrix of
+        the Jacobian of each scenario, see jacobian.
+
+        Parameters:
+            temperatures (numpy.ndarray): Array of shape (S, N) with the node temperatures of each scenario. K
+
+        Returns:
+            scipy.sparse.csr_matrix: Jacobian of shape (S * N, S * N). 1/s
+        """
+        temperatures = np.asarray(temperatures, dtype=float)
+        indices, indptr = self._batch_structure(temperatures.shape[0])
+        size = temperatures.size
+        return csr_matrix((self._jacobian_data(temperatures).ravel(), indices, indptr), shape=(size, size))
+
+    def _jacobian_data(self, temperatures: np.ndarray, q_external: np.ndarray = None) -> np.ndarray:
+        """
+        Calculate the nonzero values of the Jacobian in the order of the conduction matrix structure.
+
+        Parameters:
+            temperatures (numpy.ndarray): Array of node temperatures, of shape (N,) or (S, N) for S scenarios. K
+            q_external (numpy.ndarray): External heat fluxes with the shape of temperatures, for the thermal mass
+                                        term of tabulated networks (default: the term is neglected). W
+
+        Returns:
+            numpy.ndarray: Jacobian values, with shape (nnz,) or (S, nnz).
+        """
+        temperatures = np.asarray(temperatures, dtype=float)
+        data = np.tile(self._laplacian.data, temperatures.shape[:-1] + (1,))
+        emissivities = self.emissivities
+        emissivity_slopes = 0
+        if self.tabulated:
+            # d(G_ij * s_j(T_j) * (T_j - T_i))/dT_j with the conductivity scale s_j of the neighbouring node
+            links, columns = self.conductance.data, self.conductance.indices
+            scales = self.lookup(CONDUCTIVITY, temperatures)
+            scale_slopes = self.lookup(CONDUCTIVITY, temperatures, derivative=True)
+            differences = temperatures[..., columns] - temperatures[..., self._jacobian_rows[self._conductance_positions]]
+            data[..., self._conductance_positions] = links * (scales[..., columns] + scale_slopes[..., columns] * differences)
+            data[..., self._diagonal] = -(scales @ self.conductance.T)
+            emissivities = self.lookup(EMISSIVITY, temperatures)
+            emissivity_slopes = self.lookup(EMISSIVITY, temperatures, derivative=True)
+        cubes = temperatures ** 3
+        # d(epsilon * (T^4 - T_space^4))/dT with epsilon = offset / T^4 + scale(T), constant where it is clipped
+        emissivities = self.emission_offsets / (cubes * temperatures) + emissivities
+        slopes = np.where((emissivities > 0) & (emissivities < 1),
+                          -4 * self.emission_offsets / (cubes * temperatures ** 2) + emissivity_slopes, 0)
+        emission = 4 * np.clip(emissivities, 0, 1) * cubes + slopes * (cubes * temperatures - self.T_space ** 4)
+        data[..., self._diagonal] -= np.where(self.radiating, self.sigma * self.areas * emission, 0)
+        if self.radiation.nnz:
+            radiation = self.radiation
+            data[..., self._radiation_positions] += 4 * radiation.data * cubes[..., radiation.indices]
+            data[..., self._diagonal] -= 4 * self._radiation_totals * cubes
+        row_scale = 1 / self.node_thermal_masses(temperatures)
+        if self.thermal_control:
+            row_scale = np.where(self.q_generated != 0, 0, row_scale)
+        data *= row_scale[..., self._jacobian_rows]
+        if self.tabulated and q_external is not None:
+            # d(f / C)/dT_i of the own node adds -(dC_i/dT_i) / C_i * dT_i/dt on the diagonal
+            rates = (self.heat_balance(temperatures, q_external) if temperatures.ndim == 1
+                     else self.heat_balance_batch(temperatures, q_external))
+            data[..., self._diagonal] -= self.lookup(THERMAL_MASS, temperatures, derivative=True) * row_scale * rates
+        return data
+
+    def _batch_structure(self, scenarios: int) -> tuple:
+        """
+        Get the CSR structure of the block diagonal Jacobian of stacked scenarios.
+
+        Parameters:
+            scenarios (int): Number of scenarios S.
+
+        Returns:
+            tuple: (indices, indptr) of the matrix of shape (S * N, S * N).
+        """
+        nnz = len(self._laplacian.indices)
+        blocks = np.arange(scenarios)[:, None]
+        indices = (self._laplacian.indices + len(self) * blocks).ravel()
+        indptr = np.append((self._laplacian.indptr[:-1] + nnz * blocks).ravel(), nnz * scenarios)
+        return indices, indptr
+
+    def jacobian_sparsity(self) -> csr_matrix:
+        """
+        Get the sparsity pattern of the heat balance Jacobian: the conductive and radiative links plus the diagonal.
+
+        Returns:
+            scipy.sparse.csr_matrix: Matrix with ones at every structurally nonzero entry of the Jacobian.
+        """
+        pattern = self._laplacian.copy()
+        pattern.data = np.ones_like(pattern.data)
+        return pattern
+
+    def jacobian_batch_sparsity(self, scenarios: int) -> csr_matrix:
+        """
+        Get the sparsity pattern of the block diagonal Jacobian of stacked scenarios.
+
+        Parameters:
+            scenarios (int): Number of scenarios S.
+
+        Returns:
+            scipy.sparse.csr_matrix: Matrix of shape (S * N, S * N) with ones at every structurally nonzero entry.
+        """
+        indices, indptr = self._batch_structure(scenarios)
+        size = scenarios * len(self)
+        return csr_matrix((np.ones(len(indices)), indices, indptr), shape=(size, size))
+
+    def linearize(self, temperatures: np.ndarray) -> LinearModel:
+        """
+        Linearize the heat balance around an operating point, see LinearModel. Radiation is linearized in
+        temperature, while the internal heat loads and external fluxes enter linearly as inputs. The slope of
+        tabulated thermal masses is included in A for the nominal inputs, the heat loads without external flux.
+
+        Parameters:
+            temperatures (numpy.ndarray): Node temperatures of the operating point. K
+
+        Returns:
+            LinearModel: State-space form dT/dt = A*T + B*u + c of the network.
+        """
+        temperatures = np.array(temperatures, dtype=float)
+        A = self.jacobian(temperatures, np.zeros(len(self))).toarray()
+        row_scale = 1 / self.node_thermal_masses(temperatures)
+        if self.thermal_control:
+            row_scale = np.where(self.q_generated != 0, 0, row_scale)
+        B = np.hstack([np.diag(row_scale), np.diag(np.where(self.radiating, row_scale, 0))])
+        nominal = np.concatenate([self.q_generated, np.zeros(len(self))])
+        c = self.heat_balance(temperatures, np.zeros(len(self))) - A @ temperatures - B @ nominal
+        return LinearModel(A, B, c, self.keys, temperatures, self.q_generated.copy())
+
+    def condense(self, keep: np.ndarray) -> tuple:
+        """
+        Condense the nodes outside keep into the kept nodes (Guyan static condensation). The condensed nodes
+        must not radiate, so their heat balance is linear: with their thermal mass neglected in the balance,
+        their temperatures follow the kept nodes as T_s = recovery @ T_m + offset. Substituting this in the
+        balance of the kept nodes gives the reduced conductance L_mm + L_ms @ recovery and moves the heat loads
+        of the condensed nodes onto the kept nodes. The thermal masses of the condensed nodes are lumped onto
+        the kept nodes with the same weights, which keeps the total thermal mass.
+
+        The reduced network has the same steady states as the full one for the kept nodes. Transients are
+        approximated: the condensed nodes respond without their own thermal lag.
+
+        Parameters:
+            keep (numpy.ndarray): Boolean mask of the nodes to keep.
+
+        Returns:
+            tuple: The reduced ThermalNetwork, the recovery matrix and the offset vector that give the
+                   temperatures of the condensed nodes from those of the kept nodes.
+        """
+        keep = np.asarray(keep, dtype=bool)
+        condensed = ~keep
+        if np.any(self.radiating[condensed]):
+            raise ValueError("Only nodes that do not radiate can be condensed")
+        if np.any(condensed[self.radiation.tocoo().row]):
+            raise ValueError("Nodes that exchange radiation internally cannot be condensed")
+        if self.thermal_control and np.any(self.q_generated[condensed] != 0):
+            raise ValueError("Nodes held at constant temperature by thermal control cannot be condensed")
+        if self.tabulated:
+            raise ValueError("Networks with temperature-dependent material properties cannot be condensed")
+
+        laplacian = self._laplacian.tocsc()
+        L_ss = laplacian[condensed][:, condensed]
+        L_sm = laplacian[condensed][:, keep].toarray()
+        L_ms = laplacian[keep][:, condensed]
+        try:
+            factor = splu(L_ss.tocsc())
+        except RuntimeError as error:
+            raise ValueError("Every group of condensed nodes must be connected to a kept node") from error
+        recovery = -factor.solve(L_sm)
+        offset = -factor.solve(self.q_generated[condensed])
+
+        reduced = (laplacian[keep][:, keep] + L_ms @ recovery)
+        reduced = np.asarray(reduced)
+        np.fill_diagonal(reduced, 0)
+        reduced[np.abs(reduced) < 1e-12 * np.abs(reduced).max(initial=0)] = 0 # Fill-in below round-off
+
+        rows = np.flatnonzero(keep)
+        row_map = np.full(len(self), -1)
+        row_map[rows] = np.arange(len(rows))
+        network = ThermalNetwork.from_arrays(
+            self.keys[keep], csr_matrix(reduced), self.areas[keep], self.emissivities[keep], self.radiating_bodies[keep],
+            self.absorptivities[keep], self.gammas[keep], self.thermal_masses[keep] + recovery.T @ self.thermal_masses[condensed],
+            self.q_generated[keep] + L_ms @ offset,
+            self.emission_offsets[keep], self.thermal_control,
+            self.radiation[keep][:, keep])
+        return network, recovery, offset
+
+    def steady_state(self, q_external: np.ndarray, initial_T: np.ndarray, tol: float = 1e-6, max_iter: int = 50) -> np.ndarray:
+        """
+        Solve heat_balance(T, q_external) = 0 for a constant external flux with Newton's method, using the
+        sparse analytic Jacobian. Nodes held at constant temperature by thermal control keep their initial
+        temperature.
+
+        Parameters:
+            q_external (numpy.ndarray): Array of external heat fluxes on each node. W
+            initial_T (numpy.ndarray): Initial guess of the node temperatures. K
+            tol (float): Newton steps stop once no temperature changes by more than this. K
+            max_iter (int): Largest number of Newton steps.
+
+        Returns:
+            numpy.ndarray: Array of steady-state node temperatures. K
+        """
+        temperatures = np.array(initial_T, dtype=float)
+        free = np.ones(len(self), dtype=bool)
+        if self.thermal_control:
+            free = self.q_generated == 0
+
+        for _ in range(max_iter):
+            residual = self.heat_balance(temperatures, q_external)[free]
+            step = spsolve(self.jacobian(temperatures, q_external)[free][:, free].tocsc(), residual)
+            if not np.all(np.isfinite(step)):
+                raise RuntimeError("Steady state not found: the heat balance Jacobian is singular")
+            # Halve the step while it would push a temperature below zero, where the T^4 terms are not physical
+            while np.any(temperatures[free] - step <= 0):
+                step /= 2
+            temperatures[free] -= step
+            if np.max(np.abs(step), initial=0) < tol:
+                return temperatures
+        raise RuntimeError(f"Steady state not found in {max_iter} Newton steps")
+
+    def jacobian_system(self, t: float, y: np.ndarray) -> csr_matrix:
+        """
+        Jacobian callback in the form expected by solve_ivp.
+
+        Parameters:
+            t (float): Time.
+            y (numpy.ndarray): Array of temperature values for each node.
+
+        Returns:
+            scipy.sparse.csr_matrix: Jacobian d(dT/dt)/dT.
+        """
+        return self.jacobian(y)
+
+    def dense_jacobian_system(self, t: float, y: np.ndarray) -> np.ndarray:
+        """
+        Dense Jacobian callback in the form expected by solve_ivp, for solvers without sparse support (LSODA).
+
+        Parameters:
+            t (float): Time.
+            y (numpy.ndarray): Array of temperature values for each node.
+
+        Returns:
+            numpy.ndarray: Jacobian d(dT/dt)/dT.
+        """
+        return self.jacobian(y).toarray()
+
+    def batch_jacobian_system(self, t: float, y: np.ndarray) -> csr_matrix:
+        """
+        Jacobian callback in the form expected by solve_ivp for a flattened (S, N) state of stacked scenarios.
+
+        Parameters:
+            t (float): Time.
+            y (numpy.ndarray): Flattened array of temperature values of each scenario.
+
+        Returns:
+            scipy.sparse.csr_matrix: Block diagonal Jacobian d(dT/dt)/dT.
+        """
+        return self.jacobian_batch(y.reshape(-1, len(self)))
+
+    def dense_batch_jacobian_system(self, t: float, y: np.ndarray) -> np.ndarray:
+        """
+        Dense Jacobian callback for a flattened (S, N) state of stacked scenarios, for LSODA.
+
+        Parameters:
+            t (float): Time.
+            y (numpy.ndarray): Flattened array of temperature values of each scenario.
+
+        Returns:
+            numpy.ndarray: Block diagonal Jacobian d(dT/dt)/dT.
+        """
+        return self.jacobian_batch(y.reshape(-1, len(self))).toarray()
+
+    def solver_options(self, method: str = 'RK45', analytic_jacobian: bool = True, scenarios: int = None,
+                       dt: float = 10.0) -> dict:
+        """
+        Get the solve_ivp keyword arguments for an integration method. The implicit methods (BDF, Radau,
+        LSODA) receive the analytic Jacobian, or only its sparsity pattern if analytic_jacobian is False.
+        The fixed-step methods 'BE' and 'CN' of integrators.ThetaIntegrator always use the analytic Jacobian.
+
+        Parameters:
+            method (str): Integration method passed to solve_ivp, or 'BE' or 'CN'.
+            analytic_jacobian (bool): Use the analytic Jacobian instead of finite differences.
+            scenarios (int): Number of stacked scenarios for a batched integration, see ode_system_batch
+                             (default: a single scenario).
+            dt (float): Step size of the fixed-step methods. s
+
+        Returns:
+            dict: Keyword arguments for solve_ivp, or for ThetaIntegrator with the fixed-step methods.
+        """
+        options = {'method': method}
+        batched = scenarios is not None
+        if method in FIXED_STEP_METHODS:
+            options['jac'] = self.batch_jacobian_system if batched else self.jacobian_system
+            options['dt'] = dt
+        elif method in ('BDF', 'Radau'):
+            if analytic_jacobian:
+                options['jac'] = self.batch_jacobian_system if batched else self.jacobian_system
+            else:
+                options['jac_sparsity'] = self.jacobian_batch_sparsity(scenarios) if batched else self.jacobian_sparsity()
+        elif method == 'LSODA' and analytic_jacobian:
+            options['jac'] = self.dense_batch_jacobian_system if batched else self.dense_jacobian_system
+        return options
+
+    def ode_system(self, h: float, beta: float, flux_samples: int = None):
+        """
+        Returns a function that calculates the rate of change of temperature for each node of the network.
+
+        Parameters:
+            h (float): Altitude.
+            beta (float): Angle between orbit and equator in degrees.
+            flux_samples (int): If given, the external flux is tabulated over one orbit with this many samples
+                                and interpolated, see FluxTable (default: evaluated directly, which is
+                                faster for the current piecewise-constant flux).
+
+        Returns:
+            function: Right-hand side of the heat balance ODE, with the OrbitEnvironment of the scenario
+                      attached as its environment attribute.
+        """
+        environment = OrbitEnvironment(self, h, beta)
+        if flux_samples is not None:
+            environment = environment.tabulate(flux_samples)
+
+        def ode_system(t: float, y: np.ndarray, eclipse: bool = None) -> np.ndarray:
+            """
+            ode_system calculates the rate of change of temperature for each node in the thermal model.
+
+            Parameters:
+                t (float): Time.
+                y (numpy.ndarray): Array of temperature values for each node.
+                eclipse (bool): Eclipse state to use instead of the one at t (default: the eclipse state at t).
+
+            Returns:
+                numpy.ndarray: Array of the rate of change of temperature for each node.
+            """
+            return self.heat_balance(y, environment.flux(t, eclipse))
+
+        ode_system.environment = environment
+        return ode_system
+
+    def ode_system_batch(self, scenarios: list):
+        """
+        Returns a function that calculates the rate of change of temperature of S stacked scenarios. The state
+        is the flattened (S, N) array of node temperatures, so one solve_ivp call advances all scenarios.
+
+        Parameters:
+            scenarios (list): (h, beta) of each scenario.
+
+        Returns:
+            function: Right-hand side of the stacked heat balance ODE, with the OrbitEnvironmentBatch of the
+                      scenarios attached as its environment attribute.
+        """
+        environment = OrbitEnvironmentBatch([OrbitEnvironment(self, h, beta) for h, beta in scenarios])
+        shape = (len(scenarios), len(self))
+
+        def ode_system(t: float, y: np.ndarray, eclipse: np.ndarray = None) -> np.ndarray:
+            """
+            ode_system calculates the rate of change of temperature for each node of every scenario.
+
+            Parameters:
+                t (float): Time.
+                y (numpy.ndarray): Flattened array of temperature values of each scenario.
+                eclipse (numpy.ndarray): Eclipse state of each scenario to use instead of the one at t
+                                         (default: the eclipse states at t).
+
+            Returns:
+                numpy.ndarray: Flattened array of the rate of change of temperature for each node.
+            """
+            return self.heat_balance_batch(y.reshape(shape), environment.flux(t, eclipse)).ravel()
+
+        ode_system.environment = environment
+        return ode_system
+
+
+class ThermalModel:
+    """
+    A class representing a thermal model.
+
+    Attributes:
+        nodes (list): List of nodes in the thermal model.
+        table (NodeTable): Columnar storage of the nodes, the nodes are views on its rows.
+        rows (numpy.ndarray): Table rows of the nodes, in row order of the matrices.
+
+    Methods:
+        __init__(self, nodes: list, cache_dir: str, internal_radiation: bool) -> None: Initializes the ThermalModel object.
+        add_node(self, node: Node): Adds a node to the list of nodes.
+        remove_node(self, key): Removes a node from the list of nodes.
+        get_node(self, key): Retrieves a node by its key.
+        normal_vector_from_angles(theta_xy, theta_yz, theta_xz): Calculates the normal vector from given angles.
+        normal_vectors_from_angles(angles): Calculates the normal vectors of many faces at once.
+        calculate_angles(node_i, node_j, normal1, normal2): Calculates the angles between the normal vectors of two faces.
+        compute_view_factor(args): Computes the view factor between two nodes.
+        is_occluded(self, index_i, index_j, positions): Checks if any node occludes the view between two nodes.
+        precedence_matrix(positions): Calculates which node positions lie component-wise below which.
+        pair_view_factors(...): Calculates a block of view factors in closed form.
+        surface_arrays(self): Returns the positions, normals and areas of all nodes.
+        internal_vf(self): Calculates the view factor between different nodes.
+        compute_conductance_matrix(self): Calculates the sparse linear conductance (GL) matrix.
+        link_conductance(node_i, neighbor_node, contact_area): Calculates the conductance of a single link.
+        radiative_conductance_matrix(self): Calculates the radiative conductances between nodes from Gebhart factors.
+        build_network(self): Builds the struct of arrays used by the compiled heat balance kernel.
+        environment(self, h, beta): Returns the precomputed orbital environment of a scenario.
+        compute_external_flux(self, h, beta, t): Calculates the external heat flux on each node.
+        heat_balance(self, h, beta, t): Calculates the heat balance equation.
+        heat_balance_array(self, temperatures, h, beta, t): Calculates the heat balance equation for a temperature vector.
+        jacobian(self, temperatures): Calculates the analytic Jacobian of the heat balance equation.
+        jacobian_sparsity(self): Returns the sparsity pattern of the Jacobian.
+        solver_options(self, method, analytic_jacobian): Returns the solve_ivp options for an integration method.
+        integrate_one_scenario(network, beta, h, time, ...): Integrates the heat balance equation up to a single output time.
+        integrate_trajectory(network, beta, h, time_range, ...): Integrates the heat balance equation once over all output times.
+        integrate_batch(network, scenarios, time_range, ...): Integrates several scenarios together as one stacked ODE.
+        integrate_segments(ode_system, time_range, ...): Integrates an ODE split at the eclipse entry and exit times.
+        reduce(self, outputs): Returns a surrogate with the interior nodes condensed into the kept nodes.
+        linearize(self, temperatures): Returns the state-space form of the model around an operating point.
+        solve_steady_state(self, h, beta, case, tol): Solves the steady-state heat balance for a constant load case.
+        solve_periodic(self, h, beta, ...): Finds the temperature cycle of the periodic steady state of a scenario.
+        ode_system_wrapper(self, h, beta, flux_samples): Returns the right-hand side of the heat balance ODE for a scenario.
+        integrate_heat_balance(self, beta_range, h_range, time_range, trajectory, method, ...): Integrates the heat balance equation over a range of parameters.
+        iter_trajectories(self, beta_range, h_range, time_range, ...): Yields the trajectory of each scenario as it completes.
+        integrate_to_store(self, directory, beta_range, h_range, time_range, ...): Runs a sweep into a chunked on-disk store.
+        sweep_chunksize(job_count, chunksize): Returns the number of jobs sent to a pool worker at once.
+    """
+
+    __slots__ = ['nodes', 'table', 'rows', 'vf_matrix', 'gl_matrix', 'internal_radiation', 'network', 'stats', '_environment']
+
+    def __init__(self, nodes: list, cache_dir: str = None, internal_radiation: bool = False) -> None:
+        """
+        Initializes a ThermalModel object.
+
+        Parameters:
+            nodes (list or NodeTable): List of nodes in the thermal model, or a table whose rows are all used. Nodes
+                                       from several tables are copied into a new table.
+            cache_dir (str): Directory of the on-disk matrix cache. The view factor and conductance matrices are
+                             reloaded from it when the geometry, materials and contacts are unchanged (default: no cache).
+            internal_radiation (bool): If True, the nodes also exchange heat by radiation with each other, see
+                                       radiative_conductance_matrix (default: only conduction between nodes).
+            table (NodeTable): Columnar storage of the nodes.
+            rows (numpy.ndarray): Table rows of the nodes, in row order of the matrices.
+            vf_matrix (numpy.ndarray): View factor matrix.
+            gl_matrix (scipy.sparse.csr_matrix): Linear conductance matrix k*A/L.
+            network (ThermalNetwork): Struct of arrays used by the compiled heat balance kernel.
+            stats (dict): Solver statistics of the last trajectory sweep (RHS and Jacobian evaluations).
+        """
+        if isinstance(nodes, NodeTable):
+            nodes = [Node.view(nodes, row) for row in range(len(nodes))]
+        nodes = list({node.key: node for node in nodes}.values())
+        if len({id(node.table) for node in nodes}) > 1:
+            table = NodeTable(len(nodes))
+            nodes = [Node.view(table, table.insert(node.table, node.row)) for node in nodes]
+        self.table = nodes[0].table if nodes else NodeTable()
+        self.rows = np.array([node.row for node in nodes], dtype=np.int64)
+        self.nodes = {node.key: node for node in nodes}
+        self.internal_radiation = internal_radiation
+        self.stats = {}
+        self._environment = None
+        cached = None
+        if cache_dir is not None:
+            digest = model_hash(self.table, self.rows)
+            cached = load_matrices(cache_dir, digest)
+        if cached is not None:
+            self.vf_matrix, self.gl_matrix = cached
+        else:
+            self.vf_matrix = self.internal_vf()
+            self.gl_matrix = self.compute_conductance_matrix()
+            if cache_dir is not None:
+                save_matrices(cache_dir, digest, self.vf_matrix, self.gl_matrix)
+        self.network = self.build_network()
+
+    def add_node(self, node: Node) -> None:
+        """
+        Adds a node to the list of nodes in the thermal model. The matrices are updated incrementally: a row
+        and column are appended for the new node, and only the view factors it newly occludes are cleared.
+
+        Parameters:
+            node (Node): The node to be added. A node from another table is copied into the table of the model.
+        """
+        if node.table is not self.table:
+            node = Node.view(self.table, self.table.insert(node.table, node.row))
+        if node.key in self.nodes:
+            # Replacing an existing node changes a row in the middle of the matrices, rebuild them
+            self.nodes[node.key] = node
+            self.vf_matrix = self.internal_vf()
+            self.gl_matrix = self.compute_conductance_matrix()
+            self.network = self.build_network()
+            return
+
+        self.nodes[node.key] = node
+        self.rows = np.append(self.rows, node.row)
+        positions, normals, areas = self.surface_arrays()
+        n = len(areas) - 1
+        precedes = self.precedence_matrix(positions)
+        precedes_float = precedes.astype(np.float32)
+
+        vf_matrix = np.zeros((n + 1, n + 1))
+        vf_matrix[:n, :n] = self.vf_matrix
+        # Pairs of existing nodes whose view the new node blocks
+        vf_matrix[:n, :n][np.outer(precedes[:n, n], precedes[n, :n])] = 0
+
+        vf_row = self.pair_view_factors(positions[n:], normals[n:], areas[n:], positions, normals, areas)[0]
+        vf_row[precedes_float[n] @ precedes_float > 0] = 0
+        vf_column = self.pair_view_factors(positions, normals, areas, positions[n:], normals[n:], areas[n:])[:, 0]
+        vf_column[precedes_float @ precedes_float[:, n] > 0] = 0
+        vf_matrix[n, :] = vf_row
+        vf_matrix[:, n] = vf_column
+        vf_matrix[n, n] = 0
+        self.vf_matrix = vf_matrix
 
         node_indices = {node_key: idx for idx, node_key in enumerate(self.nodes.keys())}
+        links = self.gl_matrix.tocoo()
+        rows, cols, values = [links.row], [links.col], [links.data]
+        for neighbor_node, contact_area in node.get_neighbors():
+            j = node_indices.get(neighbor_node.key)
+            if j is None or j == n:
+                continue
+            rows.append([n])
+            cols.append([j])
+            values.append([self.link_conductance(node, neighbor_node, contact_area)])
+            reverse = neighbor_node.neighbors.get(node.key)
+            if reverse is not None:
+                rows.append([j])
+                cols.append([n])
+                values.append([self.link_conductance(neighbor_node, node, reverse[1])])
+        self.gl_matrix = csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+                                    shape=(n + 1, n + 1))
+        self.gl_matrix.eliminate_zeros()
+        self.network = self.build_network()
+
+    def remove_node(self, key: str) -> None:
+        """
+        Removes a node from the list of nodes based on the given key. The row and column of the node are
+        masked out of the matrices, and only the view factors that the node was occluding are recomputed.
+        The contacts stored on the neighbouring nodes are kept, so the node can be added back later.
+
+        Parameters:
+            key (str): The key of the node to be removed.
+        """
+        if key in self.nodes:
+            r = list(self.nodes.keys()).index(key)
+            positions, normals, areas = self.surface_arrays()
+            precedes = self.precedence_matrix(positions)
+            keep = np.arange(len(areas)) != r
+            del self.nodes[key]
+            self.rows = self.rows[keep]
+
+            # Pairs that the removed node was occluding may become visible again
+            released = np.outer(precedes[:, r], precedes[r, :])[np.ix_(keep, keep)]
+            positions, normals, areas = positions[keep], normals[keep], areas[keep]
+            precedes_float = precedes[np.ix_(keep, keep)].astype(np.float32)
+            vf_matrix = self.vf_matrix[np.ix_(keep, keep)]
+
+            released_rows = np.flatnonzero(released.any(axis=1))
+            if released_rows.size:
+                block = self.pair_view_factors(positions[released_rows], normals[released_rows], areas[released_rows],
+                                               positions, normals, areas)
+                block[precedes_float[released_rows] @ precedes_float > 0] = 0
+                rows_block = vf_matrix[released_rows]
+                rows_block[released[released_rows]] = block[released[released_rows]]
+                vf_matrix[released_rows] = rows_block
+            np.fill_diagonal(vf_matrix, 0)
+            self.vf_matrix = vf_matrix
+
+            self.gl_matrix = self.gl_matrix[keep][:, keep].tocsr()
+            self.network = self.build_network()
+
+    def get_node(self, key: str) -> Node:
+        """
+        Get a node from the thermal model by its key.
+
+        Parameters:
+            key (str): The key of the node to retrieve.
+
+        Returns:
+            Node or None: The node with the specified key, or None if not found.
+        """
+        return self.nodes.get(key, None)
+    
+    @staticmethod
+    def normal_vector_from_angles(theta_xy: float, theta_yz: float, theta_xz: float) -> np.ndarray:
+        """
+        Calculate the normal vector from given angles.
+
+        Parameters:
+            theta_xy (float): Angle in degrees between the x-y plane and the normal vector.
+            theta_yz (float): Angle in degrees between the y-z plane and the normal vector.
+            theta_xz (float): Angle in degrees between the x-z plane and the normal vector.
+
+        Returns:
+            numpy.ndarray: Normal vector with components in x, y, and z directions.
+        """
+        # Calculate direction cosines
+        cos_theta_xy = np.cos(np.radians(theta_xy))
+        cos_theta_yz = np.cos(np.radians(theta_yz))
+        cos_theta_xz = np.cos(np.radians(theta_xz))
+
+        normal_vector = np.array([cos_theta_xy, cos_theta_yz, cos_theta_xz])
+        normal_vector /= np.linalg.norm(normal_vector)
+        return normal_vector
+
+    @staticmethod
+    def normal_vectors_from_angles(angles: np.ndarray) -> np.ndarray:
+        """
+        Calculate the normal vectors of many faces at once.
+
+        Parameters:
+            angles (numpy.ndarray): Array of shape (N, 3) with the angles theta_xy, theta_yz and theta_xz in degrees.
+
+        Returns:
+            numpy.ndarray: Array of shape (N, 3) with the unit normal vectors.
+        """
+        normal_vectors = np.cos(np.radians(np.asarray(angles, dtype=float)))
+        return normal_vectors / np.linalg.norm(normal_vectors, axis=1, keepdims=True)
+
+    @staticmethod
+    def calculate_angles(node_i: Node, node_j: Node, normal1: np.ndarray, normal2: np.ndarray) -> tuple:
+        """
+        Calculate the angles between the normal vectors of two faces.
+
+        Parameters:
+            node_i (Node): The first node.
+            node_j (Node): The second node.
+            normal1 (numpy.ndarray): Normal vector of the first node.
+            normal2 (numpy.ndarray): Normal vector of the second node.
+
+        Returns:
+            tuple: Tuple containing the following values:
+                theta_i (float): Angle between the normal vector of the first node and the vector connecting the two nodes.
+                theta_j (float): Angle between the normal vector of the second node and the vector connecting the two nodes.
+                R_ij (numpy.ndarray): Vector connecting the centers of the two faces.
+        """
+        # Calculate the vector connecting the centers of the two faces
+        R_ij = np.array(node_i.position[0]) - np.array(node_j.position[0])
+
+        # Normalize the vector connecting the centers
+        vector_ij_normalized = R_ij / np.linalg.norm(R_ij)
+
+        # Calculate the dot product of the connecting vector with the normal vectors
+        dot_product1 = np.dot(vector_ij_normalized, normal1)
+        dot_product2 = np.dot(-vector_ij_normalized, normal2)  # Reverse direction for face2
+
+        # Calculate the angles using the arccosine of the dot product
+        theta_i = np.degrees(np.arccos(dot_product1))
+        theta_j = np.degrees(np.arccos(dot_product2))
+
+        return theta_i, theta_j, R_ij
+
+    @staticmethod
+    def compute_view_factor(args) -> float:
+        """
+        Compute the view factor between two nodes.
+
+        Parameters:
+            args (tuple): Tuple containing the following arguments:
+                node_i (Node): The first node.
+                node_j (Node): The second node.
+                normal1 (numpy.ndarray): Normal vector of the first node.
+                normal2 (numpy.ndarray): Normal vector of the second node.
+                A_i (float): Area of the first node.
+
+        Returns:
+            float: The view factor between the two nodes.
+        """
+        node_i, node_j, normal1, normal2, A_i = args
+        return ThermalModel.pair_view_factors(np.array([node_i.position[0]]), np.array([normal1]), np.array([A_i]),
+                                              np.array([node_j.position[0]]), np.array([normal2]), np.array([node_j.area]))[0, 0]
+
+    def is_occluded(self, index_i: int, index_j: int, positions: np.ndarray) -> bool:
+        """
+        Check if any node occludes the view between two nodes.
+
+        Parameters:
+            index_i (int): Index of the first node.
+            index_j (int): Index of the second node.
+            positions (numpy.ndarray): Array of node positions.
+
+        Returns:
+            bool: True if the view is occluded, False otherwise.
+        """
+        position_i = positions[index_i]
+        position_j = positions[index_j]
+
+        for k, position_k in enumerate(positions):
+            if k != index_i and k != index_j:
+                # Simple occlusion check along straight lines (x, y, z axes)
+                if all(position_i <= position_k) and all(position_k <= position_j):
+                    return True  # Node k occludes the view between node i and j
+
+        return False
+
+    @staticmethod
+    def precedence_matrix(positions: np.ndarray) -> np.ndarray:
+        """
+        Calculate which node positions lie component-wise below which, with a false diagonal. Node k occludes
+        the view between nodes i and j when precedes[i, k] and precedes[k, j], the same straight-line check
+        as is_occluded.
+
+        Parameters:
+            positions (numpy.ndarray): Array of shape (N, 3) with the node positions.
+
+        Returns:
+            numpy.ndarray: Boolean array precedes[i, k] = all(position_i <= position_k) for i != k.
+        """
+        precedes = np.all(positions[:, np.newaxis, :] <= positions[np.newaxis, :, :], axis=2)
+        np.fill_diagonal(precedes, False)
+        return precedes
+
+    @staticmethod
+    def pair_view_factors(positions_i: np.ndarray, normals_i: np.ndarray, areas_i: np.ndarray,
+                          positions_j: np.ndarray, normals_j: np.ndarray, areas_j: np.ndarray) -> np.ndarray:
+        """
+        Calculate a block of view factors between two sets of planar patches in closed form. The integrand
+        cos(theta_i) * cos(theta_j) / (pi * R^2) is constant over the square patches of side sqrt(A), so the
+        double integral reduces to the integrand times sqrt(A_i) * sqrt(A_j). Coincident patches get zero.
 
-        distance_matrix = np.zeros((node_count, node_count))
-        for i, (key_i, node_i) in enumerate(self.nodes.items()):
-            for neighbor_node, _ in node_i.get_neighbors():
-                j = node_indices[neighbor_node.key]
-                distance_matrix[i, j] = np.linalg.norm(node_i.position[0] - neighbor_node.position[0])
-        
-        return distance_matrix
+        Parameters:
+            positions_i (numpy.ndarray): Array of shape (M, 3) with the positions of the first patches.
+            normals_i (numpy.ndarray): Array of shape (M, 3) with the unit normals of the first patches.
+            areas_i (numpy.ndarray): Array of shape (M,) with the areas of the first patches.
+            positions_j (numpy.ndarray): Array of shape (N, 3) with the positions of the second patches.
+            normals_j (numpy.ndarray): Array of shape (N, 3) with the unit normals of the second patches.
+            areas_j (numpy.ndarray): Array of shape (N,) with the areas of the second patches.
+
+        Returns:
+            numpy.ndarray: Array of shape (M, N) with the view factors from each first to each second patch.
+        """
+        R_ij = positions_i[:, np.newaxis, :] - positions_j[np.newaxis, :, :]
+        R_ij_norm_sq = np.einsum('ijk,ijk->ij', R_ij, R_ij)
+        coincident = R_ij_norm_sq == 0
+        R_ij_norm_sq[coincident] = 1
+
+        # Dot products of the normalized connecting vector with the normals give cos(theta_i) and cos(theta_j)
+        cos_product = -np.einsum('ijk,ik->ij', R_ij, normals_i) * np.einsum('ijk,jk->ij', R_ij, normals_j) / R_ij_norm_sq
+
+        vf = cos_product / (np.pi * R_ij_norm_sq) * np.sqrt(areas_j)[np.newaxis, :] / np.sqrt(areas_i)[:, np.newaxis]
+        vf[coincident] = 0
+        return vf
+
+    def surface_arrays(self) -> tuple:
+        """
+        Get the positions, normals and areas of all nodes in row order.
+
+        Returns:
+            tuple: Arrays of shape (N, 3), (N, 3) and (N,) with the positions, unit normals and areas.
+        """
+        positions = self.table.positions[self.rows]
+        return positions[:, 0], self.normal_vectors_from_angles(positions[:, 1]), self.table.areas[self.rows]
+
+    def internal_vf(self) -> np.ndarray:
+        """
+        Calculate the view factor matrix between different nodes, in batches of rows.
+        Based on: https://shorturl.at/rvyQ4
+
+        Returns:
+            numpy.ndarray: View factor matrix.
+        """
+        positions, normals, areas = self.surface_arrays()
+        node_count = len(areas)
+        vf_matrix = np.zeros((node_count, node_count))
+
+        # Counting the nodes k with precedes[i, k] and precedes[k, j] is a matrix product
+        precedes = self.precedence_matrix(positions).astype(np.float32)
+
+        for start in range(0, node_count, VF_BLOCK_SIZE):
+            rows = slice(start, min(start + VF_BLOCK_SIZE, node_count))
+            block = self.pair_view_factors(positions[rows], normals[rows], areas[rows], positions, normals, areas)
+            block[precedes[rows] @ precedes > 0] = 0
+            vf_matrix[rows] = block
+
+        np.fill_diagonal(vf_matrix, 0)
+        return vf_matrix
+
+    def compute_conductance_matrix(self) -> csr_matrix:
+        """
+        Calculate the sparse linear conductance (GL) matrix, k*A/L for every contact between nodes.
+        The conductivity of the neighbouring node is used for each link, and links between nodes at
+        the same position are ignored.
+
+        Returns:
+            scipy.sparse.csr_matrix: Conductance matrix. W/K
+        """
+        node_count = len(self.rows)
+
+        # Matrix index of each table row, -1 for the rows that are not in the model
+        node_indices = np.full(len(self.table), -1)
+        node_indices[self.rows] = np.arange(node_count)
+
+        contact_rows = self.table.contact_rows
+        rows, cols = node_indices[contact_rows[:, 0]], node_indices[contact_rows[:, 1]]
+        linked = (rows >= 0) & (cols >= 0) & (rows != cols)
+        node_rows, neighbor_rows = contact_rows[linked, 0], contact_rows[linked, 1]
+        centers = self.table.positions[:, 0]
+        offsets = centers[node_rows] - centers[neighbor_rows]
+        distances = np.sqrt((offsets[:, None, :] @ offsets[:, :, None]).ravel()) # Rounds like the norm of each offset on its own
+        values = np.zeros(len(distances))
+        np.divide(self.table.conductivities[neighbor_rows] * self.table.contact_areas[linked], distances, out=values, where=distances != 0)
+
+        gl_matrix = csr_matrix((values, (rows[linked], cols[linked])), shape=(node_count, node_count))
+        gl_matrix.eliminate_zeros()
+        return gl_matrix
+
+    @staticmethod
+    def link_conductance(node_i: Node, neighbor_node: Node, contact_area: float) -> float:
+        """
+        Calculate the linear conductance k*A/L of the link from a node to one of its neighbours.
+
+        Parameters:
+            node_i (Node): The node.
+            neighbor_node (Node): The neighbouring node, whose conductivity is used.
+            contact_area (float): Contact area between the nodes. m^2
+
+        Returns:
+            float: Conductance of the link, zero for nodes at the same position. W/K
+        """
+        distance = np.linalg.norm(node_i.position[0] - neighbor_node.position[0])
+        if distance == 0:
+            return 0.0
+        return neighbor_node.conductivity * contact_area / distance
+
+    def radiative_conductance_matrix(self) -> csr_matrix:
+        """
+        Calculate the radiative conductances R between nodes, so that the net heat radiated from node j to
+        node i is R_ij * (T_j^4 - T_i^4). The Gebhart factors B, the fraction of the emission of a node that
+        is absorbed by each other node after any number of diffuse reflections, solve
+        (I - F diag(1 - epsilon)) B = F diag(epsilon) for the view factor matrix F, and R_ij = sigma * epsilon_i * A_i * B_ij.
+        Negative view factors are clipped to zero and rows summing to more than one are scaled down, and R is
+        averaged with its transpose, so the exchange is reciprocal and conserves energy.
+
+        epsilon is the emissivities column of the node table: for MLI nodes the effective emissivity at the
+        temperature of the node when it was constructed, and for nodes with an emissivity table the nominal
+        emissivity of their material. R is computed once per network and is not recomputed as the temperatures
+        move, unlike the emission to space, where the kernel evaluates the emissivity at the node temperature.
+
+        Returns:
+            scipy.sparse.csr_matrix: Symmetric radiative conductance matrix. W/K^4
+        """
+        emissivities, areas = self.table.emissivities[self.rows], self.table.areas[self.rows]
+        view_factors = np.clip(self.vf_matrix, 0, None)
+        view_factors /= np.maximum(view_factors.sum(axis=1), 1)[:, None]
+        gebhart = np.linalg.solve(np.eye(len(emissivities)) - view_factors * (1 - emissivities), view_factors * emissivities)
+        radiation = C.sigma * (emissivities * areas)[:, None] * gebhart
+        radiation = (radiation + radiation.T) / 2
+        np.fill_diagonal(radiation, 0)
+        radiation[radiation < 1e-12 * radiation.max(initial=0)] = 0 # Exchange below round-off
+        radiation = csr_matrix(radiation)
+        radiation.eliminate_zeros()
+        return radiation
+
+    def build_network(self) -> ThermalNetwork:
+        """
+        Build the struct of arrays used by the compiled heat balance kernel.
+
+        Returns:
+            ThermalNetwork: Array representation of the thermal network.
+        """
+        if not self.internal_radiation:
+            return ThermalNetwork(self.table, self.gl_matrix, rows=self.rows)
+        return ThermalNetwork(self.table, self.gl_matrix, self.radiative_conductance_matrix(), self.rows)
     
-    # @njit
+    def environment(self, h: float, beta: float) -> OrbitEnvironment:
+        """
+        Get the orbital environment of a scenario. The last environment is kept and reused while the
+        scenario and the network stay the same.
+
+        Parameters:
+            h (float): Altitude.
+            beta (float): Angle between orbit and equator in degrees.
+
+        Returns:
+            OrbitEnvironment: The external heating of all nodes for the scenario.
+        """
+        cached = self._environment
+        if cached is not None and cached[0] is self.network and cached[1].h == h and cached[1].beta == beta:
+            return cached[1]
+        environment = OrbitEnvironment(self.network, h, beta)
+        self._environment = (self.network, environment)
+        return environment
+
     def compute_external_flux(self, h: float, beta: float, t: float) -> np.ndarray:
         """
-        Calculate the external heat flux on each node.
+        Calculate the external heat flux on each node, as ExternalHeatFlux.total_flux. Only the nodes that
+        face the environment receive it in the heat balance.
 
         Parameters:
             h (float): Altitude.
@@ -877,9 +2238,8 @@ class ThermalModel:
         Returns:
             numpy.ndarray: Array of external heat flux on each node.
         """
-        return ExternalHeatFlux(self.nodes, h, beta, t).total_flux()
+        return self.environment(h, beta).flux(t)
 
-    # @njit(parallel=True, fastmath=True)
     def heat_balance(self, h: float, beta: float, t: float) -> np.ndarray:
         """
         Calculate the rate of change of temperature for each node in the thermal model.
@@ -892,142 +2252,708 @@ class ThermalModel:
         Returns:
             dT_dt (numpy.ndarray): Array of the rate of change of temperature for each node.
         """
-        thermal_control = False
-        sigma = sigma = 5.67e-8 # for Numba
-        T_space = 2.7 # for Numba
+        temperatures = self.table.temperatures[self.rows]
+        return self.heat_balance_array(temperatures, h, beta, t)
 
-        node_indices = {node_key: idx for idx, node_key in enumerate(self.nodes.keys())}
+    def heat_balance_array(self, temperatures: np.ndarray, h: float, beta: float, t: float) -> np.ndarray:
+        """
+        Calculate the rate of change of temperature for each node from a temperature vector, without
+        touching the Node objects.
+
+        Parameters:
+            temperatures (numpy.ndarray): Array of node temperatures. K
+            h (float): Altitude.
+            beta (float): Angle between orbit and equator in degrees.
+            t (float): Time.
 
-        temperatures = np.array([node.temperature for node in self.nodes.values()])
-        # Call each node's get_emissivity method to account for MLI
-        emissivities = np.array([node.get_emissivity() if hasattr(node, 'mli') and node.mli else node.emissivity for node in self.nodes.values()])
-        areas = np.array([node.area for node in self.nodes.values()])
-        thermal_masses = np.array([node.thermal_mass for node in self.nodes.values()])
-        heat_flux_ints = np.array([node.heat_flux_int for node in self.nodes.values()])
+        Returns:
+            dT_dt (numpy.ndarray): Array of the rate of change of temperature for each node.
+        """
+        external_heat_flux = self.compute_external_flux(h, beta, t)
+        return self.network.heat_balance(temperatures, external_heat_flux)
 
-        temperature_differences = np.zeros_like(self.a_matrix)
-        for i, node_i in enumerate(self.nodes.values()):
-            for neighbor_key in node_i.neighbors:
-                j = node_indices[neighbor_key]
-                if i != j:
-                    temperature_differences[i, j] = temperatures[j] - temperatures[i]
+    def jacobian(self, temperatures: np.ndarray, q_external: np.ndarray = None) -> csr_matrix:
+        """
+        Calculate the analytic Jacobian of the heat balance equation. The external flux does not depend on
+        temperature, so the Jacobian is the same for every orbit scenario, except for the slope of tabulated
+        thermal masses, which is included only when q_external is given, see ThermalNetwork.jacobian.
 
-        with np.errstate(divide='ignore', invalid='ignore'):
-            # heat_transfer_matrix = np.where(self.l_matrix != 0, self.k_matrix * temperature_differences * self.a_matrix, 0) #/ self.l_matrix, 0)
-            heat_transfer_matrix = np.where(self.l_matrix != 0, self.k_matrix * temperature_differences * self.a_matrix / self.l_matrix, 0) 
+        Parameters:
+            temperatures (numpy.ndarray): Array of node temperatures. K
+            q_external (numpy.ndarray): Array of external heat fluxes on each node, for the thermal mass term. W
 
-        q_internal_conducted = np.sum(heat_transfer_matrix, axis=1)
-        # heat_transfer_matrix = self.k_matrix * temperature_differences * self.a_matrix
-        # q_internal_conducted = np.sum(heat_transfer_matrix, axis=1)
+        Returns:
+            scipy.sparse.csr_matrix: Jacobian d(dT/dt)/dT. 1/s
+        """
+        return self.network.jacobian(temperatures, q_external)
 
-        temp_diff = temperatures[:, np.newaxis] ** 4 - temperatures[np.newaxis, :] ** 4
-        # Update q_internal_radiated to use the new emissivities from MLI where applicable
-        q_internal_radiated = np.zeros_like(q_internal_conducted)
-        # q_internal_radiated = np.sum(emissivities[:, np.newaxis] * sigma * temp_diff * areas[:, np.newaxis] * self.vf_matrix, axis=1)
+    def jacobian_sparsity(self) -> csr_matrix:
+        """
+        Get the sparsity pattern of the heat balance Jacobian.
 
-        radiating_bodies = np.array([node.radiating_body for node in self.nodes.values()])
-        is_radiating = np.isin(radiating_bodies, ['earth', 'sun'])
-        # Update q_radiated to use the new emissivities from MLI where applicable
-        q_radiated = np.where(is_radiating, emissivities * sigma * areas * (temperatures ** 4 - T_space ** 4), 0)
+        Returns:
+            scipy.sparse.csr_matrix: Matrix with ones at every structurally nonzero entry of the Jacobian.
+        """
+        return self.network.jacobian_sparsity()
 
-        q_generated = np.array([node.heat_flux_int for node in self.nodes.values()])
-        
-        external_heat_flux = self.compute_external_flux(h, beta, t)
+    def jacobian_system(self, t: float, y: np.ndarray) -> csr_matrix:
+        """
+        Jacobian callback in the form expected by solve_ivp.
+
+        Parameters:
+            t (float): Time.
+            y (numpy.ndarray): Array of temperature values for each node.
+
+        Returns:
+            scipy.sparse.csr_matrix: Jacobian d(dT/dt)/dT.
+        """
+        return self.network.jacobian_system(t, y)
 
-        q_external = np.where(is_radiating, external_heat_flux, 0)
+    def dense_jacobian_system(self, t: float, y: np.ndarray) -> np.ndarray:
+        """
+        Dense Jacobian callback in the form expected by solve_ivp, for solvers without sparse support (LSODA).
 
-        q_total = q_internal_conducted + q_generated + q_internal_radiated - q_radiated + q_external
+        Parameters:
+            t (float): Time.
+            y (numpy.ndarray): Array of temperature values for each node.
 
-        #print(np.max(q_internal_conducted), np.max(q_generated), np.max(q_internal_radiated), np.max(q_radiated), np.max(q_external))
-        #print(np.min(q_internal_conducted), np.min(q_generated), np.min(q_internal_radiated), np.min(q_radiated), np.min(q_external))
+        Returns:
+            numpy.ndarray: Jacobian d(dT/dt)/dT.
+        """
+        return self.network.dense_jacobian_system(t, y)
 
-        #print(f'{self.nodes[1].name} : {q_total[0]}, {self.nodes[2].name} : {q_total[1]}, {self.nodes[3].name} : {q_total[2]}, {self.nodes[4].name} : {q_total[3]}, {self.nodes[9].name} : {q_total[8]}')
+    def solver_options(self, method: str = 'RK45', analytic_jacobian: bool = True) -> dict:
+        """
+        Get the solve_ivp keyword arguments for an integration method, see ThermalNetwork.solver_options.
 
-        # print(np.max(q_total), np.min(q_total))
-        if thermal_control:
-            dT_dt = np.where(heat_flux_ints == 0, q_total / thermal_masses, 0)
-            # print(f'Thermal control {dT_dt}')
-        else:
-            dT_dt = q_total / thermal_masses
-            # print(dT_dt)
-        return dT_dt
+        Parameters:
+            method (str): Integration method passed to solve_ivp.
+            analytic_jacobian (bool): Use the analytic Jacobian instead of finite differences.
+
+        Returns:
+            dict: Keyword arguments for solve_ivp.
+        """
+        return self.network.solver_options(method, analytic_jacobian)
 
     @staticmethod
-    def integrate_one_scenario(args) -> np.ndarray:
+    def integrate_one_scenario(network: ThermalNetwork, beta: float, h: float, time: float, initial_T: np.ndarray,
+                               solver_options: dict, flux_samples: int = None, segment_eclipse: bool = True) -> np.ndarray:
         """
-        Integrate the heat balance equation for a single scenario.
+        Integrate the heat balance equation for a single scenario, see integrate_segments.
 
         Parameters:
-            args (tuple): Tuple containing the following arguments:
-                beta (float): Solar absorptivity.
-                h (float): Convective heat transfer coefficient.
-                time (float): Time.
-                initial_T (numpy.ndarray): Array of initial temperature values for each node.
-                ode_system_wrapper (function): Function that calculates the rate of change of temperature for each node in the thermal model.
+            network (ThermalNetwork): Array snapshot of the thermal model.
+            beta (float): Angle between orbit and equator in degrees.
+            h (float): Altitude.
+            time (float): Time.
+            initial_T (numpy.ndarray): Array of initial temperature values for each node.
+            solver_options (dict): Keyword arguments for solve_ivp, see ThermalNetwork.solver_options.
+            flux_samples (int): Tabulate the external flux with this many samples per orbit, see FluxTable.
+            segment_eclipse (bool): Split the integration at the eclipse entry and exit times.
 
         Returns:
             numpy.ndarray: Array of temperature values for each node.
         """
-        beta, h, time, initial_T, ode_system_wrapper = args
-        ode_system = ode_system_wrapper(h, beta)
-        sol = solve_ivp(ode_system, [0, time], initial_T, method='RK45')
-        return sol.y[:, -1]
+        ode_system = network.ode_system(h, beta, flux_samples)
+        trajectory, _ = ThermalModel.integrate_segments(ode_system, np.array([time]), initial_T, solver_options, segment_eclipse,
+                                                        f"beta={beta}, h={h}, t={time}")
+        return trajectory[-1]
 
-    def ode_system_wrapper(self, h: float, beta: float):
+    @staticmethod
+    def integrate_trajectory(network: ThermalNetwork, beta: float, h: float, time_range: np.ndarray, initial_T: np.ndarray,
+                             solver_options: dict, flux_samples: int = None, segment_eclipse: bool = True) -> tuple:
         """
-        Returns a function that calculates the rate of change of temperature for each node in the thermal model.
+        Integrate the heat balance equation for a single scenario once and sample it at every output time.
+
+        With segment_eclipse the integration is split at the eclipse entry and exit times, where the external
+        flux jumps. Every segment then has a smooth right-hand side with the eclipse state of that segment, so
+        the adaptive solver does not shrink and reject steps to locate each jump.
 
         Parameters:
-            h (float): Convective heat transfer coefficient.
-            beta (float): Solar absorptivity.
+            network (ThermalNetwork): Array snapshot of the thermal model.
+            beta (float): Angle between orbit and equator in degrees.
+            h (float): Altitude.
+            time_range (numpy.ndarray): Sorted array of output times.
+            initial_T (numpy.ndarray): Array of initial temperature values for each node.
+            solver_options (dict): Keyword arguments for solve_ivp, see ThermalNetwork.solver_options.
+            flux_samples (int): Tabulate the external flux with this many samples per orbit, see FluxTable.
+            segment_eclipse (bool): Split the integration at the eclipse entry and exit times.
 
         Returns:
-            function: Function that calculates the rate of change of temperature for each node in the thermal model.
+            tuple: Array of temperature values with shape (len(time_range), number of nodes), and a dict with
+                   the number of right-hand side evaluations (nfev), Jacobian evaluations (njev) and segments.
+        """
+        ode_system = network.ode_system(h, beta, flux_samples)
+        return ThermalModel.integrate_segments(ode_system, time_range, initial_T, solver_options, segment_eclipse,
+                                               f"beta={beta}, h={h}")
+
+    @staticmethod
+    def integrate_batch(network: ThermalNetwork, scenarios: list, time_range: np.ndarray, initial_T: np.ndarray,
+                        method: str = 'RK45', analytic_jacobian: bool = True, segment_eclipse: bool = True,
+                        dt: float = 10.0) -> tuple:
+        """
+        Integrate S (beta, h) scenarios together as one ODE with the flattened (S, N) state, so every
+        right-hand side and Jacobian evaluation serves all scenarios. The integration is split at the union
+        of the eclipse entry and exit times of the scenarios.
+
+        The step size is shared, so it follows the scenario that needs the smallest steps, and the error
+        control applies to the stacked state: the results agree with separate integrations within the
+        solver tolerance, not to the last digit.
+
+        Batching pays off for the explicit methods (RK45), whose cost is dominated by the interpreter overhead
+        of each right-hand side call. For BDF and Radau the sparse LU of the larger system and the extra
+        segments roughly cancel the gain, and LSODA needs the block diagonal Jacobian as a dense matrix.
+
+        Parameters:
+            network (ThermalNetwork): Array snapshot of the thermal model.
+            scenarios (list): (beta, h) of each scenario.
+            time_range (numpy.ndarray): Sorted array of output times.
+            initial_T (numpy.ndarray): Array of initial temperature values for each node, used for every scenario.
+            method (str): Integration method passed to solve_ivp.
+            analytic_jacobian (bool): Give the implicit methods the analytic block diagonal Jacobian.
+            segment_eclipse (bool): Split the integration at the eclipse entry and exit times.
+            dt (float): Step size of the fixed-step methods. s
+
+        Returns:
+            tuple: Array of temperature values with shape (S, len(time_range), number of nodes), and a dict with
+                   the number of right-hand side evaluations (nfev), Jacobian evaluations (njev) and segments.
+        """
+        ode_system = network.ode_system_batch([(h, beta) for beta, h in scenarios])
+        solver_options = network.solver_options(method, analytic_jacobian, scenarios=len(scenarios), dt=dt)
+        initial_T = np.tile(np.asarray(initial_T, dtype=float), len(scenarios))
+        trajectory, stats = ThermalModel.integrate_segments(ode_system, time_range, initial_T, solver_options, segment_eclipse,
+                                                            f"{len(scenarios)} scenarios")
+        trajectory = trajectory.reshape(len(time_range), len(scenarios), len(network)).transpose(1, 0, 2)
+        return trajectory, stats
+
+    @staticmethod
+    def integrate_segments(ode_system, time_range: np.ndarray, initial_T: np.ndarray, solver_options: dict,
+                           segment_eclipse: bool = True, label: str = '') -> tuple:
+        """
+        Integrate a heat balance ODE from t=0 and sample it at every output time, optionally split at the
+        discontinuities of its environment. The fixed-step methods are handed to integrators.ThetaIntegrator.
+
+        Parameters:
+            ode_system (function): Right-hand side with an environment attribute, see ThermalNetwork.ode_system.
+            time_range (numpy.ndarray): Sorted array of output times.
+            initial_T (numpy.ndarray): Initial state.
+            solver_options (dict): Keyword arguments for solve_ivp, see ThermalNetwork.solver_options.
+            segment_eclipse (bool): Split the integration at the eclipse entry and exit times.
+            label (str): Description of the scenario for error messages.
+
+        Returns:
+            tuple: Array of states with shape (len(time_range), len(initial_T)), and a dict with the number
+                   of right-hand side evaluations (nfev), Jacobian evaluations (njev) and segments.
+        """
+        time_range = np.asarray(time_range, dtype=float)
+        initial_T = np.asarray(initial_T, dtype=float)
+        method = solver_options['method']
+        if method in FIXED_STEP_METHODS:
+            integrator = ThetaIntegrator(ode_system, solver_options['jac'], FIXED_STEP_METHODS[method])
+            return integrator.integrate(time_range, initial_T, solver_options['dt'], segment_eclipse)
+
+        stats = {'nfev': 0, 'njev': 0, 'segments': 0}
+        t_end = time_range[-1]
+        if t_end <= 0:
+            # Nothing to integrate, every requested output is the initial state
+            return np.tile(initial_T, (len(time_range), 1)), stats
+
+        environment = ode_system.environment
+        if segment_eclipse:
+            edges = np.concatenate([[0.0], environment.discontinuities(0.0, t_end), [t_end]])
+        else:
+            edges = np.array([0.0, t_end])
+
+        trajectory = np.empty((len(time_range), len(initial_T)))
+        y = initial_T
+        for start, end in zip(edges[:-1], edges[1:]):
+            if segment_eclipse:
+                eclipse = environment.in_eclipse((start + end) / 2)
+                segment_system = lambda t, y, eclipse=eclipse: ode_system(t, y, eclipse)
+            else:
+                segment_system = ode_system
+            in_segment = (time_range >= start) & (time_range <= end)
+            t_eval = time_range[in_segment]
+            if len(t_eval) == 0 or t_eval[-1] != end:
+                t_eval = np.append(t_eval, end) # The segment end is needed as the next initial state
+
+            sol = solve_ivp(segment_system, [start, end], y, t_eval=t_eval, **solver_options)
+            if sol.status != 0:
+                raise RuntimeError(f"Integration failed for {label}: {sol.message}")
+            trajectory[in_segment] = sol.y.T[:np.count_nonzero(in_segment)]
+            y = sol.y[:, -1]
+            stats['nfev'] += sol.nfev
+            stats['njev'] += sol.njev
+            stats['segments'] += 1
+
+        return trajectory, stats
+
+    def reduce(self, outputs: list = ()):
+        """
+        Build a smaller surrogate of the model by condensing the interior nodes, see ThermalNetwork.condense.
+        The nodes that radiate and the output nodes are kept; every other node is condensed. The surrogate
+        is a ThermalModel, so it runs in the same integrate_heat_balance sweep.
+
+        Parameters:
+            outputs (list): Keys of the nodes whose temperatures must be kept, for example the batteries.
+
+        Returns:
+            ReducedModel: The reduced model.
+        """
+        keep = self.network.radiating | np.isin(self.network.keys, list(outputs))
+        if self.network.thermal_control:
+            keep |= self.network.q_generated != 0
+        return ReducedModel(self, keep)
+
+    def linearize(self, temperatures: np.ndarray = None) -> LinearModel:
+        """
+        Linearize the thermal model around an operating point, for evaluating many load profiles by matrix
+        products instead of new integrations, see LinearModel.
+
+        Parameters:
+            temperatures (numpy.ndarray): Node temperatures of the operating point, for example from
+                                          solve_steady_state (default: the node temperatures). K
+
+        Returns:
+            LinearModel: State-space form dT/dt = A*T + B*u + c, with u = [q_generated, q_external].
+        """
+        if temperatures is None:
+            temperatures = self.table.temperatures[self.rows]
+        return self.network.linearize(temperatures)
+
+    def solve_steady_state(self, h: float, beta: float, case: str = 'average', tol: float = 1e-6) -> np.ndarray:
+        """
+        Solve the steady-state heat balance of a scenario under a constant external flux, for quick bounding of
+        the temperatures without a transient. The internal heat loads of the components are included.
+
+        Parameters:
+            h (float): Altitude.
+            beta (float): Angle between orbit and equator in degrees.
+            case (str): 'average' for the orbit-averaged external flux, 'hot' for the sunlit flux held
+                        constant or 'cold' for the eclipse flux held constant, see OrbitEnvironment.case_flux.
+            tol (float): Newton steps stop once no temperature changes by more than this. K
+
+        Returns:
+            numpy.ndarray: Array of steady-state node temperatures. K
+        """
+        initial_T = self.table.temperatures[self.rows]
+        return self.network.steady_state(self.environment(h, beta).case_flux(case), initial_T, tol)
+
+    def solve_periodic(self, h: float, beta: float, method: str = 'BDF', n_output: int = 100, tol: float = 1e-3,
+                       max_orbits: int = 50, initial_T: np.ndarray = None) -> tuple:
         """
-        def ode_system(t: float, y: np.ndarray) -> np.ndarray:
+        Find the periodic steady state of a scenario, the temperature cycle T(t + period) = T(t) the spacecraft
+        settles into, without integrating the warm-up.
+
+        The start-of-orbit temperatures are found by shooting: each evaluation integrates one orbit, and the
+        difference between the end and start temperatures is driven to zero with Anderson-accelerated
+        fixed-point iteration (scipy.optimize.anderson). The orbits are integrated with tight tolerances so
+        the shooting residual is smooth. The number of orbits integrated is kept in self.stats.
+
+        Parameters:
+            h (float): Altitude.
+            beta (float): Angle between orbit and equator in degrees.
+            method (str): Integration method passed to solve_ivp.
+            n_output (int): Number of output times over the orbit.
+            tol (float): Largest allowed difference between the temperatures at the start and end of the orbit. K
+            max_orbits (int): Largest number of shooting iterations.
+            initial_T (numpy.ndarray): Initial guess of the start-of-orbit temperatures (default: the node temperatures).
+
+        Returns:
+            tuple: Array of n_output times covering one orbit [0, period], and the array of temperature values
+                   with shape (n_output, number of nodes).
+        """
+        network = self.network
+        ode_system = network.ode_system(h, beta)
+        period = ode_system.environment.period
+        solver_options = network.solver_options(method)
+        solver_options.update(rtol=1e-8, atol=1e-8)
+        if initial_T is None:
+            initial_T = self.table.temperatures[self.rows]
+        label = f"beta={beta}, h={h}"
+        self.stats = {'orbits': 0, 'nfev': 0}
+
+        def orbit_residual(start_T: np.ndarray) -> np.ndarray:
             """
-            ode_system calculates the rate of change of temperature for each node in the thermal model.
+            Integrate one orbit and return the change of temperature over it.
 
             Parameters:
-                t (float): Time.
-                y (numpy.ndarray): Array of temperature values for each node.
+                start_T (numpy.ndarray): Temperatures at the start of the orbit. K
 
             Returns:
-                numpy.ndarray: Array of the rate of change of temperature for each node.
+                numpy.ndarray: End minus start temperatures. K
             """
-            for node, temp in zip(self.nodes.values(), y):
-                node.update_temperature(temp)
-            return self.heat_balance(h, beta, t)
+            trajectory, stats = ThermalModel.integrate_segments(ode_system, np.array([period]), start_T, solver_options,
+                                                                label=label)
+            self.stats['orbits'] += 1
+            self.stats['nfev'] += stats['nfev']
+            return trajectory[-1] - start_T
 
-        return ode_system
+        try:
+            start_T = anderson(orbit_residual, np.asarray(initial_T, dtype=float), f_tol=tol, maxiter=max_orbits)
+        except NoConvergence as error:
+            raise RuntimeError(f"Periodic steady state not found for {label} in {max_orbits} orbits") from error
+
+        times = np.linspace(0, period, n_output)
+        trajectory, _ = ThermalModel.integrate_segments(ode_system, times, start_T, solver_options, label=label)
+        return times, trajectory
+
+    def ode_system_wrapper(self, h: float, beta: float, flux_samples: int = None):
+        """
+        Returns a function that calculates the rate of change of temperature for each node in the thermal model.
+
+        Parameters:
+            h (float): Altitude.
+            beta (float): Angle between orbit and equator in degrees.
+            flux_samples (int): If given, the external flux is tabulated over one orbit with this many samples
+                                and interpolated, see FluxTable (default: evaluated directly, which is
+                                faster for the current piecewise-constant flux).
 
-    def integrate_heat_balance(self, beta_range: np.ndarray, h_range: np.ndarray, time_range: np.ndarray) -> np.ndarray:
+        Returns:
+            function: Function that calculates the rate of change of temperature for each node in the thermal model.
+        """
+        return self.network.ode_system(h, beta, flux_samples)
+
+    def integrate_heat_balance(self, beta_range: np.ndarray, h_range: np.ndarray, time_range: np.ndarray, trajectory: bool = True,
+                               method: str = 'RK45', analytic_jacobian: bool = True, flux_samples: int = None,
+                               segment_eclipse: bool = True, chunksize: int = None, out: str = None,
+                               batch_size: int = None, dt: float = 10.0) -> np.ndarray:
         """
         integrate the heat balance equation over a range of parameters.
 
+        The network snapshot and the settings shared by all scenarios are sent once to each worker process
+        when the pool starts, so every job only carries its own (beta, h) point and its grid indices. Jobs
+        are collected in completion order and placed in the results by those indices.
+
+        The workers write their temperatures directly into a results array allocated once by this method, so
+        no result is pickled back to the parent. It is a shared memory block, copied into a regular array at
+        the end, or with out a .npy file mapped into memory by every process, which is returned as is.
+
         Parameters:
             beta_range (numpy.ndarray): Array of beta angles (in degrees).
             h_range (numpy.ndarray): Array of altitudes.
             time_range (numpy.ndarray): Array of time values.
+            trajectory (bool): If True, integrate each (beta, h) scenario once and sample it at every time in
+                               time_range. If False, integrate from t=0 separately for every output time.
+            method (str): Integration method passed to solve_ivp ('RK45', 'BDF', 'Radau', 'LSODA', ...), or the
+                          fixed-step 'BE' (backward Euler) or 'CN' (Crank-Nicolson), see integrators.ThetaIntegrator.
+                          The implicit methods are recommended for this stiff network.
+            analytic_jacobian (bool): Give the implicit methods the analytic Jacobian instead of its sparsity pattern.
+            flux_samples (int): If given, tabulate the orbit-periodic external flux with this many samples per orbit
+                                and interpolate it, see FluxTable. Only useful for time-varying flux models,
+                                it is slower than the default for the current piecewise-constant flux.
+            segment_eclipse (bool): Split each integration at the eclipse entry and exit times. The solver statistics
+                                    of the run are kept in self.stats.
+            chunksize (int): Number of jobs sent to a worker at once (default: about four chunks per worker).
+            out (str): Path of a .npy file to write the results to (default: results are kept in memory).
+            batch_size (int): In trajectory mode, integrate this many (beta, h) scenarios together in each job,
+                              see integrate_batch. The batches are distributed over the pool like single
+                              scenarios (default: one scenario per job).
+            dt (float): Step size of the fixed-step methods 'BE' and 'CN'. s
 
         Returns:
-            results (numpy.ndarray): Array of temperature values for each node.
+            results (numpy.ndarray): Array of temperature values with shape (beta, h, time, node), a numpy.memmap
+                                     of the out file if given.
         """
-        initial_T = [node.temperature for node in self.nodes.values()]
+        initial_T = self.table.temperatures[self.rows]
         results_shape = (len(beta_range), len(h_range), len(time_range), len(initial_T))
-        results = np.zeros(results_shape)
-
-        # Prepare arguments for parallel processing
-        all_args = [(beta, h, time, initial_T, self.ode_system_wrapper) 
-                    for beta in beta_range for h in h_range for time in time_range]
+        time_range = np.asarray(time_range, dtype=float)
+        if trajectory and (np.any(time_range < 0) or np.any(np.diff(time_range) < 0)):
+            raise ValueError("time_range must be sorted and non-negative in trajectory mode")
+        if batch_size is not None and (not trajectory or flux_samples is not None or batch_size < 1):
+            raise ValueError("batch_size must be at least 1 and requires trajectory mode without flux_samples")
+        sweep = {'time_range': time_range, 'initial_T': initial_T, 'method': method, 'analytic_jacobian': analytic_jacobian,
+                 'flux_samples': flux_samples, 'segment_eclipse': segment_eclipse, 'dt': dt}
+
+        if out is not None:
+            results = np.lib.format.open_memmap(out, mode='w+', dtype=float, shape=results_shape)
+            storage = ('memmap', out, results_shape)
+            shared_results = None
+        else:
+            shared_results = SharedMemory(create=True, size=max(int(np.prod(results_shape)) * 8, 1))
+            results = np.ndarray(results_shape, dtype=float, buffer=shared_results.buf)
+            results[...] = 0
+            storage = ('shared_memory', shared_results.name, results_shape)
+        pool_args = {'initializer': _init_worker, 'initargs': (self.network, sweep, storage)}
+
+        try:
+            if trajectory:
+                all_args = [(i, k, beta, h) for i, beta in enumerate(beta_range) for k, h in enumerate(h_range)]
+                self.stats = {'nfev': 0, 'njev': 0, 'segments': 0, 'scenarios': len(all_args)}
+                if batch_size is None:
+                    job, jobs = _trajectory_job, all_args
+                else:
+                    job, jobs = _batch_job, [all_args[n:n + batch_size] for n in range(0, len(all_args), batch_size)]
+
+                with Pool(**pool_args) as pool:
+                    with tqdm(total=len(all_args), desc="Integrating Heat Balance") as pbar:
+                        for count, stats in pool.imap_unordered(job, jobs, self.sweep_chunksize(len(jobs), chunksize)):
+                            for key, value in stats.items():
+                                self.stats[key] += value
+                            pbar.set_postfix(nfev=self.stats['nfev'])
+                            pbar.update(count)
+            else:
+                # Prepare arguments for parallel processing
+                all_args = [(i, k, j, beta, h, time) for i, beta in enumerate(beta_range) for k, h in enumerate(h_range)
+                            for j, time in enumerate(time_range)]
+
+                with Pool(**pool_args) as pool:
+                    with tqdm(total=len(all_args), desc="Integrating Heat Balance") as pbar:
+                        for _ in pool.imap_unordered(_scenario_job, all_args, self.sweep_chunksize(len(all_args), chunksize)):
+                            pbar.update(1)
+
+            if shared_results is None:
+                results.flush()
+                return results
+            return results.copy()
+        finally:
+            if shared_results is not None:
+                del results # The buffer can only be released once no array uses it
+                shared_results.close()
+                shared_results.unlink()
+
+    def iter_trajectories(self, beta_range: np.ndarray, h_range: np.ndarray, time_range: np.ndarray, method: str = 'RK45',
+                          analytic_jacobian: bool = True, flux_samples: int = None, segment_eclipse: bool = True,
+                          chunksize: int = None, dt: float = 10.0, skip: set = ()):
+        """
+        Integrate the trajectory of every (beta, h) scenario in the process pool and yield each one as soon as
+        it completes, instead of assembling the whole (beta, h, time, node) tensor. Memory is bounded by the
+        scenarios in flight. The solver statistics accumulate in self.stats as the scenarios arrive.
 
-        with Pool() as pool:
+        Parameters:
+            beta_range (numpy.ndarray): Array of beta angles (in degrees).
+            h_range (numpy.ndarray): Array of altitudes.
+            time_range (numpy.ndarray): Sorted array of output times.
+            method (str): Integration method, see integrate_heat_balance.
+            analytic_jacobian (bool): Give the implicit methods the analytic Jacobian instead of its sparsity pattern.
+            flux_samples (int): Tabulate the external flux with this many samples per orbit, see FluxTable.
+            segment_eclipse (bool): Split each integration at the eclipse entry and exit times.
+            chunksize (int): Number of jobs sent to a worker at once (default: about four chunks per worker).
+            dt (float): Step size of the fixed-step methods 'BE' and 'CN'. s
+            skip (set): (i, k) grid indices of scenarios not to integrate, for resuming a sweep.
+
+        Yields:
+            tuple: Grid indices i and k, and the array of temperature values with shape (len(time_range), number of nodes).
+        """
+        initial_T = self.table.temperatures[self.rows]
+        time_range = np.asarray(time_range, dtype=float)
+        if np.any(time_range < 0) or np.any(np.diff(time_range) < 0):
+            raise ValueError("time_range must be sorted and non-negative in trajectory mode")
+        sweep = {'time_range': time_range, 'initial_T': initial_T, 'method': method, 'analytic_jacobian': analytic_jacobian,
+                 'flux_samples': flux_samples, 'segment_eclipse': segment_eclipse, 'dt': dt}
+        all_args = [(i, k, beta, h) for i, beta in enumerate(beta_range) for k, h in enumerate(h_range) if (i, k) not in skip]
+        self.stats = {'nfev': 0, 'njev': 0, 'segments': 0, 'scenarios': len(all_args)}
+
+        with Pool(initializer=_init_worker, initargs=(self.network, sweep, None)) as pool:
             with tqdm(total=len(all_args), desc="Integrating Heat Balance") as pbar:
-                for index, result in enumerate(pool.imap_unordered(ThermalModel.integrate_one_scenario, all_args)):
-                    i = index // (len(h_range) * len(time_range))
-                    k = (index // len(time_range)) % len(h_range)
-                    j = index % len(time_range)
-                    results[i, k, j, :] = result
+                for i, k, trajectory, stats in pool.imap_unordered(_stream_job, all_args, self.sweep_chunksize(len(all_args), chunksize)):
+                    for key, value in stats.items():
+                        self.stats[key] += value
+                    pbar.set_postfix(nfev=self.stats['nfev'])
                     pbar.update(1)
+                    yield i, k, trajectory
+
+    def integrate_to_store(self, directory: str, beta_range: np.ndarray, h_range: np.ndarray, time_range: np.ndarray,
+                           **kwargs) -> TrajectoryStore:
+        """
+        Run a trajectory sweep straight into a chunked on-disk store, one .npy file per scenario, see
+        TrajectoryStore. Scenarios already in the store are skipped, so an interrupted sweep is resumed.
+
+        Parameters:
+            directory (str): Directory of the store.
+            beta_range (numpy.ndarray): Array of beta angles (in degrees).
+            h_range (numpy.ndarray): Array of altitudes.
+            time_range (numpy.ndarray): Sorted array of output times.
+            **kwargs: Integration options of iter_trajectories.
+
+        Returns:
+            TrajectoryStore: The store holding the results.
+        """
+        store = TrajectoryStore(directory, beta_range, h_range, time_range, list(self.network.keys))
+        for i, k, trajectory in self.iter_trajectories(beta_range, h_range, time_range, skip=store.completed(), **kwargs):
+            store.write(i, k, trajectory)
+        return store
+
+    @staticmethod
+    def sweep_chunksize(job_count: int, chunksize: int = None) -> int:
+        """
+        Get the number of jobs sent to a pool worker at once. Without an explicit chunksize the jobs are
+        split in about four chunks per worker, as Pool.map does.
+
+        Parameters:
+            job_count (int): Number of jobs in the sweep.
+            chunksize (int): Requested chunk size (default: automatic).
+
+        Returns:
+            int: Chunk size, at least 1.
+        """
+        if chunksize is not None:
+            if chunksize < 1:
+                raise ValueError("chunksize must be at least 1")
+            return int(chunksize)
+        return max(1, job_count // (4 * (os.cpu_count() or 1)))
+
+
+class ReducedModel(ThermalModel):
+    """
+    A thermal model with interior nodes condensed into the kept nodes, see ThermalModel.reduce. It integrates
+    like the full model, and expand recovers the temperatures of the condensed nodes from the results.
+
+    Attributes:
+        full_keys (numpy.ndarray): Node keys of the full model in row order.
+        kept (numpy.ndarray): Boolean mask of the kept nodes in the rows of the full model.
+        recovery (numpy.ndarray): Matrix giving the condensed node temperatures from the kept ones.
+        offset (numpy.ndarray): Constant part of the condensed node temperatures. K
+    """
+
+    __slots__ = ['full_keys', 'kept', 'recovery', 'offset']
+
+    def __init__(self, model: ThermalModel, keep: np.ndarray) -> None:
+        """
+        Initializes a ReducedModel from a full model.
+
+        Parameters:
+            model (ThermalModel): The full model.
+            keep (numpy.ndarray): Boolean mask of the nodes to keep, in the rows of the full model.
+        """
+        self.full_keys = model.network.keys
+        self.kept = np.asarray(keep, dtype=bool)
+        self.internal_radiation = model.internal_radiation
+        self.network, self.recovery, self.offset = model.network.condense(self.kept)
+        self.nodes = {key: model.nodes[key] for key in self.network.keys}
+        self.table = model.table
+        self.rows = model.rows[self.kept]
+        self.vf_matrix = model.vf_matrix[np.ix_(self.kept, self.kept)]
+        self.gl_matrix = self.network.conductance
+        self.stats = {}
+        self._environment = None
+
+    def add_node(self, node: Node):
+        """
+        A reduced model cannot be edited, edit the full model and reduce it again.
+        """
+        raise TypeError("A reduced model cannot be edited, edit the full model and reduce it again")
+
+    def remove_node(self, key):
+        """
+        A reduced model cannot be edited, edit the full model and reduce it again.
+        """
+        raise TypeError("A reduced model cannot be edited, edit the full model and reduce it again")
+
+    def expand(self, temperatures: np.ndarray) -> np.ndarray:
+        """
+        Recover the temperatures of all nodes of the full model from temperatures of the kept nodes.
+
+        Parameters:
+            temperatures (numpy.ndarray): Temperatures of the kept nodes in the last axis, for example the
+                                          (beta, h, time, node) results of integrate_heat_balance. K
+
+        Returns:
+            numpy.ndarray: Temperatures of every node of the full model in the last axis. K
+        """
+        temperatures = np.asarray(temperatures, dtype=float)
+        expanded = np.empty(temperatures.shape[:-1] + (len(self.full_keys),))
+        expanded[..., self.kept] = temperatures
+        expanded[..., ~self.kept] = temperatures @ self.recovery.T + self.offset
+        return expanded
+
+
+# State of a sweep worker process, set once per process by _init_worker
+_worker = {}
+
+
+def _init_worker(network: ThermalNetwork, sweep: dict, storage: tuple) -> None:
+    """
+    Pool initializer: keep the network snapshot and the settings shared by all jobs of a sweep in the worker,
+    and attach the results array of the sweep.
+
+    Parameters:
+        network (ThermalNetwork): Array snapshot of the thermal model.
+        sweep (dict): time_range, initial_T, method, analytic_jacobian, flux_samples, segment_eclipse and dt of the sweep.
+        storage (tuple): ('shared_memory', name, shape) or ('memmap', path, shape) of the results array, or None
+                         when the results are returned to the parent.
+    """
+    _worker['network'] = network
+    _worker['sweep'] = sweep
+    _worker['solver_options'] = network.solver_options(sweep['method'], sweep['analytic_jacobian'], dt=sweep['dt'])
+    if storage is None:
+        return
+    kind, location, shape = storage
+    if kind == 'memmap':
+        _worker['results'] = np.load(location, mmap_mode='r+')
+    else:
+        # Keep the block open for the lifetime of the worker, the array is a view of its buffer
+        _worker['shared_results'] = SharedMemory(name=location)
+        _worker['results'] = np.ndarray(shape, dtype=float, buffer=_worker['shared_results'].buf)
+
+
+def _trajectory_job(job: tuple) -> dict:
+    """
+    Integrate the trajectory of one (beta, h) scenario in a sweep worker and write it into the results array,
+    see ThermalModel.integrate_trajectory.
+
+    Parameters:
+        job (tuple): (i, k, beta, h), the grid indices and parameters of the scenario.
+
+    Returns:
+        tuple: Number of scenarios integrated (1) and the solver statistics of the scenario.
+    """
+    i, k, beta, h = job
+    sweep = _worker['sweep']
+    trajectory, stats = ThermalModel.integrate_trajectory(_worker['network'], beta, h, sweep['time_range'], sweep['initial_T'],
+                                                          _worker['solver_options'], sweep['flux_samples'], sweep['segment_eclipse'])
+    _worker['results'][i, k, :, :] = trajectory
+    return 1, stats
 
-        return results
+
+def _stream_job(job: tuple) -> tuple:
+    """
+    Integrate the trajectory of one (beta, h) scenario in a sweep worker and return it to the parent,
+    see ThermalModel.iter_trajectories.
+
+    Parameters:
+        job (tuple): (i, k, beta, h), the grid indices and parameters of the scenario.
+
+    Returns:
+        tuple: The grid indices i and k, the trajectory of the scenario and the solver statistics.
+    """
+    i, k, beta, h = job
+    sweep = _worker['sweep']
+    trajectory, stats = ThermalModel.integrate_trajectory(_worker['network'], beta, h, sweep['time_range'], sweep['initial_T'],
+                                                          _worker['solver_options'], sweep['flux_samples'], sweep['segment_eclipse'])
+    return i, k, trajectory, stats
+
+
+def _batch_job(jobs: list) -> tuple:
+    """
+    Integrate a batch of (beta, h) scenarios together in a sweep worker and write them into the results array,
+    see ThermalModel.integrate_batch.
+
+    Parameters:
+        jobs (list): (i, k, beta, h), the grid indices and parameters of each scenario.
+
+    Returns:
+        tuple: Number of scenarios integrated and the solver statistics of the batch.
+    """
+    sweep = _worker['sweep']
+    trajectories, stats = ThermalModel.integrate_batch(_worker['network'], [(beta, h) for _, _, beta, h in jobs], sweep['time_range'],
+                                                       sweep['initial_T'], sweep['method'], sweep['analytic_jacobian'],
+                                                       sweep['segment_eclipse'], sweep['dt'])
+    for (i, k, _, _), trajectory in zip(jobs, trajectories):
+        _worker['results'][i, k, :, :] = trajectory
+    return len(jobs), stats
+
+
+def _scenario_job(job: tuple) -> None:
+    """
+    Integrate one (beta, h, time) scenario in a sweep worker and write it into the results array,
+    see ThermalModel.integrate_one_scenario.
+
+    Parameters:
+        job (tuple): (i, k, j, beta, h, time), the grid indices and parameters of the scenario.
+    """
+    i, k, j, beta, h, time = job
+    sweep = _worker['sweep']
+    _worker['results'][i, k, j, :] = ThermalModel.integrate_one_scenario(_worker['network'], beta, h, time, sweep['initial_T'],
+                                                                         _worker['solver_options'], sweep['flux_samples'],
+                                                                         sweep['segment_eclipse'])
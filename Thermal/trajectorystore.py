@@ -0,0 +1,141 @@
+"""
+A module that contains a chunked on-disk store for the trajectories of a parameter sweep.
+"""
+
+import json
+import os
+import numpy as np
+
+STORE_VERSION = 1 # Bump when the layout of the store changes
+
+
+class TrajectoryStore:
+    """
+    A directory holding the (beta, h, time, node) results of a sweep as one .npy chunk per (beta, h) scenario,
+    so a sweep never needs the whole results tensor in memory. Chunks are written under a temporary name and
+    renamed, so an interrupted sweep leaves only complete chunks and can be resumed.
+
+    Layout:
+        meta.json: version, shape, beta_range, h_range and node keys.
+        time_range.npy: Output times.
+        scenario_<i>_<k>.npy: Trajectory of scenario (beta_range[i], h_range[k]), of shape (time, node).
+
+    Attributes:
+        directory (str): Directory of the store.
+        shape (tuple): Shape (beta, h, time, node) of the full results.
+        beta_range (numpy.ndarray): Beta angles of the sweep. degrees
+        h_range (numpy.ndarray): Altitudes of the sweep.
+        time_range (numpy.ndarray): Output times. s
+        keys (list): Node keys in column order.
+    """
+
+    __slots__ = ['directory', 'shape', 'beta_range', 'h_range', 'time_range', 'keys']
+
+    def __init__(self, directory: str, beta_range: np.ndarray = None, h_range: np.ndarray = None,
+                 time_range: np.ndarray = None, keys: list = None) -> None:
+        """
+        Opens a store, creating it when the sweep is given and the directory holds no store yet. An existing
+        store must hold the same sweep and node keys, so a changed model is not resumed into it.
+
+        Parameters:
+            directory (str): Directory of the store.
+            beta_range (numpy.ndarray): Beta angles of the sweep (required to create the store).
+            h_range (numpy.ndarray): Altitudes of the sweep (required to create the store).
+            time_range (numpy.ndarray): Output times (required to create the store).
+            keys (list): Node keys in column order (required to create the store).
+        """
+        self.directory = directory
+        meta_path = os.path.join(directory, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as file:
+                meta = json.load(file)
+            if meta['version'] != STORE_VERSION:
+                raise ValueError(f"Unsupported trajectory store version {meta['version']} in {directory}")
+            self.shape = tuple(meta['shape'])
+            self.beta_range = np.array(meta['beta_range'])
+            self.h_range = np.array(meta['h_range'])
+            self.keys = meta['keys']
+            self.time_range = np.load(os.path.join(directory, 'time_range.npy'))
+            if beta_range is not None and not (np.array_equal(self.beta_range, beta_range) and np.array_equal(self.h_range, h_range)
+                                               and np.array_equal(self.time_range, time_range)):
+                raise ValueError(f"The trajectory store in {directory} holds a different sweep")
+            if keys is not None and [key.item() if isinstance(key, np.generic) else key for key in keys] != self.keys:
+                raise ValueError(f"The trajectory store in {directory} holds a different sweep")
+            return
+
+        if beta_range is None or h_range is None or time_range is None or keys is None:
+            raise ValueError(f"No trajectory store in {directory}, the sweep is needed to create one")
+        self.beta_range = np.asarray(beta_range, dtype=float)
+        self.h_range = np.asarray(h_range, dtype=float)
+        self.time_range = np.asarray(time_range, dtype=float)
+        self.keys = [key.item() if isinstance(key, np.generic) else key for key in keys]
+        self.shape = (len(self.beta_range), len(self.h_range), len(self.time_range), len(self.keys))
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'time_range.npy'), self.time_range)
+        with open(meta_path, 'w') as file:
+            json.dump({'version': STORE_VERSION, 'shape': self.shape, 'beta_range': self.beta_range.tolist(),
+                       'h_range': self.h_range.tolist(), 'keys': self.keys}, file)
+
+    def chunk_path(self, i: int, k: int) -> str:
+        """
+        Get the path of the chunk of a scenario.
+
+        Parameters:
+            i (int): Index in beta_range.
+            k (int): Index in h_range.
+
+        Returns:
+            str: Path of the .npy file.
+        """
+        return os.path.join(self.directory, f"scenario_{i}_{k}.npy")
+
+    def write(self, i: int, k: int, trajectory: np.ndarray) -> None:
+        """
+        Store the trajectory of a scenario.
+
+        Parameters:
+            i (int): Index in beta_range.
+            k (int): Index in h_range.
+            trajectory (numpy.ndarray): Array of temperature values with shape (time, node). K
+        """
+        if np.shape(trajectory) != self.shape[2:]:
+            raise ValueError(f"Trajectory of shape {np.shape(trajectory)} does not fit the store, expected {self.shape[2:]}")
+        path = self.chunk_path(i, k)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as file:
+            np.save(file, np.asarray(trajectory, dtype=float))
+        os.replace(temporary_path, path)
+
+    def read(self, i: int, k: int) -> np.ndarray:
+        """
+        Read the trajectory of a scenario, mapped into memory.
+
+        Parameters:
+            i (int): Index in beta_range.
+            k (int): Index in h_range.
+
+        Returns:
+            numpy.ndarray: Array of temperature values with shape (time, node). K
+        """
+        return np.load(self.chunk_path(i, k), mmap_mode='r')
+
+    def completed(self) -> set:
+        """
+        Get the scenarios already in the store.
+
+        Returns:
+            set: (i, k) index pairs of the stored scenarios.
+        """
+        return {(i, k) for i in range(self.shape[0]) for k in range(self.shape[1]) if os.path.exists(self.chunk_path(i, k))}
+
+    def to_array(self) -> np.ndarray:
+        """
+        Assemble the full results tensor in memory, with NaN for the scenarios not in the store.
+
+        Returns:
+            numpy.ndarray: Array of temperature values with shape (beta, h, time, node). K
+        """
+        results = np.full(self.shape, np.nan)
+        for i, k in self.completed():
+            results[i, k] = self.read(i, k)
+        return results